@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+接收-识别流水线端到端基准测试
+在回环地址上以无界面模式启动 SimpleQRReceiver（独立进程），由合成负载生成器按固定速率、
+裁剪尺寸发送，测量：
+    持续 帧/s、裁剪/s、识别结果/s
+    丢帧数（发送 - 接收）、识别队列丢弃数
+    接收进程 CPU 占用、RSS
+    端到端延迟（接收器回传ACK中的发送时间戳，P50/P95/P99/最大）
+
+--decoder 选择解码后端（见 decoders.py）：stub 为确定性的替身解码器（固定耗时、按内容哈希给出结果），
+不需要DBR许可证；opencv / opencv-aruco 为OpenCV二维码识别；dbr 使用真实DBR；none 只测接收。
+--decode-input gray 对比灰度解码+ROI裁剪输入与直接喂JPEG字节的单次识别耗时（decode_avg_ms / prep_avg_ms）。
+结果写入 bench_results/ 下的JSON（带git提交号），--compare 与之前的结果逐项对比。
+
+示例：
+    python3 benchmark.py --rates 20,50,100 --crop-sizes 320x320,640x640 --crops 4 --duration 10
+    python3 benchmark.py --rates 50 --compare bench_results/bench_a5ff447_20260101_120000.json
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+from decoders import DecoderBackend, DECODER_BACKENDS, DECODE_INPUTS
+from frame_sampler import SAMPLING_MODES
+
+DEFAULT_BENCH_PORT = 57555  # 避开接收器默认端口，基准测试可与正式接收器同机运行
+RESULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_results')
+
+
+def _rss_mb():
+    """当前进程常驻内存（MB）"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except Exception:
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # 峰值，Linux单位KB
+    except Exception:
+        return None
+
+
+def _receiver_snapshot(pipeline):
+    """接收进程计数器快照（读 receiver_core.ReceiverCore，两个前端共用同一套计数）"""
+    queue_depth = pipeline.dbr_queue.qsize() if pipeline.dbr_queue is not None else 0
+    return {
+        'time': time.perf_counter(),
+        'cpu_s': time.process_time(),
+        'rss_mb': _rss_mb(),
+        'messages': pipeline.received_messages,
+        'crops': pipeline.received_count,
+        'lost_frames': pipeline.lost_frames_count,
+        'decoded': pipeline.dbr_total_decoded,
+        'attempts': pipeline.dbr_total_attempts,
+        'decode_ms': pipeline.dbr_total_time_ms,
+        'prep_ms': pipeline.dbr_prep_time_ms,
+        'dbr_dropped': pipeline.dbr_dropped_frames,
+        'queue_depth': queue_depth,
+        'decode_workers': pipeline.dbr_thread_count,
+        'ring_retries': pipeline.ring.read_retries,
+        'ring_failed': pipeline.ring.failed_reads,
+    }
+
+
+def _receiver_process(options, command_queue, result_queue):
+    """基准测试接收进程：无界面、静默运行 SimpleQRReceiver，按命令回报计数器"""
+    from simple_receiver import SimpleQRReceiver
+
+    decoder = options['decoder']
+    backend = None
+    if decoder != 'none':
+        backend = DecoderBackend(decoder, stub_ms=options['stub_ms'], stub_hit_rate=options['stub_hit_rate'])
+    receiver = SimpleQRReceiver(
+        listen_host='127.0.0.1', camera_ip='127.0.0.1', enable_dbr=decoder != 'none',
+        listen_port=options['port'], ack_port=options['ack_port'],
+        headless=True, quiet=True, decoder_backend=backend,
+        decode_input=options['decode_input'], decode_scale=options['decode_scale'],
+        sampling=options['sampling'], tracking=options['tracking'],
+        autoscale=options['autoscale'],
+        log_dir=os.path.join(RESULT_DIR, 'logs')  # 替身解码器的结果不能进 test_results/（界面版会自动加载那里最新的日志）
+    )
+    if options.get('dbr_threads'):
+        receiver.pipeline.dbr_thread_count = options['dbr_threads']
+    receiver.stats_interval = 3600.0  # 基准测试期间不打印周期统计
+    thread = threading.Thread(target=receiver.start, daemon=True, name="Bench-Receiver")
+    thread.start()
+    result_queue.put('ready')
+
+    while True:
+        command = command_queue.get()
+        if command == 'snapshot':
+            result_queue.put(_receiver_snapshot(receiver.pipeline))
+        elif command == 'stop':
+            receiver.running = False
+            thread.join(timeout=5.0)
+            result_queue.put('stopped')
+            return
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except Exception:
+        return 'unknown'
+
+
+def run_scenario(scenario, options, jpeg):
+    """运行一个场景（固定速率 + 裁剪尺寸），返回结果 dict"""
+    import multiprocessing
+    import pynng
+    from load_generator import LoadGenerator, AckMonitor
+    from pacing import Pacer
+
+    rate = scenario['rate']
+    crop_w, crop_h = scenario['crop_size']
+    print(f"\n🏁 场景: {rate:g} 帧/s，{scenario['cameras']} 相机 × {scenario['crops']} 裁剪，"
+          f"裁剪 {crop_w}x{crop_h}，解码器 {options['decoder']}（输入 {options['decode_input']}）")
+
+    generator = LoadGenerator(jpeg, cameras=scenario['cameras'], crops=scenario['crops'],
+                              crop_size=scenario['crop_size'], quality=options['quality'],
+                              seed=options['seed'])
+    ack_monitor = AckMonitor(options['ack_port'], keep_samples=True)
+
+    ctx = multiprocessing.get_context('spawn')  # NNG套接字不能跨fork使用
+    command_queue = ctx.Queue()
+    result_queue = ctx.Queue()
+    proc = ctx.Process(target=_receiver_process, args=(options, command_queue, result_queue), daemon=True)
+    proc.start()
+    result_queue.get(timeout=60)
+
+    def snapshot():
+        command_queue.put('snapshot')
+        return result_queue.get(timeout=10)
+
+    pub = pynng.Pub0()
+    pub.dial(f"tcp://127.0.0.1:{options['port']}", block=True)
+    time.sleep(1.0)  # 等待订阅和ACK通道建立
+
+    pacer = Pacer(rate)
+    seq = 0
+
+    def send_for(seconds):
+        nonlocal seq
+        count = 0
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            scheduled = pacer.wait()
+            seq += 1
+            timestamp_ms = int(time.time() * 1000) & 0xFFFFFFFF
+            pub.send((seq & 0xFFFF).to_bytes(2, 'big') + timestamp_ms.to_bytes(4, 'big') + generator.build_body())
+            pacer.mark_sent(scheduled)
+            count += 1
+        return count
+
+    try:
+        # 预热：让解码线程、连接、缓存进入稳态
+        send_for(options['warmup'])
+        time.sleep(0.5)
+        start = snapshot()
+        ack_monitor.snapshot_and_reset()
+        ack_monitor.take_samples()
+        pacer.set_rate(rate)  # 从当前时间重新对齐，避免补发预热后等待期间的时间点
+        pacer.window_stats()
+
+        sent = send_for(options['duration'])
+        end = snapshot()
+        pacing = pacer.window_stats()
+        time.sleep(options['drain'])  # 等待在途消息和识别完成
+        drained = snapshot()
+        latencies = ack_monitor.take_samples()
+    finally:
+        command_queue.put('stop')
+        try:
+            result_queue.get(timeout=10)
+        except Exception:
+            pass
+        proc.join(timeout=5.0)
+        if proc.is_alive():
+            proc.terminate()
+        pub.close()
+        ack_monitor.close()
+
+    elapsed = end['time'] - start['time']
+    attempts = end['attempts'] - start['attempts']
+    received = drained['messages'] - start['messages']
+    result = {
+        'rate': rate,
+        'cameras': scenario['cameras'],
+        'crops': scenario['crops'],
+        'crop_size': f"{crop_w}x{crop_h}",
+        'decoder': options['decoder'],
+        'decode_input': options['decode_input'],
+        'sampling': options['sampling'],
+        'tracking': options['tracking'],
+        'autoscale': bool(options['autoscale']),
+        'sent_messages': sent,
+        'achieved_send_rate': round(pacing['achieved_rate'], 2),
+        'frames_per_s': round((end['messages'] - start['messages']) / elapsed, 2),
+        'crops_per_s': round((end['crops'] - start['crops']) / elapsed, 2),
+        'decode_attempts_per_s': round((end['attempts'] - start['attempts']) / elapsed, 2),
+        'results_per_s': round((end['decoded'] - start['decoded']) / elapsed, 2),
+        'dropped_messages': max(0, sent - received),
+        'lost_frames': drained['lost_frames'] - start['lost_frames'],
+        'decoder_dropped': drained['dbr_dropped'] - start['dbr_dropped'],
+        'decoder_backlog': end['queue_depth'],
+        'decode_workers': end['decode_workers'],
+        'ring_read_retries': drained['ring_retries'] - start['ring_retries'],
+        'ring_failed_reads': drained['ring_failed'] - start['ring_failed'],
+        'decode_avg_ms': round((end['decode_ms'] - start['decode_ms']) / attempts, 2) if attempts else None,
+        'prep_avg_ms': round((end['prep_ms'] - start['prep_ms']) / attempts, 2) if attempts else None,
+        'cpu_percent': round((end['cpu_s'] - start['cpu_s']) / elapsed * 100.0, 1),
+        'rss_mb': round(end['rss_mb'], 1) if end['rss_mb'] is not None else None,
+        'acked': len(latencies),
+        'latency_p50_ms': _percentile(latencies, 0.50),
+        'latency_p95_ms': _percentile(latencies, 0.95),
+        'latency_p99_ms': _percentile(latencies, 0.99),
+        'latency_max_ms': max(latencies) if latencies else None,
+    }
+    print(f"📊 接收 {result['frames_per_s']:.1f} 帧/s，{result['crops_per_s']:.1f} 裁剪/s，"
+          f"识别 {result['results_per_s']:.1f} 结果/s，丢帧 {result['dropped_messages']}，"
+          f"识别丢弃 {result['decoder_dropped']}，CPU {result['cpu_percent']:.0f}%，RSS {result['rss_mb']} MB，"
+          f"延迟 P50 {result['latency_p50_ms']} / P99 {result['latency_p99_ms']} ms")
+    return result
+
+
+# 对比时关注的指标：(键, 越大越好)
+COMPARE_METRICS = [
+    ('frames_per_s', True),
+    ('crops_per_s', True),
+    ('results_per_s', True),
+    ('dropped_messages', False),
+    ('decode_avg_ms', False),
+    ('cpu_percent', False),
+    ('rss_mb', False),
+    ('latency_p50_ms', False),
+    ('latency_p99_ms', False),
+]
+
+
+def _scenario_key(result):
+    # 不含识别输入方式：gray 的结果可直接与 jpeg 基线对比
+    return (result['rate'], result['cameras'], result['crops'], result['crop_size'], result['decoder'])
+
+
+def compare_results(current, baseline_path):
+    """与之前的结果文件逐场景对比，打印变化百分比"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    base_by_key = {_scenario_key(r): r for r in baseline.get('scenarios', [])}
+    print(f"\n🔎 对比基线 {baseline_path}（提交 {baseline.get('meta', {}).get('commit', '?')}）")
+    for result in current['scenarios']:
+        base = base_by_key.get(_scenario_key(result))
+        if base is None:
+            print(f"  {_scenario_key(result)}: 基线中没有该场景")
+            continue
+        parts = []
+        for key, higher_better in COMPARE_METRICS:
+            old, new = base.get(key), result.get(key)
+            if old is None or new is None:
+                continue
+            if old == 0:
+                change = 0.0 if new == 0 else float('inf')
+            else:
+                change = (new - old) / abs(old) * 100.0
+            better = (change > 0) == higher_better
+            mark = "✅" if abs(change) < 5 or better else "❌"
+            parts.append(f"{key} {old}→{new} ({change:+.1f}%){mark}")
+        print(f"  {result['rate']:g} 帧/s {result['crop_size']} ×{result['cameras'] * result['crops']}: " + "，".join(parts))
+
+
+def main():
+    import argparse
+    from load_generator import parse_size
+
+    parser = argparse.ArgumentParser(description='接收-识别流水线端到端基准测试')
+    parser.add_argument('--rates', default='20,50,100', help='发送速率列表（帧/s），逗号分隔')
+    parser.add_argument('--crop-sizes', default='320x320', help='裁剪尺寸列表，逗号分隔')
+    parser.add_argument('--crops', type=int, default=4, help='每个相机每帧的裁剪数')
+    parser.add_argument('--cameras', type=int, default=1, help='相机数')
+    parser.add_argument('--quality', type=int, default=80, help='JPEG质量')
+    parser.add_argument('--duration', type=float, default=10.0, help='每个场景的测量时长（秒）')
+    parser.add_argument('--warmup', type=float, default=2.0, help='每个场景的预热时长（秒）')
+    parser.add_argument('--drain', type=float, default=2.0, help='测量结束后等待在途消息的时长（秒）')
+    parser.add_argument('--decoder', choices=DECODER_BACKENDS + ('none',), default='stub', help='解码后端')
+    parser.add_argument('--decode-input', choices=DECODE_INPUTS, default='jpeg',
+                        help='识别输入：jpeg 直接喂JPEG字节；gray 灰度解码+ROI裁剪后喂原始缓冲区')
+    parser.add_argument('--decode-scale', type=float, default=1.0, help='gray 输入的缩小比例')
+    parser.add_argument('--sampling', choices=SAMPLING_MODES, default='off', help='识别背压下的自适应抽帧方式')
+    parser.add_argument('--track', action='store_true', help='启用跨帧码跟踪')
+    parser.add_argument('--autoscale', action='store_true', default=None, help='识别线程池自动伸缩（--dbr-threads 为初始线程数）')
+    parser.add_argument('--stub-ms', type=float, default=5.0, help='替身解码器单次耗时（毫秒）')
+    parser.add_argument('--stub-hit-rate', type=float, default=0.8, help='替身解码器识别出结果的比例')
+    parser.add_argument('--dbr-threads', type=int, help='识别线程数（默认取配置 MaxParallelTasks）')
+    parser.add_argument('--port', type=int, default=DEFAULT_BENCH_PORT, help='接收器数据端口（ACK端口为+1）')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help='结果JSON路径（默认 bench_results/bench_<提交>_<时间>.json）')
+    parser.add_argument('--compare', help='与之前的结果JSON对比')
+    args = parser.parse_args()
+
+    from turbojpeg import TurboJPEG
+    jpeg = TurboJPEG()
+
+    options = {
+        'decoder': args.decoder,
+        'decode_input': args.decode_input,
+        'decode_scale': args.decode_scale,
+        'sampling': args.sampling,
+        'tracking': args.track,
+        'autoscale': args.autoscale,
+        'stub_ms': args.stub_ms,
+        'stub_hit_rate': args.stub_hit_rate,
+        'dbr_threads': args.dbr_threads,
+        'port': args.port,
+        'ack_port': args.port + 1,
+        'quality': args.quality,
+        'seed': args.seed,
+        'duration': args.duration,
+        'warmup': args.warmup,
+        'drain': args.drain,
+    }
+    commit = git_commit()
+    results = {
+        'meta': {
+            'commit': commit,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'options': options,
+        },
+        'scenarios': [],
+    }
+
+    for crop_size in args.crop_sizes.split(','):
+        for rate in args.rates.split(','):
+            scenario = {'rate': float(rate), 'crop_size': parse_size(crop_size),
+                        'cameras': args.cameras, 'crops': args.crops}
+            results['scenarios'].append(run_scenario(scenario, options, jpeg))
+
+    out_path = args.out
+    if not out_path:
+        os.makedirs(RESULT_DIR, exist_ok=True)
+        out_path = os.path.join(RESULT_DIR, f"bench_{commit}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 结果已写入: {out_path}")
+
+    if args.compare:
+        compare_results(results, args.compare)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,6 +3,9 @@
 """
 使用 PyInstaller 构建 AppImage 的 Python 脚本
 更精确的依赖控制和错误处理
+
+    python3 build_appimage.py            # AppImage 内放单文件可执行程序
+    python3 build_appimage.py --onedir   # AppImage 内放 PyInstaller 目录版，启动时不再二次解压，冷启动更快
 """
 
 import os
@@ -49,8 +52,10 @@ def check_dependencies():
             return False
     return True
 
-def build_with_pyinstaller():
-    """使用 PyInstaller 打包"""
+def build_with_pyinstaller(onedir=False):
+    """使用 PyInstaller 打包
+    onedir=True 时生成目录版 dist/QRViewer/：AppImage 本身已经是挂载的镜像，
+    里面再放单文件程序等于每次启动都要把全部依赖再解压到 /tmp 一遍"""
     print("📦 使用 PyInstaller 打包应用...")
     
     # 准备 PyInstaller 参数
@@ -80,7 +85,7 @@ def build_with_pyinstaller():
     cmd = [
         'pyinstaller',
         '--name', APP_NAME,
-        '--onefile',
+        '--onedir' if onedir else '--onefile',
         '--windowed',  # 无控制台窗口
         f'--add-data={config_file}{os.pathsep}config',  # 使用os.pathsep兼容Windows和Linux
         '--hidden-import=tkinter',
@@ -110,15 +115,15 @@ def build_with_pyinstaller():
         print("❌ PyInstaller 构建失败")
         return False
     
-    executable = DIST_DIR / APP_NAME
-    if not executable.exists():
+    executable = DIST_DIR / APP_NAME / APP_NAME if onedir else DIST_DIR / APP_NAME
+    if not executable.is_file():
         print(f"❌ 错误: 找不到生成的可执行文件 {executable}")
         return False
     
     print(f"✅ PyInstaller 构建成功: {executable}")
     return True
 
-def create_appdir():
+def create_appdir(onedir=False):
     """创建 AppDir 结构"""
     print("📁 创建 AppDir 结构...")
     
@@ -132,22 +137,31 @@ def create_appdir():
     (APP_DIR / "usr/share/applications").mkdir(parents=True)
     (APP_DIR / "usr/share/icons/hicolor/256x256/apps").mkdir(parents=True)
     
-    # 复制可执行文件
-    executable = DIST_DIR / APP_NAME
-    if executable.exists():
-        shutil.copy2(executable, APP_DIR / "usr/bin" / APP_NAME)
-        os.chmod(APP_DIR / "usr/bin" / APP_NAME, 0o755)
+    # 复制可执行文件（目录版复制整个目录到 usr/lib/QRViewer，AppRun 直接启动其中的程序）
+    if onedir:
+        program_dir = DIST_DIR / APP_NAME
+        if not (program_dir / APP_NAME).is_file():
+            print(f"❌ 错误: 找不到可执行文件 {program_dir / APP_NAME}")
+            return False
+        shutil.copytree(program_dir, APP_DIR / "usr/lib" / APP_NAME, symlinks=True)
+        exec_path = f"usr/lib/{APP_NAME}/{APP_NAME}"
     else:
-        print(f"❌ 错误: 找不到可执行文件 {executable}")
-        return False
+        executable = DIST_DIR / APP_NAME
+        if executable.exists():
+            shutil.copy2(executable, APP_DIR / "usr/bin" / APP_NAME)
+        else:
+            print(f"❌ 错误: 找不到可执行文件 {executable}")
+            return False
+        exec_path = f"usr/bin/{APP_NAME}"
+    os.chmod(APP_DIR / exec_path, 0o755)
     
     # 复制配置文件（尝试多个位置）
     config_file = SCRIPT_DIR / "camera_config.json"
     if not config_file.exists():
         config_file = SCRIPT_DIR / "config" / "camera_config.json"
     
-    # 创建配置目录
-    config_target_dir = APP_DIR / "usr/bin" / "config"
+    # 创建配置目录（放在程序旁边）
+    config_target_dir = (APP_DIR / exec_path).parent / "config"
     config_target_dir.mkdir(parents=True, exist_ok=True)
     
     if config_file.exists():
@@ -167,7 +181,7 @@ def create_appdir():
 HERE="$(dirname "$(readlink -f "${{0}}")")"
 export PATH="${{HERE}}/usr/bin:${{PATH}}"
 export LD_LIBRARY_PATH="${{HERE}}/usr/lib:${{LD_LIBRARY_PATH}}"
-exec "${{HERE}}/usr/bin/{APP_NAME}" --dbr "$@"
+exec "${{HERE}}/{exec_path}" --dbr "$@"
 '''
     with open(APP_DIR / "AppRun", 'w') as f:
         f.write(apprun_content)
@@ -283,7 +297,14 @@ def create_appimage():
 
 def main():
     """主函数"""
-    print(f"🚀 开始构建 {APP_NAME} AppImage...")
+    import argparse
+    
+    parser = argparse.ArgumentParser(description=f'构建 {APP_NAME} AppImage')
+    parser.add_argument('--onedir', action='store_true',
+                       help='AppImage 内使用目录版程序（不再二次解压，冷启动更快）')
+    args = parser.parse_args()
+    
+    print(f"🚀 开始构建 {APP_NAME} AppImage{'（目录版）' if args.onedir else ''}...")
     
     # 清理旧的构建文件
     if BUILD_DIR.exists():
@@ -305,11 +326,11 @@ def main():
         print("⚠️  依赖检查失败，但继续尝试构建...")
     
     # 构建步骤
-    if not build_with_pyinstaller():
+    if not build_with_pyinstaller(onedir=args.onedir):
         print("❌ 构建失败")
         return 1
     
-    if not create_appdir():
+    if not create_appdir(onedir=args.onedir):
         print("❌ AppDir 创建失败")
         return 1
     
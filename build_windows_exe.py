@@ -3,6 +3,9 @@
 """
 使用 PyInstaller 构建 Windows 64位 exe 的 Python 脚本
 需要在 Windows 环境下运行
+
+    python build_windows_exe.py            # 单文件 dist/QRViewer.exe
+    python build_windows_exe.py --onedir   # 目录版 dist/QRViewer/QRViewer.exe，启动时不用再解压，冷启动更快
 """
 
 import os
@@ -74,8 +77,16 @@ def check_dependencies(auto_install=False):
     
     return True
 
-def build_with_pyinstaller():
-    """使用 PyInstaller 打包"""
+def executable_path(onedir=False):
+    """生成的 exe 路径：单文件在 dist/ 下，目录版在 dist/QRViewer/ 下"""
+    if onedir:
+        return DIST_DIR / APP_NAME / f"{APP_NAME}.exe"
+    return DIST_DIR / f"{APP_NAME}.exe"
+
+def build_with_pyinstaller(onedir=False):
+    """使用 PyInstaller 打包
+    onedir=True 时生成目录版：单文件 exe 每次启动都要把几百MB依赖解压到临时目录，
+    目录版直接从安装目录加载，冷启动明显更快"""
     print("📦 使用 PyInstaller 打包应用...")
     
     # 准备 PyInstaller 参数
@@ -105,7 +116,7 @@ def build_with_pyinstaller():
     cmd = [
         'pyinstaller',
         '--name', APP_NAME,
-        '--onefile',
+        '--onedir' if onedir else '--onefile',
         '--windowed',  # 无控制台窗口
         f'--add-data={config_file}{os.pathsep}config',  # Windows 使用分号
         '--hidden-import=tkinter',
@@ -141,15 +152,15 @@ def build_with_pyinstaller():
         print("❌ PyInstaller 构建失败")
         return False
     
-    executable = DIST_DIR / f"{APP_NAME}.exe"
+    executable = executable_path(onedir)
     if not executable.exists():
         print(f"❌ 错误: 找不到生成的可执行文件 {executable}")
         return False
     
     print(f"✅ PyInstaller 构建成功: {executable}")
     
-    # 复制配置文件到 dist 目录（可选，因为已经打包到 exe 中）
-    config_target_dir = DIST_DIR / "config"
+    # 复制配置文件到 exe 所在目录（可选，因为已经打包到 exe 中）
+    config_target_dir = executable.parent / "config"
     config_target_dir.mkdir(exist_ok=True)
     if config_file.exists():
         shutil.copy2(config_file, config_target_dir / "camera_config.json")
@@ -160,7 +171,7 @@ def build_with_pyinstaller():
     bat_content = f'''@echo off
 REM {APP_NAME} 启动器 - 自动启用DBR识别
 cd /d "%~dp0"
-start "" "{APP_NAME}.exe" --dbr %*
+start "" "{executable.relative_to(DIST_DIR)}" --dbr %*
 '''
     with open(launcher_bat, 'w', encoding='gbk') as f:
         f.write(bat_content)
@@ -168,16 +179,20 @@ start "" "{APP_NAME}.exe" --dbr %*
     
     return True
 
-def create_installer_package():
+def create_installer_package(onedir=False):
     """创建安装包（可选，使用 Inno Setup 或其他工具）"""
     print("📦 创建安装包...")
-    executable = DIST_DIR / f"{APP_NAME}.exe"
+    executable = executable_path(onedir)
     if not executable.exists():
         print("❌ 找不到可执行文件，跳过安装包创建")
         return False
     
-    size = executable.stat().st_size / (1024 * 1024)
-    print(f"✅ 可执行文件大小: {size:.2f} MB")
+    if onedir:
+        size = sum(f.stat().st_size for f in executable.parent.rglob('*') if f.is_file()) / (1024 * 1024)
+        print(f"✅ 程序目录大小: {size:.2f} MB（分发时复制整个 {executable.parent.name} 目录）")
+    else:
+        size = executable.stat().st_size / (1024 * 1024)
+        print(f"✅ 可执行文件大小: {size:.2f} MB")
     print(f"📦 可执行文件位置: {executable}")
     print("\n💡 提示: 可以使用 Inno Setup 或 NSIS 创建安装程序")
     return True
@@ -189,6 +204,8 @@ def main():
     parser = argparse.ArgumentParser(description=f'构建 {APP_NAME} Windows exe')
     parser.add_argument('--install-deps', action='store_true', 
                        help='自动安装缺失的依赖包')
+    parser.add_argument('--onedir', action='store_true',
+                       help='构建目录版（不用每次启动解压，冷启动更快）')
     args = parser.parse_args()
     
     print(f"🚀 开始构建 {APP_NAME} Windows 64位 exe...")
@@ -229,15 +246,15 @@ def main():
         print("⚠️  依赖检查失败，但继续尝试构建...")
     
     # 构建步骤
-    if not build_with_pyinstaller():
+    if not build_with_pyinstaller(onedir=args.onedir):
         print("❌ 构建失败")
         return 1
     
-    if not create_installer_package():
+    if not create_installer_package(onedir=args.onedir):
         print("⚠️  安装包创建失败，但 exe 文件已生成")
     
     print("\n🎉 构建完成！")
-    print(f"📦 exe 文件位置: {DIST_DIR / f'{APP_NAME}.exe'}")
+    print(f"📦 exe 文件位置: {executable_path(args.onedir)}")
     return 0
 
 if __name__ == '__main__':
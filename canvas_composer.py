@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OpenCV 显示窗口的画布合成（simple_receiver.py 使用）
+原来每帧都 np.zeros 新建整块画布、拷入图像、np.ascontiguousarray，再用 getTextSize/putText 重画全部覆盖层；
+现在：
+    画布池    按窗口尺寸缓存预分配的画布（连续内存），每帧只清零复用
+    静态图层  边框、控制提示、翻页箭头等不随帧变化的内容，按 (图层, 窗口尺寸) 只渲染一次，
+              保存为 图层图像 + 掩码，每帧用一次 cv2.copyTo（OpenCV 内部 SIMD 优化）整体叠加，
+              抗锯齿文字边缘的少量半覆盖像素再按覆盖率做一次向量化混合
+    动态内容  帧号、检测信息、DBR结果、连接指示灯等仍由调用方每帧 putText 绘制
+
+    composer = CanvasComposer()
+    canvas = composer.canvas(w, h)                 # 已清零的复用画布
+    composer.place(canvas, bgr_image)             # 居中放置（大图缩放适配）
+    composer.blend(canvas, 'frame', paint_frame)  # 叠加静态图层，paint_frame(img) 只在第一次调用
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_MAX_SIZES = 4  # 最多缓存几种窗口尺寸（拖动窗口大小时尺寸会不断变化，只保留最近的）
+
+
+class CanvasComposer:
+    """按窗口尺寸复用画布，静态图层预渲染后一次性叠加"""
+
+    def __init__(self, max_sizes=DEFAULT_MAX_SIZES):
+        self.max_sizes = max(1, int(max_sizes))
+        self.canvases = OrderedDict()  # (w, h) -> 画布
+        self.layers = OrderedDict()  # (图层名, w, h) -> layer() 的返回值
+
+        # 统计
+        self.canvas_allocs = 0
+        self.layer_renders = 0
+
+    @staticmethod
+    def _remember(cache, key, value, limit):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > limit:
+            cache.popitem(last=False)
+
+    def canvas(self, width, height):
+        """取指定尺寸的复用画布并清零（调用方在下一次 canvas() 之前使用完毕）"""
+        key = (width, height)
+        canvas = self.canvases.get(key)
+        if canvas is None:
+            canvas = np.zeros((height, width, 3), dtype=np.uint8)
+            self.canvas_allocs += 1
+            self._remember(self.canvases, key, canvas, self.max_sizes)
+        else:
+            self.canvases.move_to_end(key)
+            canvas.fill(0)
+        return canvas
+
+    def layer(self, name, width, height, painter):
+        """取静态图层 (图层图像, 不透明掩码, 半透明像素, 附加信息)；第一次时渲染并缓存。
+        painter(img) 分别在黑底和白底上各调用一次，两次结果之差就是每个像素的覆盖率：
+        完全覆盖的像素直接拷贝，抗锯齿边缘等半覆盖像素记下位置和覆盖率单独混合，没画到的像素保持透明。
+        painter 的返回值作为附加信息一起缓存（例如箭头的点击区域）"""
+        key = (name, width, height)
+        cached = self.layers.get(key)
+        if cached is None:
+            image = np.zeros((height, width, 3), dtype=np.uint8)
+            info = painter(image)
+            on_white = np.full((height, width, 3), 255, dtype=np.uint8)
+            painter(on_white)
+            # 覆盖率 0..255：黑底结果 = 颜色×覆盖率（预乘），白底结果 = 颜色×覆盖率 + 255×(1-覆盖率)
+            coverage = 255 - (on_white.astype(np.int16) - image).max(axis=2)
+            mask = np.where(coverage >= 255, 255, 0).astype(np.uint8)
+            partial = np.flatnonzero((coverage > 0) & (coverage < 255))
+            partial_keep = (1.0 - coverage.ravel()[partial] / 255.0).astype(np.float32)[:, None]
+            partial_color = image.reshape(-1, 3)[partial].astype(np.float32)
+            cached = (image, mask, (partial, partial_keep, partial_color), info)
+            self.layer_renders += 1
+            # 每种尺寸通常有几个图层（边框、箭头组合），缓存上限按尺寸数放大
+            self._remember(self.layers, key, cached, self.max_sizes * 8)
+        else:
+            self.layers.move_to_end(key)
+        return cached
+
+    def blend(self, canvas, name, painter):
+        """把静态图层叠加到画布上（一次 cv2.copyTo + 少量边缘像素的向量化混合），返回图层的附加信息"""
+        import cv2
+        height, width = canvas.shape[:2]
+        image, mask, (partial, partial_keep, partial_color), info = self.layer(name, width, height, painter)
+        cv2.copyTo(image, mask, canvas)
+        if partial.size:
+            pixels = canvas.reshape(-1, 3)  # 画布是连续内存，reshape 是视图
+            pixels[partial] = (pixels[partial] * partial_keep + partial_color).astype(np.uint8)
+        return info
+
+    @staticmethod
+    def place(canvas, image):
+        """把图像居中放到画布上：不超过画布时原尺寸居中，否则等比缩放适配，返回显示尺寸 (宽, 高)"""
+        canvas_height, canvas_width = canvas.shape[:2]
+        height, width = image.shape[:2]
+        if width > canvas_width or height > canvas_height:
+            import cv2
+            scale = min(canvas_width / width, canvas_height / height)
+            width, height = int(width * scale), int(height * scale)
+            image = cv2.resize(image, (width, height))
+        x_offset = (canvas_width - width) // 2
+        y_offset = (canvas_height - height) // 2
+        canvas[y_offset:y_offset + height, x_offset:x_offset + width] = image
+        return width, height
+
+    def get_stats(self):
+        return {
+            'canvases': len(self.canvases),
+            'canvas_allocs': self.canvas_allocs,
+            'layers': len(self.layers),
+            'layer_renders': self.layer_renders,
+        }
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+识别结果倒排索引：码内容 / 商品信息 -> 出现过的槽位和帧
+识别结果回写槽位时增量加入（ReceiverCore._store_result），槽位被新数据覆盖时同步移除（与环形槽位一起淘汰），
+所以索引里只有当前还能显示的帧。界面按内容搜索、点击汇总行时直接取命中列表，每次跳转 O(1)，不扫描槽位。
+
+    index = CodeIndex()
+    index.add(text, fmt, recv_seq, slot_index, frame_sequence, position)
+    index.evict_slot(slot_index)       # 接收线程覆盖槽位前调用
+    hits = index.lookup(text)          # 完整内容或商品信息，按时间先后排列
+    keys = index.search("ABC")         # 子串匹配的索引键
+"""
+
+import threading
+from collections import namedtuple
+
+CodeHit = namedtuple('CodeHit', 'recv_seq slot_index frame_sequence position fmt text')
+
+
+def product_key(text):
+    """商品信息键：URL 取最后一段，其它取前50个字符（与界面汇总表一致）"""
+    if text.startswith('HTTPS://') or text.startswith('HTTP://'):
+        return text.split('/')[-1][:50] if '/' in text else text[:50]
+    return text[:50]
+
+
+class CodeIndex:
+    """线程安全：识别线程 add()，接收线程 evict_slot()，界面线程 lookup()/search()"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_key = {}  # 键 -> {recv_seq: CodeHit}（dict 保持插入顺序，即时间先后）
+        self.by_slot = {}  # 槽位 -> (recv_seq, [键])，用于覆盖时移除
+        self.added = 0  # 加入/移除的 (键, 命中) 条数
+        self.evicted = 0
+
+    def add(self, text, fmt, recv_seq, slot_index, frame_sequence=None, position=None):
+        if not text:
+            return
+        hit = CodeHit(recv_seq, slot_index, frame_sequence, position, fmt, text)
+        keys = {text, product_key(text)}
+        with self.lock:
+            owner = self.by_slot.get(slot_index)
+            if owner is None or owner[0] != recv_seq:
+                # 槽位里是新数据：旧数据的索引在覆盖时应已移除，这里兜底
+                self._evict_locked(slot_index)
+                owner = (recv_seq, [])
+                self.by_slot[slot_index] = owner
+            for key in keys:
+                self.by_key.setdefault(key, {})[recv_seq] = hit
+                if key not in owner[1]:
+                    owner[1].append(key)
+                self.added += 1
+
+    def evict_slot(self, slot_index):
+        """槽位即将被覆盖：移除其中旧数据的全部索引"""
+        with self.lock:
+            self._evict_locked(slot_index)
+
+    def _evict_locked(self, slot_index):
+        owner = self.by_slot.pop(slot_index, None)
+        if owner is None:
+            return
+        recv_seq, keys = owner
+        for key in keys:
+            hits = self.by_key.get(key)
+            if hits is None:
+                continue
+            if hits.pop(recv_seq, None) is not None:
+                self.evicted += 1
+            if not hits:
+                del self.by_key[key]
+
+    def lookup(self, key):
+        """完整内容或商品信息的全部命中（按时间先后）"""
+        with self.lock:
+            return list(self.by_key.get(key, {}).values())
+
+    def search(self, fragment, limit=50):
+        """包含 fragment 的索引键（区分大小写；键的数量远小于帧数）"""
+        with self.lock:
+            keys = [key for key in self.by_key if fragment in key]
+        return sorted(keys)[:limit]
+
+    def clear(self):
+        with self.lock:
+            self.by_key.clear()
+            self.by_slot.clear()
+
+    def get_stats(self):
+        with self.lock:
+            return {'keys': len(self.by_key), 'slots': len(self.by_slot), 'added': self.added,
+                    'evicted': self.evicted}
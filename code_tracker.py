@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨帧码跟踪：避免同一个标签在连续裁剪中被反复完整识别
+无人机飞过货架时同一个码会出现在很多连续裁剪里。识别结果的定位（四角点）换算到整帧坐标后
+按 (相机, 文本) 建立轨迹，结合元数据中的 pose/yaw_deg 预测它在后续帧中的位置：
+    裁剪区域基本被已知码的预测框覆盖    -> 跳过识别（剩余面积放不下一个新码）
+    裁剪区域中部分是已知码              -> 只识别新区域（灰度输入时把已知码区域涂白）
+    没有已知码                          -> 正常完整识别
+
+位置预测：
+    每个相机维护一个线性运动模型  像素位移 = A · 机体坐标系下的位移（按 yaw 旋转后的 x/y），
+    A 用重复识别到的码的 (位移, 像素位移) 做最小二乘；
+    位姿没有变化或样本不足时，退回按轨迹自身的像素速度（像素/秒）外推。
+"""
+
+import math
+import threading
+import time
+import numpy as np
+
+
+def _pose_of(metadata):
+    """元数据 -> (相机id, 位置xy, yaw弧度)"""
+    camera = (metadata.get('camera') or {}).get('id', 0)
+    position = (metadata.get('pose') or {}).get('position') or [0.0, 0.0, 0.0]
+    xy = np.array([float(position[0]), float(position[1])]) if len(position) >= 2 else np.zeros(2)
+    return camera, xy, math.radians(float(metadata.get('yaw_deg', 0.0) or 0.0))
+
+
+def _body_delta(xy_from, xy_to, yaw):
+    """世界坐标位移旋转到机体坐标系"""
+    dx, dy = xy_to - xy_from
+    c, s = math.cos(yaw), math.sin(yaw)
+    return np.array([c * dx + s * dy, -s * dx + c * dy])
+
+
+def _overlap(a, b):
+    """两个 (x0, y0, x1, y1) 框的相交框，不相交返回 None"""
+    x0, y0 = max(a[0], b[0]), max(a[1], b[1])
+    x1, y1 = min(a[2], b[2]), min(a[3], b[3])
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return x0, y0, x1, y1
+
+
+class CodeTracker:
+    """识别线程调用 update() 写入结果，接收线程调用 plan() 决定如何处理下一个裁剪"""
+
+    def __init__(self, max_age=2.0, margin=0.25, skip_coverage=0.75, min_pose_delta=0.01):
+        self.max_age = max_age  # 轨迹超过该时间没有再识别到就丢弃（秒）
+        self.margin = margin  # 预测框外扩比例（吸收预测误差）
+        self.skip_coverage = skip_coverage  # 裁剪被已知码覆盖的比例达到该值时跳过识别
+        self.min_pose_delta = min_pose_delta  # 位姿变化小于该值（米）视为没有移动
+
+        self.lock = threading.Lock()
+        self.tracks = {}  # (相机, 文本) -> 轨迹
+        self.motion = {}  # 相机 -> {'dd': 2x2, 'sd': 2x2, 'n', 'A'}
+
+        # 统计
+        self.skipped = 0
+        self.restricted = 0
+        self.full = 0
+        self.reobserved = 0
+        self.new_codes = 0
+
+    def _learn_motion(self, camera, body_delta, pixel_shift):
+        model = self.motion.setdefault(camera, {'dd': np.zeros((2, 2)), 'sd': np.zeros((2, 2)), 'n': 0, 'A': None})
+        model['dd'] += np.outer(body_delta, body_delta)
+        model['sd'] += np.outer(pixel_shift, body_delta)
+        model['n'] += 1
+        if model['n'] >= 3 and abs(np.linalg.det(model['dd'])) > 1e-9:
+            model['A'] = model['sd'] @ np.linalg.inv(model['dd'])
+        elif model['n'] >= 3:
+            # 只沿一个方向移动（沿货架直飞）：按该方向的一维最小二乘
+            direction = body_delta / (np.linalg.norm(body_delta) or 1.0)
+            denom = direction @ model['dd'] @ direction
+            if denom > 1e-9:
+                model['A'] = np.outer(model['sd'] @ direction / denom, direction)
+
+    def _predict_center(self, track, xy, yaw, now):
+        delta = _body_delta(track['xy'], xy, yaw)
+        model = self.motion.get(track['camera'])
+        if np.linalg.norm(delta) >= self.min_pose_delta and model is not None and model['A'] is not None:
+            return track['center'] + model['A'] @ delta
+        return track['center'] + track['velocity'] * (now - track['time'])
+
+    def update(self, metadata, items, origin=(0, 0), scale=1.0, now=None):
+        """写入一次识别结果；items 中带 'points'（识别输入图像坐标）的才参与跟踪"""
+        if not metadata:
+            return
+        now = now if now is not None else time.time()
+        camera, xy, yaw = _pose_of(metadata)
+        with self.lock:
+            for item in items:
+                points = item.get('points')
+                text = item.get('text')
+                if not points or not text:
+                    continue
+                pts = np.asarray(points, dtype=float) / scale + np.asarray(origin, dtype=float)
+                x0, y0 = pts.min(axis=0)
+                x1, y1 = pts.max(axis=0)
+                center = np.array([(x0 + x1) / 2.0, (y0 + y1) / 2.0])
+                size = np.array([x1 - x0, y1 - y0])
+                key = (camera, text)
+                track = self.tracks.get(key)
+                if track is None:
+                    self.new_codes += 1
+                    self.tracks[key] = {'camera': camera, 'center': center, 'size': size, 'xy': xy, 'yaw': yaw,
+                                        'time': now, 'velocity': np.zeros(2), 'hits': 1}
+                    continue
+                self.reobserved += 1
+                shift = center - track['center']
+                delta = _body_delta(track['xy'], xy, yaw)
+                if np.linalg.norm(delta) >= self.min_pose_delta:
+                    self._learn_motion(camera, delta, shift)
+                dt = now - track['time']
+                if dt > 0:
+                    track['velocity'] = 0.5 * track['velocity'] + 0.5 * shift / dt
+                track.update(center=center, size=size, xy=xy, yaw=yaw, time=now)
+                track['hits'] += 1
+
+    def plan(self, metadata, now=None):
+        """决定一个裁剪的处理方式，返回 (动作, 已知码框列表)
+        动作：'skip' 跳过识别；'restrict' 识别但屏蔽已知码框（整帧坐标）；'full' 完整识别"""
+        roi = (metadata or {}).get('roi')
+        if not roi or not self.tracks:
+            return 'full', []
+        now = now if now is not None else time.time()
+        camera, xy, yaw = _pose_of(metadata)
+        x, y, w, h = roi.get('x', 0), roi.get('y', 0), roi.get('width', 0), roi.get('height', 0)
+        roi_box = (x, y, x + w, y + h)
+        roi_area = float(w * h) or 1.0
+
+        boxes = []
+        covered = 0.0
+        min_code_area = None
+        with self.lock:
+            for key, track in list(self.tracks.items()):
+                if now - track['time'] > self.max_age:
+                    del self.tracks[key]
+                    continue
+                if track['camera'] != camera:
+                    continue
+                cx, cy = self._predict_center(track, xy, yaw, now)
+                half_w, half_h = track['size'] * (0.5 + self.margin)
+                inter = _overlap(roi_box, (cx - half_w, cy - half_h, cx + half_w, cy + half_h))
+                if inter is None:
+                    continue
+                boxes.append(tuple(int(v) for v in inter))
+                covered += (inter[2] - inter[0]) * (inter[3] - inter[1])
+                code_area = track['size'][0] * track['size'][1]
+                min_code_area = code_area if min_code_area is None else min(min_code_area, code_area)
+
+            if not boxes:
+                self.full += 1
+                return 'full', []
+            # 已知码覆盖了大部分裁剪，或剩下的面积放不下一个同样大小的新码
+            if covered / roi_area >= self.skip_coverage or roi_area - covered < min_code_area:
+                self.skipped += 1
+                return 'skip', boxes
+            self.restricted += 1
+            return 'restrict', boxes
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'tracks': len(self.tracks),
+                'new_codes': self.new_codes,
+                'reobserved': self.reobserved,
+                'skipped': self.skipped,
+                'restricted': self.restricted,
+                'full': self.full,
+                'motion_models': sum(1 for m in self.motion.values() if m['A'] is not None),
+            }
+
+
+def mask_known_regions(gray, boxes, origin, scale):
+    """把已知码框（整帧坐标）在识别输入灰度图上涂白，解码器只在新区域里找码"""
+    height, width = gray.shape[:2]
+    for x0, y0, x1, y1 in boxes:
+        gx0 = max(0, int((x0 - origin[0]) * scale))
+        gy0 = max(0, int((y0 - origin[1]) * scale))
+        gx1 = min(width, int(math.ceil((x1 - origin[0]) * scale)))
+        gy1 = min(height, int(math.ceil((y1 - origin[1]) * scale)))
+        if gx1 > gx0 and gy1 > gy0:
+            gray[gy0:gy1, gx0:gx1] = 255
+    return gray
+
+
+def format_tracker_stats(stats):
+    """格式化跟踪统计，用于周期性打印"""
+    return (f"轨迹 {stats['tracks']}，新码 {stats['new_codes']}，重复识别 {stats['reobserved']}，"
+            f"跳过 {stats['skipped']}，只识别新区域 {stats['restricted']}，完整识别 {stats['full']}")
+
+
+def create_tracker(enabled=None, config=None):
+    """按 参数 > 配置文件 "CodeTracking" > 默认关闭 创建跟踪器；关闭返回 None"""
+    config = config or {}
+    enabled = enabled if enabled is not None else config.get('CodeTracking', False)
+    if not enabled:
+        return None
+    return CodeTracker(max_age=config.get('TrackMaxAge', 2.0), margin=config.get('TrackMargin', 0.25))
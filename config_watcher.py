@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+配置文件热加载（receiver_core.ReceiverCore.watch_config 使用）
+后台线程每秒检查一次配置文件的修改时间和大小，变化后重新读取，把变化的键交给回调；不依赖 watchdog 等第三方库。
+编辑器保存到一半时 JSON 不完整：读取失败则保持旧配置，下一次检查再重试，不会把半个文件当成"删掉了所有键"。
+
+    watcher = ConfigWatcher(path, config, on_change)   # on_change(新配置, [变化的键])，在监视线程中调用
+    watcher.start()
+    watcher.close()
+"""
+
+import json
+import os
+import threading
+
+POLL_INTERVAL = 1.0  # 检查间隔（秒）
+
+
+def diff_config(old, new):
+    """两份配置之间值不同（含新增、删除）的键，按名称排序"""
+    return sorted(key for key in set(old) | set(new) if old.get(key) != new.get(key))
+
+
+class ConfigWatcher:
+    """轮询配置文件的修改时间，变化后重新加载并回调"""
+
+    def __init__(self, path, config, on_change, interval=POLL_INTERVAL):
+        self.path = path
+        self.config = dict(config)  # 上一次成功加载的配置
+        self.on_change = on_change
+        self.interval = interval
+        self.stamp = self._stamp()
+        self.reloads = 0
+        self.errors = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._watch_loop, daemon=True, name="ConfigWatcher")
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.stop_event.set()
+
+    def _stamp(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None  # 文件不存在（之后创建也能检测到）
+
+    def _watch_loop(self):
+        while not self.stop_event.wait(self.interval):
+            stamp = self._stamp()
+            if stamp != self.stamp and self.check():
+                self.stamp = stamp
+
+    def check(self):
+        """重新读取配置文件，有变化时回调；读取失败返回 False（保持旧配置，下次重试）"""
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    config = json.load(f)
+            else:
+                config = {}
+        except Exception as e:
+            self.errors += 1
+            if self.errors == 1 or self.errors % 30 == 0:
+                print(f"⚠️ 配置文件读取失败，保持当前配置: {e}")
+            return False
+        self.errors = 0
+        changed = diff_config(self.config, config)
+        if changed:
+            self.config = config
+            self.reloads += 1
+            print(f"🔄 配置文件已更新: {', '.join(changed)}")
+            try:
+                self.on_change(config, changed)
+            except Exception as e:
+                print(f"❌ 应用配置失败: {e}")
+        return True
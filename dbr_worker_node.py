@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分布式DBR识别工作节点
+接收器通过 Push0 把 JPEG 识别任务分发给任意数量的工作进程/节点，
+工作节点识别后通过 Push0 把结果发回接收器的 Pull0。
+
+本地测试示例（同一台机器启动4个工作进程）：
+    python3 dbr_worker_node.py --tasks tcp://127.0.0.1:5570 --results tcp://127.0.0.1:5571 --workers 4
+    python3 simple_receiver.py --dbr --dbr-dispatch
+也可以使用 ipc 地址，例如 ipc:///tmp/dbr_tasks.ipc
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import pynng
+import pynng.exceptions as nng_exceptions
+from decoders import create_backend, DECODER_BACKENDS, DEFAULT_BACKEND
+
+# 默认分发地址（接收器侧监听，工作节点侧连接）
+DEFAULT_TASK_ADDR = "tcp://127.0.0.1:5570"
+DEFAULT_RESULT_ADDR = "tcp://127.0.0.1:5571"
+
+# 工作节点心跳间隔 / 判定失联的超时时间（秒）
+HEARTBEAT_INTERVAL = 1.0
+WORKER_TIMEOUT = 3.0
+
+
+def pack_task(task_id, recv_seq, attempt, jpeg_bytes):
+    """任务消息：4字节头长度 + JSON头 + JPEG字节（与相机帧格式一致的长度前缀风格）"""
+    header = json.dumps({'task_id': task_id, 'recv_seq': recv_seq, 'attempt': attempt}).encode('utf-8')
+    return len(header).to_bytes(4, 'big') + header + bytes(jpeg_bytes)
+
+
+def unpack_task(data):
+    """解析任务消息，返回 (header_dict, jpeg_bytes)"""
+    header_len = int.from_bytes(data[0:4], 'big')
+    header = json.loads(bytes(data[4:4 + header_len]).decode('utf-8'))
+    return header, data[4 + header_len:]
+
+
+def pack_control(msg_type, worker_id, **fields):
+    """工作节点 -> 接收器的控制/结果消息（JSON）"""
+    msg = {'type': msg_type, 'worker_id': worker_id}
+    msg.update(fields)
+    return json.dumps(msg).encode('utf-8')
+
+
+class DBRWorkerNode:
+    """独立的DBR识别工作节点：Pull0 拉取任务，Push0 回传结果和心跳"""
+
+    def __init__(self, task_addr, result_addr, worker_id=None, decoder_backend=DEFAULT_BACKEND):
+        self.task_addr = task_addr
+        self.result_addr = result_addr
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.running = False
+        self.task_puller = None
+        self.result_pusher = None
+        self.decoder_backend = create_backend(decoder_backend)
+        self.decoder = None
+        self.completed = 0
+
+    def _init_dbr(self):
+        """初始化解码后端（DBR后端在此初始化许可证）和识别实例"""
+        self.decoder_backend.init()
+        self.decoder = self.decoder_backend.create()
+
+    def _decode(self, jpeg_bytes):
+        """识别一张JPEG，返回精简结果列表"""
+        return self.decoder.decode(bytes(jpeg_bytes))
+
+    def _heartbeat_loop(self):
+        """周期性发送心跳，接收器据此判断节点是否存活"""
+        while self.running:
+            try:
+                self.result_pusher.send(pack_control('heartbeat', self.worker_id, completed=self.completed))
+            except Exception:
+                pass
+            time.sleep(HEARTBEAT_INTERVAL)
+
+    def run(self):
+        """工作节点主循环"""
+        self._init_dbr()
+
+        self.task_puller = pynng.Pull0()
+        self.task_puller.recv_timeout = 500
+        self.task_puller.dial(self.task_addr, block=False)
+        self.result_pusher = pynng.Push0()
+        self.result_pusher.dial(self.result_addr, block=False)
+        print(f"✅ DBR工作节点 {self.worker_id} 已连接: 任务 {self.task_addr}，结果 {self.result_addr}，"
+              f"解码后端 {self.decoder_backend.describe()}")
+
+        self.running = True
+        threading.Thread(target=self._heartbeat_loop, daemon=True).start()
+
+        bad_tasks = 0  # 无法解析而跳过的任务消息数
+        try:
+            while self.running:
+                try:
+                    data = self.task_puller.recv()
+                except pynng.Timeout:
+                    continue
+
+                try:
+                    header, jpeg_bytes = unpack_task(data)
+                    task_id = header['task_id']
+                except Exception as e:
+                    # 截断/损坏的任务消息：跳过（无法认领，接收器超时后会重新分发）
+                    bad_tasks += 1
+                    if bad_tasks == 1:
+                        print(f"⚠️ 无法解析的任务消息，已跳过（{len(data)} 字节）: {e}")
+                    continue
+                # 认领任务，接收器据此在节点失联时重新分发
+                self.result_pusher.send(pack_control('claim', self.worker_id, task_id=task_id))
+
+                t0 = time.time()
+                try:
+                    items = self._decode(jpeg_bytes)
+                    error = None
+                except Exception as e:
+                    items = []
+                    error = str(e)
+                elapsed_ms = (time.time() - t0) * 1000.0
+
+                self.completed += 1
+                self.result_pusher.send(pack_control(
+                    'result', self.worker_id,
+                    task_id=task_id,
+                    elapsed_ms=elapsed_ms,
+                    items=items,
+                    error=error
+                ))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.running = False
+            for sock in (self.task_puller, self.result_pusher):
+                try:
+                    sock.close()
+                except Exception:
+                    pass
+            print(f"DBR工作节点 {self.worker_id} 已退出，共完成 {self.completed} 个任务"
+                  + (f"，跳过 {bad_tasks} 个无法解析的任务消息" if bad_tasks else ""))
+
+
+class DBRTaskDispatcher:
+    """接收器侧的任务分发器：Push0 扇出任务，Pull0 收集结果，
+    跟踪在途任务，节点失联或超时后重新分发，并统计每个节点的吞吐"""
+
+    def __init__(self, task_addr, result_addr, on_result, max_inflight=200,
+                 retry_timeout=5.0, max_retries=3):
+        self.task_addr = task_addr
+        self.result_addr = result_addr
+        self.on_result = on_result  # 回调: on_result(recv_seq, slot_index, worker_id, elapsed_ms, items)
+        self.max_inflight = max_inflight
+        self.retry_timeout = retry_timeout
+        self.max_retries = max_retries
+
+        self.running = False
+        self.lock = threading.Lock()
+        self.next_task_id = 0
+        # task_id -> {'recv_seq', 'slot_index', 'jpeg', 'attempt', 'sent_at', 'worker_id', 'manual'}
+        self.inflight = {}
+        # worker_id -> {'last_seen', 'completed', 'items', 'total_ms', 'first_seen', 'lost'}
+        self.workers = {}
+
+        # 统计
+        self.submitted = 0
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+        self.dropped = 0
+
+        self.task_pusher = pynng.Push0()
+        self.task_pusher.listen(task_addr)
+        self.result_puller = pynng.Pull0()
+        self.result_puller.recv_timeout = 500
+        self.result_puller.listen(result_addr)
+        print(f"✅ DBR任务分发器已启动: 任务 {task_addr}，结果 {result_addr}")
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self._result_loop, daemon=True, name="DBR-Dispatch-Results").start()
+        threading.Thread(target=self._monitor_loop, daemon=True, name="DBR-Dispatch-Monitor").start()
+
+    def submit(self, recv_seq, jpeg_bytes, slot_index, manual=False):
+        """提交一个识别任务；在途任务已满时丢弃最旧的一条实时任务（手动任务不丢弃）。返回是否丢弃了旧任务"""
+        evicted = False
+        with self.lock:
+            if len(self.inflight) >= self.max_inflight:
+                # dict按插入顺序，第一条非手动任务即最旧的实时任务
+                oldest_id = next((tid for tid, t in self.inflight.items() if not t['manual']), None)
+                if oldest_id is not None:
+                    del self.inflight[oldest_id]
+                    self.dropped += 1
+                    evicted = True
+            self.next_task_id += 1
+            task_id = self.next_task_id
+            task = {
+                'recv_seq': recv_seq,
+                'slot_index': slot_index,
+                'jpeg': jpeg_bytes,
+                'attempt': 0,
+                'sent_at': None,
+                'worker_id': None,
+                'manual': manual,
+            }
+            self.inflight[task_id] = task
+            self.submitted += 1
+        self._send_task(task_id, task)
+        return evicted
+
+    def _send_task(self, task_id, task):
+        """非阻塞发送；没有可用节点时保留在途，由监控线程稍后重发"""
+        try:
+            self.task_pusher.send(pack_task(task_id, task['recv_seq'], task['attempt'], task['jpeg']), block=False)
+            task['sent_at'] = time.time()
+        except pynng.TryAgain:
+            task['sent_at'] = None
+        except Exception as e:
+            task['sent_at'] = None
+            print(f"⚠️ DBR任务发送失败: {e}")
+
+    def _worker_entry(self, worker_id, now):
+        entry = self.workers.get(worker_id)
+        if entry is None:
+            entry = {'first_seen': now, 'last_seen': now, 'completed': 0, 'items': 0, 'total_ms': 0.0, 'lost': False}
+            self.workers[worker_id] = entry
+            print(f"✅ DBR工作节点上线: {worker_id}")
+        elif entry['lost']:
+            entry['lost'] = False
+            print(f"✅ DBR工作节点恢复: {worker_id}")
+        entry['last_seen'] = now
+        return entry
+
+    def _result_loop(self):
+        while self.running:
+            try:
+                data = self.result_puller.recv()
+            except pynng.Timeout:
+                continue
+            except nng_exceptions.Closed:
+                break
+            except Exception as e:
+                print(f"❌ DBR结果接收异常: {e}")
+                continue
+
+            try:
+                msg = json.loads(bytes(data).decode('utf-8'))
+            except Exception:
+                continue
+
+            now = time.time()
+            worker_id = msg.get('worker_id', '?')
+            msg_type = msg.get('type')
+            task = None
+            with self.lock:
+                entry = self._worker_entry(worker_id, now)
+                if msg_type == 'claim':
+                    claimed = self.inflight.get(msg.get('task_id'))
+                    if claimed is not None:
+                        claimed['worker_id'] = worker_id
+                elif msg_type == 'result':
+                    # 重发后可能收到重复结果，只认第一次
+                    task = self.inflight.pop(msg.get('task_id'), None)
+                    if task is not None:
+                        items = msg.get('items') or []
+                        entry['completed'] += 1
+                        entry['items'] += len(items)
+                        entry['total_ms'] += float(msg.get('elapsed_ms') or 0.0)
+                        self.completed += 1
+
+            if task is not None and self.on_result:
+                if msg.get('error'):
+                    print(f"❌ 识别错误({worker_id}): {msg.get('error')}")
+                try:
+                    self.on_result(task['recv_seq'], task['slot_index'], worker_id,
+                                   float(msg.get('elapsed_ms') or 0.0), msg.get('items') or [])
+                except Exception as e:
+                    print(f"⚠️ DBR结果回调异常: {e}")
+
+    def _monitor_loop(self):
+        """检测节点失联和任务超时，重新分发"""
+        while self.running:
+            time.sleep(0.5)
+            now = time.time()
+            resend = []
+            with self.lock:
+                lost_workers = set()
+                for worker_id, entry in self.workers.items():
+                    if not entry['lost'] and now - entry['last_seen'] > WORKER_TIMEOUT:
+                        entry['lost'] = True
+                        lost_workers.add(worker_id)
+                        print(f"⚠️ DBR工作节点失联: {worker_id}")
+
+                for task_id, task in list(self.inflight.items()):
+                    lost = task['worker_id'] in lost_workers
+                    unsent = task['sent_at'] is None
+                    expired = task['sent_at'] is not None and now - task['sent_at'] > self.retry_timeout
+                    if not (lost or unsent or expired):
+                        continue
+                    if not unsent:
+                        task['attempt'] += 1
+                        if task['attempt'] > self.max_retries:
+                            del self.inflight[task_id]
+                            self.failed += 1
+                            continue
+                        self.retried += 1
+                    task['worker_id'] = None
+                    resend.append((task_id, task))
+
+            for task_id, task in resend:
+                self._send_task(task_id, task)
+
+    def get_stats(self):
+        """返回分发统计快照"""
+        now = time.time()
+        with self.lock:
+            workers = {}
+            for worker_id, entry in self.workers.items():
+                alive_s = max(now - entry['first_seen'], 1e-6)
+                workers[worker_id] = {
+                    'completed': entry['completed'],
+                    'items': entry['items'],
+                    'avg_ms': entry['total_ms'] / entry['completed'] if entry['completed'] else 0.0,
+                    'rate': entry['completed'] / alive_s,
+                    'lost': entry['lost'],
+                }
+            return {
+                'inflight': len(self.inflight),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'retried': self.retried,
+                'failed': self.failed,
+                'dropped': self.dropped,
+                'workers': workers,
+            }
+
+    def close(self):
+        self.running = False
+        for sock in (self.task_pusher, self.result_puller):
+            try:
+                sock.close()
+            except Exception:
+                pass
+
+
+def _run_worker(task_addr, result_addr, worker_id, decoder_backend=DEFAULT_BACKEND):
+    DBRWorkerNode(task_addr, result_addr, worker_id, decoder_backend).run()
+
+
+if __name__ == '__main__':
+    import argparse
+    import multiprocessing
+
+    parser = argparse.ArgumentParser(description='分布式DBR识别工作节点')
+    parser.add_argument('--tasks', default=DEFAULT_TASK_ADDR, help=f'任务地址（接收器Push0监听地址），默认 {DEFAULT_TASK_ADDR}')
+    parser.add_argument('--results', default=DEFAULT_RESULT_ADDR, help=f'结果地址（接收器Pull0监听地址），默认 {DEFAULT_RESULT_ADDR}')
+    parser.add_argument('--workers', type=int, default=1, help='本机启动的工作进程数量')
+    parser.add_argument('--id', help='工作节点ID前缀（默认 主机名-进程号）')
+    parser.add_argument('--decoder', choices=DECODER_BACKENDS, default=DEFAULT_BACKEND, help='解码后端（默认 dbr）')
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        _run_worker(args.tasks, args.results, args.id, args.decoder)
+    else:
+        prefix = args.id or socket.gethostname()
+        # NNG 不支持 fork 后继续使用，工作进程统一用 spawn 启动
+        ctx = multiprocessing.get_context('spawn')
+        processes = []
+        for i in range(args.workers):
+            p = ctx.Process(target=_run_worker, args=(args.tasks, args.results, f"{prefix}-{i}", args.decoder), daemon=True)
+            p.start()
+            processes.append(p)
+        print(f"🚀 已启动 {args.workers} 个DBR工作进程")
+        try:
+            for p in processes:
+                p.join()
+        except KeyboardInterrupt:
+            print("\n正在退出...")
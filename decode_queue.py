@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+识别任务调度队列（替代原来的 FIFO queue.Queue）
+两类任务：
+    manual  操作员手动触发（空格键）：优先出队，永不丢弃，入队不阻塞
+    live    实时流中的裁剪：有容量上限，最新的先出队，满了丢弃最旧的
+出队时先取 manual，再取最新的 live，手动识别不用排在几百条实时帧后面。
+每类任务分别统计排队等待时间。
+"""
+
+import collections
+import queue
+import threading
+import time
+
+MANUAL = 'manual'
+LIVE = 'live'
+
+
+class DecodeQueue:
+    """带优先级的识别任务队列，多生产者/多消费者线程安全"""
+
+    def __init__(self, maxsize=200):
+        self.maxsize = maxsize  # 只限制 live 任务
+        self.cond = threading.Condition()
+        self.manual = collections.deque()  # (入队时间, payload)
+        self.live = collections.deque()
+        self.stats = {cls: {'queued': 0, 'taken': 0, 'dropped': 0, 'wait_total': 0.0, 'wait_max': 0.0}
+                      for cls in (MANUAL, LIVE)}
+
+    def put_live(self, payload):
+        """加入实时任务，不阻塞；已满时丢弃最旧的一条。返回被丢弃的 payload（没有丢弃返回 None）"""
+        evicted = None
+        with self.cond:
+            if len(self.live) >= self.maxsize:
+                _, evicted = self.live.popleft()
+                self.stats[LIVE]['dropped'] += 1
+            self.live.append((time.perf_counter(), payload))
+            self.stats[LIVE]['queued'] += 1
+            self.cond.notify()
+        return evicted
+
+    def put_manual(self, payload):
+        """加入手动任务：不受容量限制，不阻塞，不会被丢弃"""
+        with self.cond:
+            self.manual.append((time.perf_counter(), payload))
+            self.stats[MANUAL]['queued'] += 1
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        """取下一条任务：手动任务优先（先进先出），其次最新的实时任务；超时抛 queue.Empty"""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.manual or self.live, timeout):
+                raise queue.Empty
+            if self.manual:
+                cls, (queued_at, payload) = MANUAL, self.manual.popleft()
+            else:
+                cls, (queued_at, payload) = LIVE, self.live.pop()
+            wait = time.perf_counter() - queued_at
+            stats = self.stats[cls]
+            stats['taken'] += 1
+            stats['wait_total'] += wait
+            stats['wait_max'] = max(stats['wait_max'], wait)
+            return payload
+
+    def resize(self, maxsize):
+        """运行中调整实时任务上限；缩小时丢弃多出的最旧任务，返回丢弃数"""
+        with self.cond:
+            self.maxsize = max(1, int(maxsize))
+            dropped = 0
+            while len(self.live) > self.maxsize:
+                self.live.popleft()
+                dropped += 1
+            self.stats[LIVE]['dropped'] += dropped
+            return dropped
+
+    def qsize(self):
+        with self.cond:
+            return len(self.manual) + len(self.live)
+
+    def get_stats(self, reset_max=True):
+        """每类任务的计数与排队等待（平均/最大，毫秒）；reset_max 时最大值按统计周期清零"""
+        with self.cond:
+            result = {}
+            for cls, stats in self.stats.items():
+                taken = stats['taken']
+                result[cls] = {
+                    'pending': len(self.manual if cls == MANUAL else self.live),
+                    'queued': stats['queued'],
+                    'taken': taken,
+                    'dropped': stats['dropped'],
+                    'avg_wait_ms': stats['wait_total'] / taken * 1000.0 if taken else 0.0,
+                    'max_wait_ms': stats['wait_max'] * 1000.0,
+                }
+                if reset_max:
+                    stats['wait_max'] = 0.0
+            return result
+
+
+def format_queue_stats(stats):
+    """格式化每类任务的排队统计，用于周期性打印"""
+    parts = []
+    for cls, label in ((LIVE, '实时'), (MANUAL, '手动')):
+        s = stats[cls]
+        if not s['queued']:
+            continue
+        parts.append(f"{label} 排队 {s['pending']}，平均等待 {s['avg_wait_ms']:.1f} ms，最大 {s['max_wait_ms']:.1f} ms"
+                     + (f"，丢弃 {s['dropped']}" if s['dropped'] else ""))
+    return "；".join(parts)
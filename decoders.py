@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可切换的条码/二维码解码后端
+接收器的识别线程、分布式工作节点、基准测试统一通过这里创建解码器，
+不再直接调用 Dynamsoft CaptureVisionRouter，没有SDK/许可证时也能跑通整条流水线。
+
+后端（配置 "DecoderBackend" 或命令行 --decoder 选择）：
+    dbr           Dynamsoft Barcode Reader（需要SDK和许可证，许可证可由配置 "DBRLicense" 覆盖）
+    opencv        cv2.QRCodeDetector，多码检测+解码（仅二维码）
+    opencv-aruco  cv2.QRCodeDetectorAruco，多码检测更稳（OpenCV >= 4.8）
+    stub          确定性替身：固定耗时（"StubDecodeMs"），按内容哈希给出结果（"StubHitRate"）
+
+用法：
+    backend = create_backend('opencv')
+    backend.init()                 # 进程级初始化（如DBR许可证），失败抛 RuntimeError
+    decoder = backend.create()     # 每个识别线程一个实例
+    items = decoder.decode(jpeg_bytes)  # -> [{'fmt', 'text', 'confidence', 'points'?}]，识别出错抛异常
+
+输入准备（配置 "DecodeInput": "gray"）：InputPreparer 用 TurboJPEG 一次性直接解码为灰度
+（可按 "DecodeScale" 缩小），按元数据ROI裁剪后把原始灰度缓冲区交给 decoder.decode_image()，
+解码器不再自己做彩色JPEG解码。
+
+对比各后端、各输入方式在一批JPEG上的速度/识别数：
+    python3 decoders.py --compare <目录|*.jpg> [--backends opencv,opencv-aruco,dbr] [--inputs jpeg,gray,gray@0.5]
+"""
+
+import time
+import zlib
+import numpy as np
+
+DECODER_BACKENDS = ('dbr', 'opencv', 'opencv-aruco', 'stub')
+DEFAULT_BACKEND = 'dbr'
+
+DECODE_INPUTS = ('jpeg', 'gray')
+
+DEFAULT_DBR_LICENSE = "t0083YQEAAIxyZ63FS23f0lbnGqIWVNzyJUhlk6dSuGADrJOsEZqnYvegAZSqltDyy/PWWuBX508E6/Ib4GVkVU2PMdf4fVuY/r2pvDcjy6TyBN1USaY="
+
+
+class Decoder:
+    """解码器接口：每个识别线程持有一个实例（实例不要求线程安全）"""
+
+    name = 'base'
+
+    def decode(self, jpeg_bytes):
+        """识别一张JPEG，返回 [{'fmt', 'text', 'confidence'}]（能定位时带 'points' 四角点）；没有识别到返回空列表，出错抛异常"""
+        raise NotImplementedError
+
+    def decode_image(self, gray):
+        """识别一张已解码的灰度图（二维 uint8 连续数组），返回格式同 decode()"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class DBRDecoder(Decoder):
+    """Dynamsoft CaptureVisionRouter 后端"""
+
+    name = 'dbr'
+
+    def __init__(self, restrict_formats=False):
+        from dynamsoft_barcode_reader_bundle import (
+            CaptureVisionRouter, EnumPresetTemplate, EnumErrorCode, EnumBarcodeFormat,
+            ImageData, EnumImagePixelFormat)
+        self._image_data = ImageData
+        self._gray_format = EnumImagePixelFormat.IPF_GRAYSCALED
+        self._template = EnumPresetTemplate.PT_READ_BARCODES
+        self._ok_codes = (EnumErrorCode.EC_OK, EnumErrorCode.EC_UNSUPPORTED_JSON_KEY_WARNING)
+        self.cvr_instance = CaptureVisionRouter()
+
+        if restrict_formats:
+            # 严格按照许可证要求，只启用：Code 39, Code 93, Code 128, Codabar, ITF, EAN-13, EAN-8, UPC-A, UPC-E, INDUSTRIAL 2 OF 5, QR码
+            err_code, err_str, settings = self.cvr_instance.get_simplified_settings(self._template.value)
+            settings.barcode_settings.barcode_format_ids = (
+                EnumBarcodeFormat.BF_QR_CODE.value |
+                EnumBarcodeFormat.BF_CODE_39.value |
+                EnumBarcodeFormat.BF_CODE_93.value |
+                EnumBarcodeFormat.BF_CODE_128.value |
+                EnumBarcodeFormat.BF_CODABAR.value |
+                EnumBarcodeFormat.BF_ITF.value |
+                EnumBarcodeFormat.BF_EAN_13.value |
+                EnumBarcodeFormat.BF_EAN_8.value |
+                EnumBarcodeFormat.BF_UPC_A.value |
+                EnumBarcodeFormat.BF_UPC_E.value |
+                EnumBarcodeFormat.BF_INDUSTRIAL_25.value
+            )
+            err_code, err_str = self.cvr_instance.update_settings(self._template.value, settings)
+            if err_code != EnumErrorCode.EC_OK:
+                print(f"⚠️ DBR格式配置失败: {err_code} - {err_str}")
+
+    def decode(self, jpeg_bytes):
+        return self._capture(bytes(jpeg_bytes))
+
+    def decode_image(self, gray):
+        height, width = gray.shape[:2]
+        image = self._image_data(gray.tobytes(), width, height, gray.strides[0], self._gray_format)
+        return self._capture(image)
+
+    def _capture(self, source):
+        captured_result = self.cvr_instance.capture(source, self._template)
+        if captured_result.get_error_code() not in self._ok_codes:
+            raise RuntimeError(f"{captured_result.get_error_code()} - {captured_result.get_error_string()}")
+
+        barcode_result = captured_result.get_decoded_barcodes_result()
+        if barcode_result is None or not barcode_result.get_items():
+            return []
+
+        # 构造精简结果
+        result_items = []
+        for it in barcode_result.get_items():
+            try:
+                item = {
+                    'fmt': it.get_format_string(),
+                    'text': it.get_text(),
+                    'confidence': getattr(it, 'get_confidence', lambda: None)()
+                }
+            except Exception:
+                result_items.append({'fmt': '<unk>', 'text': '<unk>', 'confidence': None})
+                continue
+            try:
+                # 码的四个角点（输入图像坐标），供跨帧跟踪使用
+                item['points'] = [[p.x, p.y] for p in it.get_location().points]
+            except Exception:
+                pass
+            result_items.append(item)
+        return result_items
+
+
+class OpenCVDecoder(Decoder):
+    """OpenCV 二维码后端：QRCodeDetector 或 QRCodeDetectorAruco，一张图可识别多个码"""
+
+    def __init__(self, aruco=False):
+        import cv2
+        import numpy as np
+        self._cv2 = cv2
+        self._np = np
+        self.name = 'opencv-aruco' if aruco else 'opencv'
+        self.detector = cv2.QRCodeDetectorAruco() if aruco else cv2.QRCodeDetector()
+
+    def decode(self, jpeg_bytes):
+        cv2 = self._cv2
+        # 灰度解码即可，省去色彩转换
+        image = cv2.imdecode(self._np.frombuffer(jpeg_bytes, dtype=self._np.uint8), cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            raise ValueError("JPEG解码失败")
+        return self.decode_image(image)
+
+    def decode_image(self, gray):
+        ok, texts, points, _ = self.detector.detectAndDecodeMulti(gray)
+        if not ok:
+            return []
+        return [{'fmt': 'QR_CODE', 'text': text, 'confidence': None, 'points': quad.tolist()}
+                for text, quad in zip(texts, points) if text]
+
+
+class StubDecoder(Decoder):
+    """确定性替身解码器：固定耗时，按JPEG内容哈希决定是否"识别"出结果"""
+
+    name = 'stub'
+
+    def __init__(self, cost_ms=5.0, hit_rate=0.8):
+        self.cost_s = cost_ms / 1000.0
+        self.hit_rate = hit_rate
+
+    def decode(self, jpeg_bytes):
+        # 模拟原生解码库：耗时期间不占用GIL
+        if self.cost_s > 0:
+            time.sleep(self.cost_s)
+        return self._result(zlib.crc32(jpeg_bytes))
+
+    def decode_image(self, gray):
+        if self.cost_s > 0:
+            time.sleep(self.cost_s)
+        return self._result(zlib.crc32(gray.tobytes()))
+
+    def _result(self, digest):
+        if (digest % 1000) >= self.hit_rate * 1000:
+            return []
+        return [{'fmt': 'STUB', 'text': f"STUB-{digest:08x}", 'confidence': 100}]
+
+
+class InputPreparer:
+    """识别前的输入准备：TurboJPEG 直接解码为灰度（可缩小），帧比ROI大时按元数据ROI裁剪
+    TurboJPEG 每次调用独立创建解码句柄，多个识别线程可共用同一个实例"""
+
+    def __init__(self, jpeg, scale=1.0, use_roi=True):
+        from turbojpeg import TJPF_GRAY
+        self.jpeg = jpeg
+        self.pixel_format = TJPF_GRAY
+        self.use_roi = use_roi
+        self.scaling_factor = None  # None 表示原尺寸
+        if scale < 1.0:
+            # 取 libjpeg-turbo 支持的最接近的缩放比例（DCT域缩放，比解码后再缩放便宜）
+            self.scaling_factor = min(jpeg.scaling_factors, key=lambda f: abs(f[0] / f[1] - scale))
+        self.scale = self.scaling_factor[0] / self.scaling_factor[1] if self.scaling_factor else 1.0
+
+    def prepare(self, jpeg_bytes, roi=None):
+        """返回 (gray, origin, scale)：连续灰度数组、其左上角在整帧中的坐标（原分辨率）、缩放比例
+        gray 中的点 p 对应整帧坐标 origin + p / scale"""
+        gray = self.jpeg.decode(jpeg_bytes, pixel_format=self.pixel_format, scaling_factor=self.scaling_factor)
+        if gray.ndim == 3:
+            gray = gray[:, :, 0]
+        origin = (0, 0)
+        if roi:
+            height, width = gray.shape
+            x = int(roi.get('x', 0) * self.scale)
+            y = int(roi.get('y', 0) * self.scale)
+            w = int(roi.get('width', 0) * self.scale)
+            h = int(roi.get('height', 0) * self.scale)
+            if w + 1 < width or h + 1 < height:
+                # 整帧JPEG + 较小的ROI：只把ROI部分交给解码器
+                if self.use_roi and 0 < w and 0 < h and x + w <= width and y + h <= height:
+                    gray = gray[y:y + h, x:x + w]
+                    origin = (roi.get('x', 0), roi.get('y', 0))
+            else:
+                # JPEG本身就是该ROI的裁剪（缩放取整允许差1像素）
+                origin = (roi.get('x', 0), roi.get('y', 0))
+        return np.ascontiguousarray(gray), origin, self.scale
+
+    def describe(self):
+        text = "灰度"
+        if self.scaling_factor:
+            text += f" ×{self.scaling_factor[0]}/{self.scaling_factor[1]}"
+        return text + ("，按ROI裁剪" if self.use_roi else "")
+
+
+def create_preparer(jpeg, decode_input=None, scale=None, config=None):
+    """按 参数 > 配置文件 "DecodeInput"/"DecodeScale" > 默认值 创建输入准备；jpeg 模式返回 None"""
+    config = config or {}
+    decode_input = decode_input or config.get('DecodeInput', 'jpeg')
+    if decode_input not in DECODE_INPUTS:
+        raise ValueError(f"未知的识别输入方式: {decode_input}（可选 {', '.join(DECODE_INPUTS)}）")
+    if decode_input == 'jpeg':
+        return None
+    scale = scale if scale is not None else config.get('DecodeScale', 1.0)
+    return InputPreparer(jpeg, scale=float(scale), use_roi=config.get('DecodeUseROI', True))
+
+
+class DecoderBackend:
+    """解码后端：进程级初始化一次，再为每个识别线程创建解码器实例"""
+
+    def __init__(self, name=DEFAULT_BACKEND, license_key=None, restrict_formats=False,
+                 stub_ms=5.0, stub_hit_rate=0.8):
+        if name not in DECODER_BACKENDS:
+            raise ValueError(f"未知的解码后端: {name}（可选 {', '.join(DECODER_BACKENDS)}）")
+        self.name = name
+        self.license_key = license_key or DEFAULT_DBR_LICENSE
+        self.restrict_formats = restrict_formats
+        self.stub_ms = stub_ms
+        self.stub_hit_rate = stub_hit_rate
+        self.initialized = False
+
+    @property
+    def needs_license(self):
+        return self.name == 'dbr'
+
+    def init(self):
+        """进程级初始化：DBR初始化许可证，OpenCV检查版本；失败抛 RuntimeError"""
+        if self.initialized:
+            return
+        if self.name == 'dbr':
+            try:
+                from dynamsoft_barcode_reader_bundle import LicenseManager, EnumErrorCode
+            except ImportError as e:
+                raise RuntimeError(f"未安装DBR SDK: {e}")
+            err_code, err_str = LicenseManager.init_license(self.license_key)
+            if err_code != EnumErrorCode.EC_OK and err_code != EnumErrorCode.EC_LICENSE_WARNING:
+                raise RuntimeError(f"DBR 许可证初始化失败: {err_code} - {err_str}")
+        elif self.name == 'opencv-aruco':
+            import cv2
+            if not hasattr(cv2, 'QRCodeDetectorAruco'):
+                raise RuntimeError(f"当前OpenCV {cv2.__version__} 不支持 QRCodeDetectorAruco（需要 >= 4.8）")
+        self.initialized = True
+
+    def create(self):
+        """创建一个解码器实例（每个识别线程调用一次）"""
+        if self.name == 'dbr':
+            return DBRDecoder(self.restrict_formats)
+        if self.name in ('opencv', 'opencv-aruco'):
+            return OpenCVDecoder(aruco=self.name == 'opencv-aruco')
+        return StubDecoder(self.stub_ms, self.stub_hit_rate)
+
+    def describe(self):
+        if self.name == 'stub':
+            return f"stub（{self.stub_ms:g} ms/次，命中率 {self.stub_hit_rate:.0%}）"
+        return self.name
+
+
+def create_backend(name=None, config=None, **options):
+    """按 参数 > 配置文件 > 默认值 的优先级创建解码后端"""
+    config = config or {}
+    name = name or config.get('DecoderBackend', DEFAULT_BACKEND)
+    options.setdefault('license_key', config.get('DBRLicense'))
+    options.setdefault('stub_ms', config.get('StubDecodeMs', 5.0))
+    options.setdefault('stub_hit_rate', config.get('StubHitRate', 0.8))
+    return DecoderBackend(name, **options)
+
+
+def _parse_input(spec):
+    """'jpeg' / 'gray' / 'gray@0.5' -> (输入方式, 缩放)"""
+    mode, _, scale = spec.partition('@')
+    return mode, float(scale) if scale else 1.0
+
+
+def compare_backends(paths, backends, inputs=('jpeg',), repeat=1):
+    """在同一批JPEG上对比各后端、各输入方式的耗时和识别数（灰度输入单独统计准备耗时）"""
+    jpegs = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            jpegs.append(f.read())
+    print(f"📊 解码后端对比: {len(jpegs)} 张图片 × {repeat} 轮")
+    jpeg = None
+    for name in backends:
+        backend = create_backend(name)
+        try:
+            backend.init()
+            decoder = backend.create()
+        except Exception as e:
+            print(f"  {name:>12}: 不可用（{e}）")
+            continue
+        baseline_ms = None
+        for spec in inputs:
+            mode, scale = _parse_input(spec)
+            preparer = None
+            if mode == 'gray':
+                if jpeg is None:
+                    from turbojpeg import TurboJPEG
+                    jpeg = TurboJPEG()
+                preparer = InputPreparer(jpeg, scale=scale)
+            decoded = 0
+            found = 0
+            errors = 0
+            texts = set()
+            prep_s = 0.0
+            t0 = time.perf_counter()
+            for _ in range(repeat):
+                for data in jpegs:
+                    try:
+                        if preparer is not None:
+                            t_prep = time.perf_counter()
+                            gray, _, _ = preparer.prepare(data)
+                            prep_s += time.perf_counter() - t_prep
+                            items = decoder.decode_image(gray)
+                        else:
+                            items = decoder.decode(data)
+                    except Exception:
+                        errors += 1
+                        continue
+                    decoded += 1
+                    if items:
+                        found += 1
+                    texts.update(it['text'] for it in items)
+            elapsed = time.perf_counter() - t0
+            total = len(jpegs) * repeat
+            avg_ms = elapsed / total * 1000
+            line = (f"  {name:>12} {spec:>8}: {total / elapsed if elapsed > 0 else 0:.1f} 张/s，平均 {avg_ms:.1f} ms"
+                    f"（准备 {prep_s / total * 1000:.1f} ms），有结果 {found}/{decoded}，不同文本 {len(texts)}，错误 {errors}")
+            if baseline_ms is None:
+                baseline_ms = avg_ms
+            elif baseline_ms > 0:
+                line += f"，相对 {inputs[0]} {(avg_ms - baseline_ms) / baseline_ms * 100:+.1f}%"
+            print(line)
+        decoder.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    from file_feed import expand_inputs, is_image
+
+    parser = argparse.ArgumentParser(description='解码后端工具')
+    parser.add_argument('--compare', nargs='+', metavar='INPUT', help='对比各后端：图片目录、通配符或文件')
+    parser.add_argument('--backends', default='opencv,opencv-aruco,dbr', help='参与对比的后端，逗号分隔')
+    parser.add_argument('--inputs', default='jpeg,gray', help='输入方式：jpeg、gray、gray@缩放（如 gray@0.5），逗号分隔')
+    parser.add_argument('--repeat', type=int, default=1, help='重复轮数')
+    args = parser.parse_args()
+
+    if args.compare:
+        images = [p for p in expand_inputs(args.compare) if is_image(p)]
+        compare_backends(images, args.backends.split(','), args.inputs.split(','), args.repeat)
+    else:
+        parser.print_help()
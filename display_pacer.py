@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+显示节拍器（类似垂直同步）
+显示线程不再用 1ms/10ms 的 sleep 轮询有没有新照片，而是：
+    空闲时  阻塞在 CropRing.wait_for_publish() 上，新消息写入槽位时立即被唤醒
+    有新帧  按固定节拍刷新：距上一个节拍不足一个间隔就睡到下一个节拍，期间到达的帧合并为一次刷新
+节拍按绝对时间排列（t0 + k × 间隔），不会因为单次刷新耗时而累积漂移；落后超过一个间隔时重新对齐。
+
+配置文件 "DisplayMaxFps"（默认 60）控制最大刷新帧率，运行中修改配置文件即生效（set_max_fps）。
+"""
+
+import time
+
+DEFAULT_MAX_FPS = 60.0
+
+
+class FramePacer:
+    """固定帧率的刷新节拍：ready() 判断是否到了下一个节拍，tick() 记录一次刷新"""
+
+    def __init__(self, max_fps=DEFAULT_MAX_FPS):
+        self.set_max_fps(max_fps)
+        self.next_tick = 0.0
+        self.frames = 0
+        self.skipped_ticks = 0  # 刷新落后、被跳过的节拍数
+
+    def set_max_fps(self, max_fps):
+        """修改最大帧率（配置热加载），从下一个节拍起生效"""
+        self.interval = 1.0 / max(1.0, float(max_fps))
+
+    def remaining(self, now=None):
+        """距下一个节拍的秒数（已到节拍返回 0）"""
+        now = time.perf_counter() if now is None else now
+        return max(0.0, self.next_tick - now)
+
+    def ready(self, now=None):
+        return self.remaining(now) == 0.0
+
+    def wait(self):
+        """睡到下一个节拍"""
+        delay = self.remaining()
+        if delay > 0:
+            time.sleep(delay)
+
+    def tick(self, now=None):
+        """记录一次刷新，排定下一个节拍"""
+        now = time.perf_counter() if now is None else now
+        self.frames += 1
+        self.next_tick += self.interval
+        if self.next_tick <= now:
+            # 第一帧，或落后一个间隔以上：跳过错过的节拍，从现在重新对齐
+            if self.frames > 1:
+                self.skipped_ticks += int((now - self.next_tick) / self.interval) + 1
+            self.next_tick = now + self.interval
+
+
+def create_pacer(config=None):
+    """按配置文件 "DisplayMaxFps" > 默认 60 创建显示节拍器"""
+    config = config or {}
+    return FramePacer(config.get('DisplayMaxFps', DEFAULT_MAX_FPS))
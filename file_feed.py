@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+send_file.py 的输入源
+把目录、通配符、多个图片/视频文件展开成一路连续的输入流，
+读取和JPEG编码在线程池中执行（发送循环之前预取），已是JPEG的图片文件直接透传不重新编码。
+"""
+
+import glob
+import os
+import threading
+import cv2
+from turbojpeg import TurboJPEG
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff')
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.flv')
+JPEG_EXTENSIONS = ('.jpg', '.jpeg')
+
+_encoder_local = threading.local()
+
+
+def thread_jpeg():
+    """每个线程独立的 TurboJPEG 实例"""
+    encoder = getattr(_encoder_local, 'jpeg', None)
+    if encoder is None:
+        encoder = TurboJPEG()
+        _encoder_local.jpeg = encoder
+    return encoder
+
+
+def is_image(path):
+    return path.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def is_video(path):
+    return path.lower().endswith(VIDEO_EXTENSIONS)
+
+
+def expand_inputs(args):
+    """展开输入参数：目录（递归）、通配符、普通文件，返回排序去重后的文件列表"""
+    paths = []
+    for arg in args:
+        if os.path.isdir(arg):
+            found = []
+            for root, _, files in os.walk(arg):
+                found.extend(os.path.join(root, f) for f in files if is_image(f) or is_video(f))
+            paths.extend(sorted(found))
+        elif glob.has_magic(arg):
+            paths.extend(sorted(p for p in glob.glob(arg, recursive=True)
+                                if os.path.isfile(p) and (is_image(p) or is_video(p))))
+        elif os.path.isfile(arg):
+            paths.append(arg)
+        else:
+            print(f"⚠️ 输入不存在，已忽略: {arg}")
+    # 保持顺序去重（目录和通配符可能重叠）
+    seen = set()
+    return [p for p in paths if not (p in seen or seen.add(p))]
+
+
+def encode_frame(frame):
+    """编码阶段：BGR帧 -> (jpeg_bytes, w, h)"""
+    h, w = frame.shape[:2]
+    return thread_jpeg().encode(frame), w, h
+
+
+def load_image(path, passthrough=True):
+    """读取一张图片 -> (jpeg_bytes, w, h)；JPEG文件透传时只解析头部取尺寸"""
+    if passthrough and path.lower().endswith(JPEG_EXTENSIONS):
+        with open(path, 'rb') as f:
+            data = f.read()
+        try:
+            w, h, _, _ = thread_jpeg().decode_header(data)
+            return data, w, h
+        except Exception:
+            pass  # 头部损坏或非标准JPEG，退回完整解码+重新编码
+    image = cv2.imread(path)
+    if image is None:
+        raise ValueError(f"无法读取图片: {path}")
+    return encode_frame(image)
+
+
+def image_tasks(paths, passthrough=True, loop=True, cropper=None):
+    """图片输入的任务序列：每张图片一个 (函数, 参数...)，读取和编码都在线程池中执行
+    指定 cropper 时任务结果为裁剪列表 [(jpeg_bytes, roi)]"""
+    while True:
+        for path in paths:
+            if cropper is not None:
+                yield cropper.crop_path, path
+            else:
+                yield load_image, path, passthrough
+        if not loop:
+            return
+
+
+def video_tasks(paths, loop=True, cropper=None):
+    """视频输入的任务序列：多个视频依次首尾相接，读帧在调用线程，编码在线程池"""
+    while True:
+        opened = 0
+        for path in paths:
+            cap = cv2.VideoCapture(path)
+            if not cap.isOpened():
+                print(f"❌ 无法打开视频文件: {path}")
+                continue
+            opened += 1
+            try:
+                while True:
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    yield (cropper.crop if cropper is not None else encode_frame), frame
+            finally:
+                cap.release()
+        if not loop or opened == 0:
+            return
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缩略图浏览窗口（qr_gui_viewer.py 的"缩略图"按钮打开）
+环形槽位里的历史图片按网格排列（最新在前），点击任意一格直接跳到该图片，不用逐张翻页。
+    虚拟滚动  滚动区域按总格数设定，但只为可见的几行创建画布项目，项目池复用，几千张也能流畅滚动
+    缩略图    由 thumbnail_cache.ThumbnailCache 在后台线程生成（DCT 域缩小解码），生成后合并刷新
+    快照      打开/刷新时记下"最新一张"的位置，之后新数据不会让网格不断移位；勾选"跟随最新"则每秒刷新
+格子边框：黄色 = 当前显示的图片，青色 = 已有识别结果（下方显示第一个码的内容）。
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+from thumbnail_cache import THUMB_SIZE
+
+CELL_WIDTH = THUMB_SIZE + 12
+CELL_HEIGHT = THUMB_SIZE + 30
+FOLLOW_INTERVAL_MS = 1000
+
+
+class FilmstripWindow:
+    """缩略图网格窗口：page_source() 返回 (总张数 N, 第N张所在槽位)，on_select(槽位号) 跳转"""
+
+    def __init__(self, parent, ring, thumbnails, page_source, on_select, current_slot=None):
+        self.ring = ring
+        self.thumbnails = thumbnails
+        self.page_source = page_source
+        self.on_select = on_select
+        self.current_slot = current_slot or (lambda: None)  # 返回当前显示的槽位号，用于高亮
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("缩略图浏览")
+        self.window.geometry(f"{CELL_WIDTH * 8 + 40}x{CELL_HEIGHT * 5 + 60}")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        toolbar = ttk.Frame(self.window)
+        toolbar.pack(fill=tk.X, padx=5, pady=3)
+        ttk.Button(toolbar, text="刷新", command=self.refresh, width=6).pack(side=tk.LEFT)
+        self.follow_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(toolbar, text="跟随最新", variable=self.follow_var).pack(side=tk.LEFT, padx=8)
+        self.status_var = tk.StringVar(value="")
+        ttk.Label(toolbar, textvariable=self.status_var, font=('Arial', 9)).pack(side=tk.LEFT, padx=8)
+
+        body = ttk.Frame(self.window)
+        body.pack(fill=tk.BOTH, expand=True)
+        self.canvas = tk.Canvas(body, bg='#202020', highlightthickness=0)
+        scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.canvas.bind("<Configure>", lambda event: self.schedule_render())
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<MouseWheel>", self._on_wheel)  # Windows / macOS
+        self.canvas.bind("<Button-4>", lambda event: self._scroll(-1))  # Linux
+        self.canvas.bind("<Button-5>", lambda event: self._scroll(1))
+
+        self.total = 0  # 快照：总张数
+        self.newest_slot = 0  # 快照：第N张（最新）所在槽位
+        self.columns = 1
+        self.cells = {}  # 位置序号 -> 格子项目 (图片, 边框, 文字)
+        self.free_cells = []  # 滚出可见范围、可复用的格子项目
+        self.photos = {}  # 位置序号 -> 当前显示的 PhotoImage（防止被回收）
+        self.render_pending = False
+        self.closed = False
+
+        self.refresh()
+        self.window.after(FOLLOW_INTERVAL_MS, self._follow_loop)
+
+    # ---------- 布局 ----------
+
+    def refresh(self):
+        """重新记录最新位置并回到顶部"""
+        self.total, self.newest_slot = self.page_source()
+        self.thumbnails.cancel_pending()
+        self.canvas.yview_moveto(0)
+        self.schedule_render()
+
+    def _follow_loop(self):
+        if self.closed:
+            return
+        if self.follow_var.get():
+            total, newest = self.page_source()
+            if (total, newest) != (self.total, self.newest_slot):
+                self.total, self.newest_slot = total, newest
+                self.schedule_render()
+        self.window.after(FOLLOW_INTERVAL_MS, self._follow_loop)
+
+    def slot_at(self, position):
+        """位置序号（0 = 最新）-> 槽位号"""
+        return (self.newest_slot - position) % self.ring.slot_num
+
+    def schedule_render(self):
+        """合并多次刷新请求（滚动、缩略图生成完成）为一次重绘；可在任意线程调用"""
+        if self.render_pending or self.closed:
+            return
+        self.render_pending = True
+        self.window.after(15, self._render)
+
+    def _render(self):
+        self.render_pending = False
+        if self.closed:
+            return
+        canvas = self.canvas
+        width = max(canvas.winfo_width(), CELL_WIDTH)
+        height = canvas.winfo_height()
+        self.columns = max(1, width // CELL_WIDTH)
+        rows = (self.total + self.columns - 1) // self.columns
+        canvas.configure(scrollregion=(0, 0, self.columns * CELL_WIDTH, max(rows * CELL_HEIGHT, height)))
+
+        # 只处理可见的行（上下各多一行，滚动时不露白）
+        top = canvas.canvasy(0)
+        first_row = max(0, int(top // CELL_HEIGHT) - 1)
+        last_row = min(rows, int((top + height) // CELL_HEIGHT) + 2)
+        visible = range(first_row * self.columns, min(self.total, last_row * self.columns))
+
+        for position in [p for p in self.cells if p not in visible]:
+            cell = self.cells.pop(position)
+            self.photos.pop(position, None)
+            for item in cell:
+                canvas.itemconfigure(item, state=tk.HIDDEN)
+            self.free_cells.append(cell)
+
+        current = self.current_slot()
+        for position in visible:
+            self._draw_cell(position, current)
+
+        stats = self.thumbnails.get_stats()
+        self.status_var.set(f"共 {self.total} 张，缓存 {stats['cached']}，生成中 {stats['pending']}")
+
+    def _draw_cell(self, position, current):
+        canvas = self.canvas
+        cell = self.cells.get(position)
+        if cell is None:
+            if self.free_cells:
+                cell = self.free_cells.pop()
+            else:
+                cell = (canvas.create_rectangle(0, 0, 0, 0, outline="", width=2),
+                        canvas.create_image(0, 0, anchor=tk.CENTER),
+                        canvas.create_text(0, 0, fill="white", font=('Arial', 8), anchor=tk.N,
+                                           width=CELL_WIDTH - 4))
+            self.cells[position] = cell
+        frame_item, image_item, text_item = cell
+
+        row, column = divmod(position, self.columns)
+        x0, y0 = column * CELL_WIDTH, row * CELL_HEIGHT
+        slot_index = self.slot_at(position)
+        slot = self.ring.get(slot_index)
+
+        outline = ""
+        label = f"{self.total - position}"
+        if slot is not None:
+            items = slot.get('dbr_items')
+            if items:
+                outline = "cyan"
+                label += f" {items[0].get('text', '')[:14]}"
+        if slot_index == current:
+            outline = "yellow"
+
+        canvas.coords(frame_item, x0 + 2, y0 + 2, x0 + CELL_WIDTH - 2, y0 + THUMB_SIZE + 10)
+        canvas.itemconfigure(frame_item, outline=outline, state=tk.NORMAL)
+        canvas.coords(text_item, x0 + CELL_WIDTH // 2, y0 + THUMB_SIZE + 12)
+        canvas.itemconfigure(text_item, text=label, state=tk.NORMAL)
+        canvas.coords(image_item, x0 + CELL_WIDTH // 2, y0 + THUMB_SIZE // 2 + 6)
+
+        image = self.thumbnails.request(slot_index) if slot is not None else None
+        if image is None:
+            # 还没生成（或空槽）：先不显示图片，生成完成后 on_ready 会再触发重绘
+            self.photos.pop(position, None)
+            canvas.itemconfigure(image_item, image="", state=tk.HIDDEN)
+            return
+        photo = self.photos.get(position)
+        if photo is None or photo[0] is not image:
+            from PIL import ImageTk
+            photo = (image, ImageTk.PhotoImage(image))
+            self.photos[position] = photo
+            canvas.itemconfigure(image_item, image=photo[1])
+        canvas.itemconfigure(image_item, state=tk.NORMAL)
+
+    # ---------- 交互 ----------
+
+    def _on_scrollbar(self, *args):
+        self.canvas.yview(*args)
+        self.schedule_render()
+
+    def _scroll(self, units):
+        self.canvas.yview_scroll(units, "units")
+        self.schedule_render()
+
+    def _on_wheel(self, event):
+        self._scroll(-1 if event.delta > 0 else 1)
+
+    def _on_click(self, event):
+        x, y = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
+        column = int(x // CELL_WIDTH)
+        if column >= self.columns:
+            return
+        position = int(y // CELL_HEIGHT) * self.columns + column
+        if 0 <= position < self.total:
+            self.on_select(self.slot_at(position))
+            self.schedule_render()
+
+    def close(self):
+        self.closed = True
+        self.thumbnails.cancel_pending()
+        self.window.destroy()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+识别背压下的自适应抽帧
+识别跟不上时不再"每来一条就挤掉一条最旧的"（覆盖率随机、队列抖动），
+而是按队列深度和识别耗时动态决定步长 k，只把 1/k 的裁剪送去识别：
+    stride    每 k 个裁剪取第 k 个
+    sharpest  每 k 个裁剪为一个窗口，取最清晰的一个（1/8 缩小灰度解码上的拉普拉斯方差）；
+              每个裁剪到达时即评分、只保留窗口内当前最清晰的一个，不在窗口满时集中评分（避免接收线程周期性卡顿）；
+              窗口满 k 个、超过 interval 秒、或识别队列已空（flush）时送出，相机暂停时最后几帧不会滞留
+控制器：前馈 k = ceil(到达速率 / 识别能力)，识别能力 = 线程数 × 1000 / 平均识别耗时；
+再按队列深度与目标深度的偏差逐步修正，使队列保持在目标深度附近。
+"""
+
+import math
+import threading
+import time
+
+SAMPLING_MODES = ('off', 'stride', 'sharpest')
+
+
+def sharpness_score(jpeg, jpeg_bytes):
+    """清晰度评分：1/8 缩小的灰度解码（DCT域缩放，很便宜）上的拉普拉斯方差"""
+    import cv2
+    from turbojpeg import TJPF_GRAY
+    gray = jpeg.decode(jpeg_bytes, pixel_format=TJPF_GRAY, scaling_factor=(1, 8))
+    return float(cv2.Laplacian(gray, cv2.CV_32F).var())
+
+
+class AdaptiveSampler:
+    """接收线程调用 offer()，识别线程调用 record_decode()"""
+
+    def __init__(self, jpeg, mode='stride', target_depth=20, workers=8, max_stride=30, interval=0.5):
+        if mode not in ('stride', 'sharpest'):
+            raise ValueError(f"未知的抽帧方式: {mode}")
+        self.jpeg = jpeg
+        self.mode = mode
+        self.target_depth = max(1, int(target_depth))
+        self.workers = max(1, int(workers))
+        self.max_stride = max(1, int(max_stride))
+        self.interval = interval
+
+        self.stride = 1
+        self.bias = 0  # 队列深度反馈对步长的修正
+        self.counter = 0
+        # sharpest 模式的当前窗口（接收线程 offer 与识别线程 flush 共用，由 lock 保护）
+        self.window_best = None  # 窗口内最清晰的 payload
+        self.window_score = -1.0
+        self.window_count = 0  # 窗口内已到达的裁剪数
+        self.window_start = 0.0
+
+        self.lock = threading.Lock()
+        self.decode_ms = None  # 识别耗时 EWMA
+        self.last_adjust = time.time()
+        self.window_offered = 0
+
+        # 累计统计
+        self.offered = 0
+        self.forwarded = 0
+        self.scored = 0
+
+    def record_decode(self, elapsed_ms):
+        """识别线程报告一次识别耗时"""
+        with self.lock:
+            if self.decode_ms is None:
+                self.decode_ms = elapsed_ms
+            else:
+                self.decode_ms += 0.1 * (elapsed_ms - self.decode_ms)
+
+    def _adjust(self, queue_depth, now):
+        elapsed = now - self.last_adjust
+        arrival = self.window_offered / elapsed if elapsed > 0 else 0.0
+        self.last_adjust = now
+        self.window_offered = 0
+
+        with self.lock:
+            decode_ms = self.decode_ms
+        # 前馈：按到达速率和识别能力估算步长
+        feed_forward = 1
+        if decode_ms and decode_ms > 0:
+            capacity = self.workers * 1000.0 / decode_ms
+            feed_forward = max(1, math.ceil(arrival / capacity))
+        # 反馈：队列高于目标加大步长，明显低于目标减小步长
+        if queue_depth > self.target_depth:
+            self.bias += 1
+        elif queue_depth < self.target_depth // 2:
+            self.bias -= 1
+        self.bias = max(1 - feed_forward, min(self.bias, self.max_stride))
+        self.stride = max(1, min(self.max_stride, feed_forward + self.bias))
+
+    def offer(self, payload, queue_depth):
+        """提交一个候选识别任务 (recv_seq, jpeg_bytes, slot_index, metadata)，返回应送入识别队列的任务列表"""
+        self.offered += 1
+        self.window_offered += 1
+        now = time.time()
+        if now - self.last_adjust >= self.interval:
+            self._adjust(queue_depth, now)
+
+        if self.stride <= 1:
+            with self.lock:
+                pending = self._take_window()  # 步长降到 1 时先送出上一个窗口暂存的裁剪
+                self.forwarded += 1
+            return pending + [payload]
+
+        if self.mode == 'stride':
+            self.counter += 1
+            if self.counter < self.stride:
+                return []
+            self.counter = 0
+            self.forwarded += 1
+            return [payload]
+
+        # sharpest：到达即评分（在锁外），窗口内只保留最清晰的一个
+        try:
+            score = sharpness_score(self.jpeg, payload[1])
+            self.scored += 1
+        except Exception:
+            score = None  # 无法解码的裁剪不参与挑选
+        with self.lock:
+            if self.window_count == 0:
+                self.window_start = now
+            self.window_count += 1
+            if score is not None and score > self.window_score:
+                self.window_best, self.window_score = payload, score
+            if self.window_count >= self.stride or now - self.window_start >= self.interval:
+                return self._take_window()
+        return []
+
+    def flush(self, queue_depth=0, now=None):
+        """识别线程空闲时调用：识别队列已空或窗口超过 interval 秒时送出窗口内最清晰的裁剪（sharpest 模式）"""
+        now = time.time() if now is None else now
+        with self.lock:
+            if self.window_count and (queue_depth == 0 or now - self.window_start >= self.interval):
+                return self._take_window()
+        return []
+
+    def _take_window(self):
+        """结束当前窗口，返回要送识别的任务列表（调用方持有 lock）"""
+        best = self.window_best
+        self.window_best, self.window_score, self.window_count = None, -1.0, 0
+        if best is None:
+            return []
+        self.forwarded += 1
+        return [best]
+
+    def get_stats(self):
+        with self.lock:
+            decode_ms = self.decode_ms
+        return {
+            'mode': self.mode,
+            'stride': self.stride,
+            'offered': self.offered,
+            'forwarded': self.forwarded,
+            'skipped': self.offered - self.forwarded - self.window_count,
+            'decode_ms': decode_ms or 0.0,
+            'target_depth': self.target_depth,
+        }
+
+    def describe(self):
+        return f"{'步长' if self.mode == 'stride' else '窗口取最清晰'}，目标队列深度 {self.target_depth}"
+
+
+def format_sampler_stats(stats):
+    """格式化抽帧统计，用于周期性打印"""
+    return (f"{stats['mode']} 当前 1/{stats['stride']}，送识别 {stats['forwarded']}/{stats['offered']}，"
+            f"跳过 {stats['skipped']}，识别耗时 {stats['decode_ms']:.1f} ms")
+
+
+def create_sampler(jpeg, mode=None, config=None, workers=8):
+    """按 参数 > 配置文件 "DecodeSampling"/"DecodeTargetDepth" > 默认 off 创建抽帧器；off 返回 None"""
+    config = config or {}
+    mode = mode or config.get('DecodeSampling', 'off')
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"未知的抽帧方式: {mode}（可选 {', '.join(SAMPLING_MODES)}）")
+    if mode == 'off':
+        return None
+    return AdaptiveSampler(jpeg, mode=mode, target_depth=config.get('DecodeTargetDepth', 20), workers=workers)
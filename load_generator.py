@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多相机、多裁剪区域的合成负载生成
+模拟生产环境：每帧包含 N 个相机 × M 个ROI裁剪，裁剪尺寸、JPEG质量、位姿轨迹可配置，
+裁剪中包含已知内容的二维码（元数据 'synthetic.payload' 记录期望文本，便于核对识别准确率）。
+
+配合 send_file.py --loadgen 使用；--ramp 时逐级提高发送速率，
+通过接收器回传的ACK统计丢帧，找到接收器的饱和点。
+"""
+
+import json
+import math
+import random
+import threading
+import time
+import cv2
+import numpy as np
+import pynng
+import pynng.exceptions as nng_exceptions
+
+# 每个相机预生成的裁剪变体数量（热路径上只做拼包，不做编码）
+DEFAULT_VARIANTS = 32
+
+
+def parse_size(text):
+    """解析 '320x240' 形式的尺寸"""
+    w, h = text.lower().split('x')
+    return int(w), int(h)
+
+
+class CameraTrajectory:
+    """单个相机的位姿轨迹：沿货架直线飞行（lawnmower）或绕圈"""
+
+    def __init__(self, camera_id, kind='line', speed=0.5, shelf_length=20.0):
+        self.camera_id = camera_id
+        self.kind = kind
+        self.speed = speed  # m/s
+        self.shelf_length = shelf_length
+        self.lane_y = 1.5 * camera_id  # 每个相机一条通道
+
+    def pose(self, t):
+        """返回 (position[x,y,z], yaw_deg)"""
+        if self.kind == 'circle':
+            radius = 3.0
+            angle = self.speed * t / radius + self.camera_id
+            x = radius * math.cos(angle)
+            y = self.lane_y + radius * math.sin(angle)
+            yaw = math.degrees(angle + math.pi / 2) % 360.0
+        else:
+            # 往返直线：到货架尽头掉头，并按层升降
+            dist = self.speed * t
+            lap = int(dist // self.shelf_length)
+            along = dist % self.shelf_length
+            x = along if lap % 2 == 0 else self.shelf_length - along
+            y = self.lane_y
+            yaw = 0.0 if lap % 2 == 0 else 180.0
+        z = 1.0 + 0.5 * (int(self.speed * t // self.shelf_length) % 4)
+        return [round(x, 3), round(y, 3), round(z, 3)], yaw
+
+
+class SyntheticCropFactory:
+    """生成带二维码的合成裁剪（预编码为JPEG）"""
+
+    def __init__(self, jpeg, crop_size=(320, 320), quality=80, qr_fraction=0.8, seed=0):
+        self.jpeg = jpeg
+        self.crop_size = crop_size
+        self.quality = quality
+        self.qr_fraction = qr_fraction  # 含二维码的裁剪比例
+        self.rng = random.Random(seed)
+        self.np_rng = np.random.default_rng(seed)
+        self.qr_encoder = cv2.QRCodeEncoder.create()
+
+    def make_crop(self, payload):
+        """生成一张裁剪：货架纹理背景 + 随机位置的二维码，返回 (jpeg_bytes, has_code)"""
+        w, h = self.crop_size
+        # 低频噪声背景，接近真实货架的可压缩性
+        small = self.np_rng.integers(60, 200, size=(max(h // 16, 1), max(w // 16, 1), 3), dtype=np.uint8)
+        image = cv2.resize(small, (w, h), interpolation=cv2.INTER_LINEAR)
+        image = cv2.add(image, self.np_rng.integers(0, 20, size=image.shape, dtype=np.uint8))
+
+        has_code = self.rng.random() < self.qr_fraction
+        if has_code:
+            qr = self.qr_encoder.encode(payload)
+            module = max(1, int(min(w, h) * self.rng.uniform(0.35, 0.7)) // qr.shape[0])
+            qr = cv2.resize(qr, (qr.shape[1] * module, qr.shape[0] * module), interpolation=cv2.INTER_NEAREST)
+            qh, qw = qr.shape[:2]
+            if qw <= w and qh <= h:
+                x0 = self.rng.randint(0, w - qw)
+                y0 = self.rng.randint(0, h - qh)
+                image[y0:y0 + qh, x0:x0 + qw] = cv2.cvtColor(qr, cv2.COLOR_GRAY2BGR)
+            else:
+                has_code = False
+        return self.jpeg.encode(image, quality=self.quality), has_code
+
+
+class LoadGenerator:
+    """合成 N 相机 × M 裁剪的帧消息"""
+
+    def __init__(self, jpeg, cameras=2, crops=4, crop_size=(320, 320), frame_size=(1920, 1080),
+                 quality=80, trajectory='line', variants=DEFAULT_VARIANTS, seed=0):
+        self.cameras = cameras
+        self.crops = crops
+        self.crop_size = crop_size
+        self.frame_size = frame_size
+        self.trajectories = [CameraTrajectory(cam, trajectory) for cam in range(cameras)]
+        self.rng = random.Random(seed)
+        self.start_time = time.time()
+        self.frame_index = 0
+
+        # 预生成每个相机的裁剪变体：(jpeg_bytes, payload or None)
+        factory = SyntheticCropFactory(jpeg, crop_size, quality, seed=seed)
+        t0 = time.time()
+        self.variants = []
+        for cam in range(cameras):
+            cam_variants = []
+            for i in range(variants):
+                payload = f"LOADGEN-C{cam}-{i:06d}"
+                jpeg_bytes, has_code = factory.make_crop(payload)
+                cam_variants.append((jpeg_bytes, payload if has_code else None))
+            self.variants.append(cam_variants)
+        avg_kb = sum(len(v[0]) for cv in self.variants for v in cv) / max(cameras * variants, 1) / 1024
+        print(f"🧪 负载生成器: {cameras} 相机 × {crops} 裁剪/帧，裁剪 {crop_size[0]}x{crop_size[1]}，"
+              f"质量 {quality}，平均 {avg_kb:.1f} KB/裁剪，预生成用时 {time.time() - t0:.1f} s")
+
+    @property
+    def crops_per_message(self):
+        return self.cameras * self.crops
+
+    def build_body(self):
+        """拼出一帧的 元数据+JPEG 对（不含6字节帧头）"""
+        t = time.time() - self.start_time
+        fw, fh = self.frame_size
+        cw, ch = self.crop_size
+        parts = []
+        for cam in range(self.cameras):
+            position, yaw = self.trajectories[cam].pose(t)
+            cam_variants = self.variants[cam]
+            for k in range(self.crops):
+                jpeg_bytes, payload = cam_variants[(self.frame_index * self.crops + k) % len(cam_variants)]
+                meta = {
+                    'roi': {'x': self.rng.randint(0, max(fw - cw, 0)), 'y': self.rng.randint(0, max(fh - ch, 0)),
+                            'width': cw, 'height': ch, 'label': 'qr' if payload else 'shelf',
+                            'confidence': round(self.rng.uniform(0.5, 1.0), 3)},
+                    'camera': {'id': cam},
+                    'pose': {'position': position},
+                    'yaw_deg': yaw,
+                    'synthetic': {'payload': payload},
+                }
+                meta_bytes = json.dumps(meta).encode('utf-8')
+                parts.append(len(meta_bytes).to_bytes(4, 'big'))
+                parts.append(meta_bytes)
+                parts.append(len(jpeg_bytes).to_bytes(4, 'big'))
+                parts.append(jpeg_bytes)
+        self.frame_index += 1
+        return b''.join(parts)
+
+
+class AckMonitor:
+    """监听接收器回传的ACK（2字节帧序号 + 4字节发送时间戳），统计确认数和延迟"""
+
+    def __init__(self, ack_port, keep_samples=False):
+        self.lock = threading.Lock()
+        self.acked = 0
+        self.latency_sum_ms = 0.0
+        self.latency_max_ms = 0.0
+        self.keep_samples = keep_samples  # 保留每条延迟，用于计算分位数
+        self.samples = []
+        self.running = True
+        self.sub = pynng.Sub0()
+        self.sub.subscribe(b"")
+        self.sub.recv_timeout = 500
+        self.sub.listen(f"tcp://*:{ack_port}")
+        print(f"✅ ACK监听: 端口 {ack_port}（接收器需以 --client <本机IP> 启动）")
+        threading.Thread(target=self._loop, daemon=True, name="Ack-Monitor").start()
+
+    def _loop(self):
+        while self.running:
+            try:
+                data = self.sub.recv()
+            except pynng.Timeout:
+                continue
+            except nng_exceptions.Closed:
+                break
+            if len(data) < 6:
+                continue
+            sent_ms = int.from_bytes(data[2:6], 'big')
+            latency = ((int(time.time() * 1000) & 0xFFFFFFFF) - sent_ms) & 0xFFFFFFFF
+            with self.lock:
+                self.acked += 1
+                self.latency_sum_ms += latency
+                self.latency_max_ms = max(self.latency_max_ms, latency)
+                if self.keep_samples:
+                    self.samples.append(latency)
+
+    def snapshot_and_reset(self):
+        """返回 (确认数, 平均延迟ms, 最大延迟ms) 并清零窗口"""
+        with self.lock:
+            acked = self.acked
+            avg = self.latency_sum_ms / acked if acked else 0.0
+            peak = self.latency_max_ms
+            self.acked = 0
+            self.latency_sum_ms = 0.0
+            self.latency_max_ms = 0.0
+        return acked, avg, peak
+
+    def take_samples(self):
+        """取出并清空已保留的延迟样本（ms）"""
+        with self.lock:
+            samples = self.samples
+            self.samples = []
+        return samples
+
+    def close(self):
+        self.running = False
+        try:
+            self.sub.close()
+        except Exception:
+            pass
+
+
+class RampController:
+    """逐级提速：每级运行固定时长，确认率低于阈值即判定饱和"""
+
+    def __init__(self, start_fps, step_fps, step_seconds, max_fps, drop_threshold=0.02):
+        self.fps = start_fps
+        self.step_fps = step_fps
+        self.step_seconds = step_seconds
+        self.max_fps = max_fps
+        self.drop_threshold = drop_threshold
+        self.step_start = time.time()
+        self.step_sent = 0
+        self.history = []  # [(fps, sent, acked, avg_latency, max_latency)]
+        self.saturated_at = None
+
+    def on_sent(self):
+        self.step_sent += 1
+
+    def step_due(self):
+        return time.time() - self.step_start >= self.step_seconds
+
+    def finish_step(self, acked, avg_latency, max_latency):
+        """结束当前级，返回新的目标fps；返回 None 表示结束"""
+        sent = self.step_sent
+        ratio = acked / sent if sent else 0.0
+        self.history.append((self.fps, sent, acked, avg_latency, max_latency))
+        print(f"📈 {self.fps:.1f} fps: 发送 {sent}，确认 {acked} ({ratio * 100:.1f}%)，"
+              f"延迟 平均 {avg_latency:.1f} ms / 最大 {max_latency:.1f} ms")
+        if ratio < 1.0 - self.drop_threshold:
+            self.saturated_at = self.fps
+            return None
+        if self.fps + self.step_fps > self.max_fps:
+            return None
+        self.fps += self.step_fps
+        self.step_start = time.time()
+        self.step_sent = 0
+        return self.fps
+
+    def report(self, crops_per_message):
+        if self.saturated_at is None:
+            print(f"✅ 爬坡结束：直到 {self.fps:.1f} fps 未出现丢帧")
+            return
+        sustained = [h[0] for h in self.history if h[1] and h[2] / h[1] >= 1.0 - self.drop_threshold]
+        best = max(sustained) if sustained else 0.0
+        print(f"🚩 接收器饱和点: {self.saturated_at:.1f} fps 开始丢帧；"
+              f"最高稳定 {best:.1f} fps ≈ {best * crops_per_message:.0f} 裁剪/s")
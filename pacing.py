@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发送速率控制
+按单调时钟上的绝对时间轴调度每次发送，编码/发送耗时不会累积成速率漂移。
+速率 <= 0 表示不限速（全速发送，只做统计）。
+支持三种到达模式：
+    constant  固定间隔
+    poisson   泊松到达（指数分布间隔，平均速率不变）
+    burst     突发：每个周期内连续发送 burst_size 条，平均速率不变
+落后于时间轴时的策略：
+    catchup   不睡眠连续补发，直到追上时间轴（落后过多时放弃补发，重新对齐）
+    skip      跳过已错过的时间点，只对齐到下一个未来时间点
+"""
+
+import math
+import random
+import time
+
+# time.sleep 的唤醒误差通常在 0.05~1 ms，剩余时间小于该值时改为自旋等待
+SPIN_THRESHOLD = 0.001
+
+
+def sleep_until(deadline):
+    """睡眠到 perf_counter 时间点 deadline（粗睡眠 + 末端自旋）"""
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return
+        if remaining > SPIN_THRESHOLD:
+            time.sleep(remaining - SPIN_THRESHOLD)
+
+
+class Pacer:
+    """绝对时间轴速率控制器"""
+
+    def __init__(self, rate, pattern='constant', policy='catchup', burst_size=10,
+                 max_catchup=None, seed=0):
+        if pattern not in ('constant', 'poisson', 'burst'):
+            raise ValueError(f"未知的到达模式: {pattern}")
+        if policy not in ('catchup', 'skip'):
+            raise ValueError(f"未知的落后策略: {policy}")
+        self.pattern = pattern
+        self.policy = policy
+        self.burst_size = max(1, int(burst_size))
+        self.rng = random.Random(seed)
+        self.rate = float(rate)
+        # 补发上限：默认最多补1秒的量
+        self.max_catchup = max_catchup if max_catchup is not None else max(1, int(self.rate))
+
+        self.next_time = None
+        self.burst_index = 0
+
+        # 统计（窗口 + 累计）
+        self.total_sent = 0
+        self.total_skipped = 0
+        self.total_resyncs = 0
+        self._reset_window(time.perf_counter())
+
+    def _reset_window(self, now):
+        self.window_start = now
+        self.window_sent = 0
+        self.window_skipped = 0
+        self.window_lateness = []  # 实际发送时间 - 计划时间（秒）
+
+    def set_rate(self, rate):
+        """修改目标速率（从当前时间重新对齐时间轴）"""
+        self.rate = float(rate)
+        self.max_catchup = max(1, int(self.rate))
+        self.next_time = None
+        self.burst_index = 0
+
+    def _interval(self):
+        """下一个时间点的间隔"""
+        if self.pattern == 'poisson':
+            return self.rng.expovariate(self.rate)
+        if self.pattern == 'burst':
+            # 突发内部间隔为0，周期末尾补齐整个周期
+            self.burst_index += 1
+            if self.burst_index < self.burst_size:
+                return 0.0
+            self.burst_index = 0
+            return self.burst_size / self.rate
+        return 1.0 / self.rate
+
+    def wait(self):
+        """等待下一个发送时间点，返回计划时间（perf_counter）"""
+        now = time.perf_counter()
+        if self.rate <= 0:
+            return now
+        if self.next_time is None:
+            self.next_time = now
+
+        # 落后的发送次数（近似）；不足一个间隔视为唤醒误差，直接发送
+        behind = (now - self.next_time) * self.rate
+        if behind > 1.0:
+            if self.policy == 'skip':
+                # 跳过已错过的时间点，对齐到下一个未来时间点
+                while self.next_time < now:
+                    self.next_time += self._interval()
+                    self.total_skipped += 1
+                    self.window_skipped += 1
+            elif behind > self.max_catchup:
+                # 落后太多（例如进程被挂起），放弃补发重新对齐
+                self.total_resyncs += 1
+                self.next_time = now
+        sleep_until(self.next_time)
+
+        scheduled = self.next_time
+        self.next_time += self._interval()
+        return scheduled
+
+    def mark_sent(self, scheduled):
+        """记录一次发送完成，用于统计实际速率和抖动"""
+        now = time.perf_counter()
+        self.total_sent += 1
+        self.window_sent += 1
+        self.window_lateness.append(now - scheduled)
+
+    def window_stats(self, reset=True):
+        """返回窗口统计 dict：achieved_rate, jitter_ms(标准差), p99_late_ms, skipped"""
+        now = time.perf_counter()
+        elapsed = now - self.window_start
+        lateness = self.window_lateness
+        if lateness:
+            mean = sum(lateness) / len(lateness)
+            jitter = math.sqrt(sum((x - mean) ** 2 for x in lateness) / len(lateness))
+            p99 = sorted(lateness)[min(len(lateness) - 1, int(len(lateness) * 0.99))]
+        else:
+            mean = jitter = p99 = 0.0
+        stats = {
+            'target_rate': self.rate,
+            'achieved_rate': self.window_sent / elapsed if elapsed > 0 else 0.0,
+            'mean_late_ms': mean * 1000.0,
+            'jitter_ms': jitter * 1000.0,
+            'p99_late_ms': p99 * 1000.0,
+            'skipped': self.window_skipped,
+        }
+        if reset:
+            self._reset_window(now)
+        return stats
+
+    def describe(self):
+        if self.rate <= 0:
+            return "不限速"
+        text = f"{self.rate:g}/s {self.pattern}"
+        if self.pattern == 'burst':
+            text += f"(×{self.burst_size})"
+        return f"{text}，落后策略 {self.policy}"
+
+
+def format_pacing_stats(stats):
+    """格式化速率统计，用于周期性打印"""
+    text = (f"目标 {stats['target_rate']:.1f}/s，实际 {stats['achieved_rate']:.1f}/s，"
+            f"抖动 {stats['jitter_ms']:.2f} ms，P99滞后 {stats['p99_late_ms']:.2f} ms")
+    if stats['skipped']:
+        text += f"，跳过 {stats['skipped']}"
+    return text
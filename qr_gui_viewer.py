@@ -7,43 +7,56 @@
 按照文档设计：区域1（统计）、区域2（最终识别结果）、区域3（图片-OpenCV窗口）、区域4（每次识别结果）
 """
 
+import importlib
+import time
+STARTUP_T0 = time.perf_counter()  # 模块开始导入的时间（不含解释器/打包解压），用于统计启动和首帧耗时
+
 import tkinter as tk
 from tkinter import ttk, scrolledtext, filedialog
-import cv2
 import numpy as np
 from PIL import Image, ImageTk
 import threading
 import queue
-import csv
 import os
-import time
-import json
+import sys
 from datetime import datetime
 from collections import defaultdict
-import pynng
-import pynng.exceptions as nng_exceptions
-from turbojpeg import TurboJPEG
-from dynamsoft_barcode_reader_bundle import *
+from receiver_core import ReceiverCore, load_config, format_ring_stats
+from decode_queue import format_queue_stats
+from frame_sampler import format_sampler_stats, SAMPLING_MODES
+from code_tracker import format_tracker_stats
+from worker_autoscaler import format_autoscale_stats, format_scale_event
+from display_pacer import create_pacer
+from thumbnail_cache import ThumbnailCache
+from filmstrip_window import FilmstripWindow
+from code_index import product_key
+from result_export import (TransferJob, export_rows, import_csv_rows, iter_log_rows, parse_log_line,
+                           RAW_COLUMNS, JOINED_COLUMNS)
+from decoders import create_backend, DECODER_BACKENDS, DECODE_INPUTS
+
+# 上位机使用的DBR许可证（可由配置 DBRLicense 覆盖）
+DBR_LICENSE = "f0068dAAAAFWtn4QhSRS1Tvi5U5Q/kX6u5Sz/Onam1CRr122KlQMR8r7g6OjGgpS9wp90khfbsOmOmxWWwcrULU5/VCHDxlY="
 
 
 class QRViewerGUI:
-    def __init__(self, root, listen_host=None, camera_ip=None, enable_dbr=False):
+    LISTEN_PORT = 6666  # 默认数据端口（ACK端口为+1），与 simple_receiver 的5555区分，可同机运行
+    SLOT_NUM = 5000  # 环形槽位数量（界面可往前翻页浏览）
+    EXPORT_CONTENTS = ('汇总', '识别记录', '识别记录+位置/帧')  # 导出内容选项
+    IDLE_WAIT = 1.0  # 显示线程空闲时最长阻塞时间（秒），新数据/翻页会立即唤醒
+
+    def __init__(self, root, listen_host=None, camera_ip=None, enable_dbr=False, transport='tcp', record_dir=None,
+                 decoder_backend=None, decode_input=None, decode_scale=None, sampling=None,
+                 tracking=None, autoscale=None):
         self.root = root
         self.root.title("二维码识别结果展示系统")
         self.root.geometry("1600x1000")
         
-        # 配置参数（从命令行参数获取）
-        self.listen_host = listen_host if listen_host else '0.0.0.0'
-        self.listen_port = 6666
-        self.camera_node_ip = camera_ip if camera_ip else '192.168.0.176'
-        self.ack_port = 6667
-        self.dbr_enabled = bool(enable_dbr)
-        
         # 加载配置文件
-        config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'camera_config.json')
-        self.config = self._load_config(config_path)
-        self.dbr_thread_count = self.config.get('MaxParallelTasks', 8)
-        self.dbr_timeout = self.config.get('Timeout', 10000)
+        self.config = load_config()
+        # 解码后端：命令行参数 > 配置文件 DecoderBackend > 默认 dbr（DBR只启用许可证允许的格式）
+        backend = create_backend(decoder_backend, self.config,
+                                 license_key=self.config.get('DBRLicense', DBR_LICENSE),
+                                 restrict_formats=True)
         
         # 识别结果数据
         self.recognition_results = []  # 原始DBR log格式数据
@@ -66,65 +79,46 @@ class QRViewerGUI:
         self.log_file_path = None
         self.last_log_position = 0
         
-        # NNG接收器（服务器模式，接收数据）
-        self.nng_subscriber = None
-        self.received_count = 0
-        self.last_successful_receive = 0
-        self.current_frame_sequence = 0
-        self.recv_seq_counter = 0
-        
-        # ACK发送器
-        self.ack_sender = None
-        
-        # DBR相关
-        self.dbr_queue = None
-        self.dbr_threads = []
-        self.dbr_log_file = None
-        self.dbr_global_seq = 0
-        self.dbr_dropped_frames = 0
-        self.dbr_total_time_ms = 0.0
-        self.dbr_total_attempts = 0
-        self.dbr_total_decoded = 0
-        self.dbr_stats_lock = threading.Lock()
-        
-        # OpenCV显示相关（从simple_receiver.py集成）
+        self._queue_stats_time = time.time()  # 上次刷新显示耗时/识别队列统计的时间
+        self._first_frame_shown = False
+        self._canvas_scene = None  # 画布上的图片/覆盖层项目id（第一帧时创建，之后原地更新）
+        self.thumbnails = None  # 缩略图缓存与生成线程池（第一次打开缩略图窗口时创建）
+        self.filmstrip = None  # 缩略图浏览窗口
+        self._summary_row_keys = {}  # 汇总表格行 -> 商品信息键（点击跳转用）
+        self._search_query = None  # 上一次搜索/点击的内容，重复时依次跳到下一处
+        self._search_pos = -1
+        self.transfer_job = None  # 正在运行的导出/导入后台任务（同一时间只运行一个）
+        self.display_stats = {'frames': 0, 'total_ms': 0.0, 'max_ms': 0.0}  # Tk主线程每帧显示耗时
+        
+        # 图片显示控制（槽位由 self.ring 管理）
         self.running = True
-        self.slot_num = 5000
-        self.crops_buffer = [None] * self.slot_num
-        self.write_index = 0
         self.read_index = -1
-        self.latest_index = -1
+        self.ring_generation = 0  # 槽位数调整（配置热加载）后槽位号失效，需要重新定位
         self.locked_latest_index = -1
         self.first_crop = True
-        self.base_round_duration = 0.033  # 33ms，适配30fps视频流（每帧33.3ms）
         self.target_display_fps = 30.0  # 目标显示帧率（fps）
         self.frame_display_interval = 1.0 / self.target_display_fps  # 每帧显示间隔
+        self.display_pacer = create_pacer(self.config)  # 刷新节拍（配置 DisplayMaxFps，默认60fps）
         self.last_frame_display_time = 0  # 上次显示帧的时间
-        self.last_switch_time = 0
         self.delta = 0
         self.locked_delta = 0
         self.left_arrow_rect = None
         self.right_arrow_rect = None
-        
-        # 初始化TurboJPEG
-        try:
-            self.jpeg = TurboJPEG()
-        except Exception as e:
-            if os.name == 'nt':
-                try:
-                    self.jpeg = TurboJPEG(r"C:\libjpeg-turbo64\bin\libturbojpeg.dll")
-                except:
-                    print(f"❌ TurboJPEG初始化失败: {e}")
-                    raise
-            else:
-                print(f"❌ TurboJPEG初始化失败: {e}")
-                raise
-        
-        # 初始化NNG服务器和DBR（在UI创建之前）
-        self._init_nng_server()
-        self._init_ack_sender()
-        if self.dbr_enabled:
-            self._init_dbr()
+        self.tcp_connected = False
+        
+        # 接收 → 环形槽位 → 识别 → 结果日志 由 receiver_core 负责（与 simple_receiver 共用），在UI创建之前初始化
+        # 配置参数：命令行参数 > 配置文件 > 默认值（端口用 gui_listen_port，与 simple_receiver 的 listen_port 区分）
+        listen_port = self.config.get('gui_listen_port', self.LISTEN_PORT)
+        self.pipeline = ReceiverCore(
+            self.config, listen_host=listen_host or '0.0.0.0', listen_port=listen_port,
+            camera_ip=camera_ip or '192.168.0.176', ack_port=listen_port + 1,
+            slot_num=self.config.get('SlotNum', self.SLOT_NUM),
+            transport=transport, record_dir=record_dir, enable_dbr=enable_dbr, decoder_backend=backend,
+            decode_input=decode_input, decode_scale=decode_scale, sampling=sampling, tracking=tracking,
+            autoscale=autoscale,
+            quiet=True, on_message=self._on_message)
+        self.ring = self.pipeline.ring
+        self.jpeg = self.pipeline.jpeg
         
         # 设置鼠标回调函数（OpenCV窗口用）
         self.setup_mouse_callback()
@@ -217,14 +211,41 @@ class QRViewerGUI:
         self.barcode_var = tk.StringVar(value="0")
         ttk.Label(barcode_frame, textvariable=self.barcode_var, font=('Arial', 11, 'bold')).pack(side=tk.LEFT)
         
-        # CSV按钮（导出和导入）
+        # 识别队列（实时/手动任务的排队等待）
+        queue_frame = ttk.Frame(stats_label_frame)
+        queue_frame.pack(fill=tk.X, pady=5)
+        ttk.Label(queue_frame, text="识别队列:", font=('Arial', 11)).pack(side=tk.LEFT, padx=5)
+        self.queue_var = tk.StringVar(value="-")
+        ttk.Label(queue_frame, textvariable=self.queue_var, font=('Arial', 9), wraplength=260,
+                  justify=tk.LEFT).pack(side=tk.LEFT)
+        
+        # 图片显示：Tk主线程每帧耗时
+        display_frame = ttk.Frame(stats_label_frame)
+        display_frame.pack(fill=tk.X, pady=5)
+        ttk.Label(display_frame, text="图片显示:", font=('Arial', 11)).pack(side=tk.LEFT, padx=5)
+        self.display_time_var = tk.StringVar(value="-")
+        ttk.Label(display_frame, textvariable=self.display_time_var, font=('Arial', 9)).pack(side=tk.LEFT)
+        
+        # 导出/导入按钮（后台流式读写，导出按扩展名选择 CSV/XLSX）
         csv_frame = ttk.Frame(parent)
         csv_frame.pack(pady=5, fill=tk.X)
-        csv_export_btn = ttk.Button(csv_frame, text="导出CSV", command=self.export_to_csv)
+        self.export_content_var = tk.StringVar(value=self.EXPORT_CONTENTS[0])
+        export_content_combo = ttk.Combobox(csv_frame, textvariable=self.export_content_var,
+                                            values=self.EXPORT_CONTENTS, state='readonly', width=14)
+        export_content_combo.pack(side=tk.LEFT, padx=2)
+        csv_export_btn = ttk.Button(csv_frame, text="导出", command=self.export_results)
         csv_export_btn.pack(side=tk.LEFT, padx=2, fill=tk.X, expand=True)
         csv_import_btn = ttk.Button(csv_frame, text="导入CSV", command=self.import_from_csv)
         csv_import_btn.pack(side=tk.LEFT, padx=2, fill=tk.X, expand=True)
         
+        transfer_frame = ttk.Frame(parent)
+        transfer_frame.pack(fill=tk.X)
+        self.transfer_var = tk.StringVar(value="")
+        ttk.Label(transfer_frame, textvariable=self.transfer_var, font=('Arial', 9)).pack(side=tk.LEFT, padx=5)
+        self.transfer_cancel_btn = ttk.Button(transfer_frame, text="取消", command=self.cancel_transfer,
+                                              width=6, state=tk.DISABLED)
+        self.transfer_cancel_btn.pack(side=tk.RIGHT, padx=2)
+        
         # 控制面板（减少padding，与右侧对齐）
         control_frame = ttk.LabelFrame(parent, text="控制", padding=5)
         control_frame.pack(fill=tk.BOTH, expand=True, pady=(2, 5))
@@ -266,10 +287,29 @@ class QRViewerGUI:
         jump_btn = ttk.Button(jump_frame, text="跳转", command=self.jump_to_image, width=6)
         jump_btn.pack(side=tk.LEFT, padx=2)
         
+        # 缩略图网格浏览（点击直接跳转）
+        filmstrip_btn = ttk.Button(jump_frame, text="缩略图", command=self.open_filmstrip, width=6)
+        filmstrip_btn.pack(side=tk.LEFT, padx=2)
+        
         # 显示当前信息（在同一行，自适应宽度铺满）
         self.current_image_info = ttk.Label(jump_frame, text="当前: 0/0", font=('Arial', 9), anchor=tk.W, width=16)
         self.current_image_info.pack(side=tk.LEFT, padx=(10, 0), fill=tk.X, expand=True)
         
+        # 按识别内容查找图片（倒排索引，重复搜索依次跳到下一处）
+        search_frame = ttk.Frame(control_frame)
+        search_frame.pack(fill=tk.X, pady=2)
+        
+        ttk.Label(search_frame, text="查找内容:").pack(side=tk.LEFT, padx=5)
+        self.search_entry = ttk.Entry(search_frame, width=18)
+        self.search_entry.pack(side=tk.LEFT, padx=2)
+        self.search_entry.bind('<Return>', self.search_code)
+        
+        search_btn = ttk.Button(search_frame, text="查找", command=self.search_code, width=6)
+        search_btn.pack(side=tk.LEFT, padx=2)
+        
+        self.search_info = ttk.Label(search_frame, text="", font=('Arial', 9), anchor=tk.W)
+        self.search_info.pack(side=tk.LEFT, padx=(10, 0), fill=tk.X, expand=True)
+        
         
         # 自动查找最新日志文件
         self.auto_find_latest_var = tk.BooleanVar(value=True)
@@ -325,6 +365,9 @@ class QRViewerGUI:
         table_frame.grid_rowconfigure(0, weight=1)
         table_frame.grid_columnconfigure(0, weight=1)
         
+        # 双击汇总行跳到该商品所在的图片（重复双击依次跳到下一处）
+        self.summary_tree.bind('<Double-1>', self.on_summary_double_click)
+        
         # 初始数据
         self.update_summary_table()
     
@@ -347,6 +390,7 @@ class QRViewerGUI:
     def show_image_placeholder(self):
         """显示图片占位符"""
         self.image_canvas.delete("all")
+        self._canvas_scene = None  # 画布项目已删除，下一帧重新创建
         # 只显示黑色背景，不显示任何文字
     
     def on_image_click(self, event):
@@ -358,43 +402,39 @@ class QRViewerGUI:
         
         # 检查是否点击在左箭头区域
         if self.left_arrow_rect and self.is_point_in_rect(x, y, self.left_arrow_rect):
-            N = min(1000, self.received_count)
+            N = min(1000, self.pipeline.received_count)
             if self.delta > (1 - N):
                 self.delta -= 1
-                self.update_image_display()
+                self.ring.wake()  # 由显示线程按新的偏移刷新
         
         # 检查是否点击在右箭头区域
         elif self.right_arrow_rect and self.is_point_in_rect(x, y, self.right_arrow_rect):
             if self.delta < 0:
                 self.delta += 1
-                self.update_image_display()
+                self.ring.wake()  # 由显示线程按新的偏移刷新
     
     def update_image_display(self):
-        """更新图片显示"""
+        """更新图片显示（Tk主线程）：画布上的图片和覆盖层项目只创建一次，之后原地更新"""
         if not hasattr(self, 'image_canvas'):
             return
+        t0 = time.perf_counter()
             
         # 获取当前要显示的照片
-        display_index = (self.read_index + self.locked_delta) % self.slot_num
-        current_crop = self.crops_buffer[display_index]
+        display_index = (self.read_index + self.locked_delta) % self.ring.slot_num
+        current_crop = self.ring.get(display_index)
         
         # 如果目标槽位为空，尝试向前查找有数据的槽位（最多查找10个）
         if not current_crop:
-            found_valid = False
-            for offset in range(1, min(10, self.slot_num)):
-                check_index = (display_index - offset) % self.slot_num
-                check_crop = self.crops_buffer[check_index]
-                if check_crop:
-                    current_crop = check_crop
-                    display_index = check_index
-                    found_valid = True
-                    break
-            
+            display_index = self.ring.find_valid(display_index, 10, skip_start=True)
             # 如果仍然找不到有效数据，保持当前显示，不显示黑屏
-            if not found_valid:
+            if display_index is None:
                 return  # 保持当前显示，不更新
+            current_crop = self.ring.get(display_index)
+            if not current_crop:
+                return  # 读取期间被覆盖（快照校验失败），下次刷新再显示
         
         try:
+            import cv2  # 按需导入（启动时由后台线程预热，见 _prewarm_imports）
             # 解码JPEG数据
             img_data = current_crop['image_data']
             bgr_image = self.jpeg.decode(img_data)
@@ -425,17 +465,24 @@ class QRViewerGUI:
             # 转换为PIL Image
             pil_image = Image.fromarray(resized_image)
             
-            # 转换为Tkinter PhotoImage
-            photo = ImageTk.PhotoImage(pil_image)
-            
-            # 清除Canvas并显示图片
-            self.image_canvas.delete("all")
+            scene = self._ensure_canvas_scene()
+            photo = self.image_canvas.image
+            if photo is not None and (photo.width(), photo.height()) == (new_width, new_height):
+                # 尺寸不变：直接把新像素写进现有的 PhotoImage，不新建Tk图片对象
+                photo.paste(pil_image)
+            else:
+                # 第一帧或尺寸变化（窗口缩放/裁剪尺寸不同）才重建
+                photo = ImageTk.PhotoImage(pil_image)
+                self.image_canvas.itemconfigure(scene['image'], image=photo)
+                # 保存引用防止垃圾回收
+                self.image_canvas.image = photo
             x = (canvas_width - new_width) // 2
             y = (canvas_height - new_height) // 2
-            self.image_canvas.create_image(x, y, anchor=tk.NW, image=photo)
+            self.image_canvas.coords(scene['image'], x, y)
             
-            # 保存引用防止垃圾回收
-            self.image_canvas.image = photo
+            if not self._first_frame_shown:
+                self._first_frame_shown = True
+                print(f"⏱️ 首帧已显示，距启动 {(time.perf_counter() - STARTUP_T0) * 1000:.0f} ms")
             
             # 添加信息覆盖层
             self.draw_image_overlay(current_crop, canvas_width, canvas_height)
@@ -447,51 +494,92 @@ class QRViewerGUI:
             print(f"图片显示错误: {e}")
             # 发生异常时，保持当前显示，不清空画布（避免黑屏）
             return
+        
+        # Tk主线程每帧耗时（解码+缩放+画布更新）
+        elapsed_ms = (time.perf_counter() - t0) * 1000.0
+        stats = self.display_stats
+        stats['frames'] += 1
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+    
+    def _ensure_canvas_scene(self):
+        """第一次显示时创建画布上的全部项目（图片 + 覆盖层文字/背景框/箭头），之后只改内容、位置和显隐"""
+        if self._canvas_scene is not None:
+            return self._canvas_scene
+        canvas = self.image_canvas
+        canvas.delete("all")
+        canvas.image = None
+        scene = {'image': canvas.create_image(0, 0, anchor=tk.NW)}
+        hidden = tk.HIDDEN
+        
+        # 带半透明背景的文字：先建背景框再建文字，背景自然在文字下方
+        def text_with_bg(name, fill, font_tuple, anchor):
+            scene[name + '_bg'] = canvas.create_rectangle(0, 0, 0, 0, fill="#000000", outline="", stipple="gray50",
+                                                          state=hidden)
+            scene[name] = canvas.create_text(0, 0, fill=fill, font=font_tuple, anchor=anchor, state=hidden)
+        
+        text_with_bg('info', "lime", ('Arial', 10, 'bold'), tk.NW)
+        text_with_bg('status', "lime", ('Arial', 10, 'bold'), tk.NE)
+        text_with_bg('detection', "yellow", ('Arial', 9), tk.NW)
+        scene['dbr_elapsed'] = canvas.create_text(0, 0, fill="cyan", font=('Arial', 9), anchor=tk.W, state=hidden)
+        scene['dbr_lines'] = [canvas.create_text(0, 0, fill="cyan", font=('Arial', 8), anchor=tk.W, state=hidden)
+                              for _ in range(2)]
+        for name, arrow_text in (('arrow_left', "<"), ('arrow_right', ">")):
+            scene[name] = canvas.create_text(0, 0, text=arrow_text, fill="white", font=('Arial', 24, 'bold'),
+                                             anchor=tk.CENTER, state=hidden)
+            scene[name + '_box'] = canvas.create_rectangle(0, 0, 0, 0, fill="", outline="white", width=2,
+                                                           stipple="gray50", state=hidden)
+        scene['page'] = canvas.create_text(0, 0, fill="yellow", font=('Arial', 12, 'bold'), anchor=tk.CENTER,
+                                           state=hidden)
+        scene['control'] = canvas.create_text(0, 0, text="ESC=Quit, SPACE=Manual DBR, ←→=Navigate", fill="white",
+                                              font=('Arial', 8), anchor=tk.SE, state=hidden)
+        self._canvas_scene = scene
+        return scene
+    
+    def _update_scene_text(self, item, x, y, text, fill=None, bg=None):
+        """原地更新一个文字项目（位置/内容/颜色，None 表示不变）并显示；有背景框时跟随文字外框，返回文字外框"""
+        canvas = self.image_canvas
+        options = {'state': tk.NORMAL}
+        if text is not None:
+            options['text'] = text
+        if fill is not None:
+            options['fill'] = fill
+        canvas.coords(item, x, y)
+        canvas.itemconfigure(item, **options)
+        bbox = canvas.bbox(item)
+        if bg is not None and bbox:
+            x1, y1, x2, y2 = bbox
+            pad = 2
+            canvas.coords(bg, x1 - pad, y1 - pad, x2 + pad, y2 + pad)
+            canvas.itemconfigure(bg, state=tk.NORMAL)
+        return bbox
+    
+    def _hide_scene_items(self, *items):
+        for item in items:
+            self.image_canvas.itemconfigure(item, state=tk.HIDDEN)
     
     def draw_image_overlay(self, current_crop, canvas_width, canvas_height):
-        """在图片上绘制信息覆盖层"""
+        """更新图片上的信息覆盖层（项目由 _ensure_canvas_scene 预先创建）"""
         try:
+            scene = self._ensure_canvas_scene()
             metadata = current_crop['metadata']
-            
-            # 小工具：绘制带半透明背景的文字，返回下一行的 y
-            def draw_text_with_bg(x, y, text, fill, font_tuple):
-                tid = self.image_canvas.create_text(x, y, text=text, fill=fill, font=font_tuple, anchor=tk.NW)
-                bbox = self.image_canvas.bbox(tid)
-                if bbox:
-                    x1, y1, x2, y2 = bbox
-                    pad = 2
-                    # 先置于底层的半透明背景矩形
-                    rect = self.image_canvas.create_rectangle(x1 - pad, y1 - pad, x2 + pad, y2 + pad,
-                                                              fill="#000000", outline="", stipple="gray50")
-                    # 确保矩形在文字下方
-                    self.image_canvas.tag_lower(rect, tid)
-                    return y2 + 6  # 下一行 y（含行距）
-                return y + 18
 
             # 基础信息
             frame_id = current_crop.get('frame_sequence', 0)
-            display_index = (self.read_index + self.locked_delta) % self.slot_num
+            display_index = (self.read_index + self.locked_delta) % self.ring.slot_num
             # 展示缓冲与总页：Buffer = 可翻页/缓冲容量
-            buffer_vis = min(self.slot_num, self.received_count)
-            info_text = f"Frame:{frame_id} | Index:{display_index} | Total:{self.stats['total_recognitions']} | Buffer:{buffer_vis}/{self.slot_num}"
+            buffer_vis = min(self.ring.slot_num, self.pipeline.received_count)
+            info_text = f"Frame:{frame_id} | Index:{display_index} | Total:{self.stats['total_recognitions']} | Buffer:{buffer_vis}/{self.ring.slot_num}"
             
-            # 按行自下而上绘制，避免重叠
-            cur_y = 10
-            cur_y = draw_text_with_bg(10, cur_y, info_text, "lime", ('Arial', 10, 'bold'))
+            # 按行自上而下排列，避免重叠
+            bbox = self._update_scene_text(scene['info'], 10, 10, info_text, bg=scene['info_bg'])
+            cur_y = bbox[3] + 6 if bbox else 28  # 下一行 y（含行距）
             
-            # TCP连接状态
+            # TCP连接状态（右上角，同样加背景）
             status_color = "lime" if self.tcp_connected else "red"
             status_text = "TCP: 连接" if self.tcp_connected else "TCP: 断开"
-            # 右上角状态同样加背景
-            tid = self.image_canvas.create_text(canvas_width - 10, 10, text=status_text, fill=status_color,
-                                                font=('Arial', 10, 'bold'), anchor=tk.NE)
-            bbox = self.image_canvas.bbox(tid)
-            if bbox:
-                x1, y1, x2, y2 = bbox
-                pad = 2
-                rect = self.image_canvas.create_rectangle(x1 - pad, y1 - pad, x2 + pad, y2 + pad,
-                                                          fill="#000000", outline="", stipple="gray50")
-                self.image_canvas.tag_lower(rect, tid)
+            self._update_scene_text(scene['status'], canvas_width - 10, 10, status_text, fill=status_color,
+                                    bg=scene['status_bg'])
             
             # 检测信息
             roi_info = metadata.get('roi', {})
@@ -508,135 +596,70 @@ class QRViewerGUI:
             else:
                 detection_text = f"{label} | Conf: {confidence:.3f}"
             
-            cur_y = draw_text_with_bg(10, cur_y, detection_text, "yellow", ('Arial', 9))
+            self._update_scene_text(scene['detection'], 10, cur_y, detection_text, bg=scene['detection_bg'])
             
-            # DBR识别结果
+            # DBR识别结果（显示前2个结果）
             dbr_items = current_crop.get('dbr_items')
             dbr_elapsed = current_crop.get('dbr_elapsed_ms')
             if dbr_items:
                 elapsed_text = f"DBR: {float(dbr_elapsed):.1f} ms"
-                self.image_canvas.create_text(
-                    10, canvas_height - 40, 
-                    text=elapsed_text, 
-                    fill="cyan", 
-                    font=('Arial', 9),
-                    anchor=tk.W
-                )
-                
-                # 显示前2个结果
-                for i, item in enumerate(dbr_items[:2]):
-                    fmt = item.get('fmt', 'UNK')
-                    txt = item.get('text', '')
-                    line = f"[{fmt}] {txt}"
-                    y = canvas_height - 20 + i * 15
-                    self.image_canvas.create_text(
-                        10, y, 
-                        text=line, 
-                        fill="cyan", 
-                        font=('Arial', 8),
-                        anchor=tk.W
-                    )
+                self._update_scene_text(scene['dbr_elapsed'], 10, canvas_height - 40, elapsed_text)
+                for i, item_id in enumerate(scene['dbr_lines']):
+                    if i < len(dbr_items):
+                        item = dbr_items[i]
+                        line = f"[{item.get('fmt', 'UNK')}] {item.get('text', '')}"
+                        self._update_scene_text(item_id, 10, canvas_height - 20 + i * 15, line)
+                    else:
+                        self._hide_scene_items(item_id)
+            else:
+                self._hide_scene_items(scene['dbr_elapsed'], *scene['dbr_lines'])
             
             # 绘制左右箭头和翻页控制
             self.draw_navigation_arrows(canvas_width, canvas_height)
             
             # 控制提示
-            control_text = "ESC=Quit, SPACE=Manual DBR, ←→=Navigate"
-            self.image_canvas.create_text(
-                canvas_width - 10, canvas_height - 10, 
-                text=control_text, 
-                fill="white", 
-                font=('Arial', 8),
-                anchor=tk.SE
-            )
+            self.image_canvas.coords(scene['control'], canvas_width - 10, canvas_height - 10)
+            self.image_canvas.itemconfigure(scene['control'], state=tk.NORMAL)
             
         except Exception as e:
             print(f"覆盖层绘制错误: {e}")
     
     def draw_navigation_arrows(self, canvas_width, canvas_height):
-        """绘制左右箭头和翻页控制"""
+        """更新左右箭头和翻页控制"""
         try:
+            scene = self._ensure_canvas_scene()
             # 计算可翻页的范围
-            N = min(self.slot_num, self.received_count)
+            N = min(self.ring.slot_num, self.pipeline.received_count)
             show_left_arrow = self.delta > (1 - N)
             show_right_arrow = self.delta < 0
             
-            # 左箭头
-            if show_left_arrow:
-                arrow_text = "<"
-                font_size = 24
-                # 计算文字位置
-                text_x = 30
-                text_y = canvas_height // 2
-                
-                # 绘制箭头文字
-                text_id = self.image_canvas.create_text(
-                    text_x, text_y, 
-                    text=arrow_text, 
-                    fill="white", 
-                    font=('Arial', font_size, 'bold'),
-                    anchor=tk.CENTER
-                )
-                
-                # 设置点击区域（文字周围扩大一些）
-                text_bbox = self.image_canvas.bbox(text_id)
-                if text_bbox:
-                    x1, y1, x2, y2 = text_bbox
-                    padding = 20
-                    self.left_arrow_rect = (x1 - padding, y1 - padding, x2 + padding, y2 + padding)
-                    
-                    # 绘制半透明背景
-                    self.image_canvas.create_rectangle(
-                        x1 - padding, y1 - padding, x2 + padding, y2 + padding,
-                        fill="", outline="white", width=2, stipple="gray50"
-                    )
-            else:
-                self.left_arrow_rect = None
-            
-            # 右箭头
-            if show_right_arrow:
-                arrow_text = ">"
-                font_size = 24
-                # 计算文字位置
-                text_x = canvas_width - 30
-                text_y = canvas_height // 2
-                
-                # 绘制箭头文字
-                text_id = self.image_canvas.create_text(
-                    text_x, text_y, 
-                    text=arrow_text, 
-                    fill="white", 
-                    font=('Arial', font_size, 'bold'),
-                    anchor=tk.CENTER
-                )
-                
-                # 设置点击区域
-                text_bbox = self.image_canvas.bbox(text_id)
-                if text_bbox:
-                    x1, y1, x2, y2 = text_bbox
-                    padding = 20
-                    self.right_arrow_rect = (x1 - padding, y1 - padding, x2 + padding, y2 + padding)
-                    
-                    # 绘制半透明背景
-                    self.image_canvas.create_rectangle(
-                        x1 - padding, y1 - padding, x2 + padding, y2 + padding,
-                        fill="", outline="white", width=2, stipple="gray50"
-                    )
-            else:
-                self.right_arrow_rect = None
+            # 左右箭头：点击区域 = 文字外框向外扩大一些，并画出半透明边框
+            padding = 20
+            for name, show, text_x in (('arrow_left', show_left_arrow, 30),
+                                       ('arrow_right', show_right_arrow, canvas_width - 30)):
+                rect = None
+                if show:
+                    text_bbox = self._update_scene_text(scene[name], text_x, canvas_height // 2, None)
+                    if text_bbox:
+                        x1, y1, x2, y2 = text_bbox
+                        rect = (x1 - padding, y1 - padding, x2 + padding, y2 + padding)
+                        self.image_canvas.coords(scene[name + '_box'], *rect)
+                        self.image_canvas.itemconfigure(scene[name + '_box'], state=tk.NORMAL)
+                else:
+                    self._hide_scene_items(scene[name], scene[name + '_box'])
+                if name == 'arrow_left':
+                    self.left_arrow_rect = rect
+                else:
+                    self.right_arrow_rect = rect
                 
             # 显示当前页码信息
             if N > 0:
                 current_page = N + self.delta
                 total_pages = N
                 page_text = f"{current_page}/{total_pages}"
-                self.image_canvas.create_text(
-                    canvas_width // 2, canvas_height - 30, 
-                    text=page_text, 
-                    fill="yellow", 
-                    font=('Arial', 12, 'bold'),
-                    anchor=tk.CENTER
-                )
+                self._update_scene_text(scene['page'], canvas_width // 2, canvas_height - 30, page_text)
+            else:
+                self._hide_scene_items(scene['page'])
                 
         except Exception as e:
             print(f"导航箭头绘制错误: {e}")
@@ -650,13 +673,13 @@ class QRViewerGUI:
             
             # 解析跳转目标
             if jump_text.lower() == 'first' or jump_text == '1':
-                target_delta = 1 - min(self.slot_num, self.received_count)
+                target_delta = 1 - min(self.ring.slot_num, self.pipeline.received_count)
             elif jump_text.lower() == 'last' or jump_text == '0':
                 target_delta = 0
             else:
                 try:
                     target_index = int(jump_text)
-                    N = min(self.slot_num, self.received_count)
+                    N = min(self.ring.slot_num, self.pipeline.received_count)
                     
                     # 检查输入范围
                     if target_index < 1:
@@ -671,11 +694,11 @@ class QRViewerGUI:
                     # 要跳转到第target_index张，需要：delta = target_index - N
                     target_delta = target_index - N
                 except ValueError:
-                    self.update_final_result("请输入有效的图片序号（1-{})或'first'/'last'".format(min(self.slot_num, self.received_count)))
+                    self.update_final_result("请输入有效的图片序号（1-{})或'first'/'last'".format(min(self.ring.slot_num, self.pipeline.received_count)))
                     return
             
             # 检查跳转范围
-            N = min(self.slot_num, self.received_count)
+            N = min(self.ring.slot_num, self.pipeline.received_count)
             if target_delta > 0 or target_delta < (1 - N):
                 self.update_final_result("跳转目标超出范围")
                 return
@@ -697,10 +720,89 @@ class QRViewerGUI:
         except Exception as e:
             self.update_final_result(f"跳转失败: {e}")
     
+    def jump_to_slot(self, slot_index):
+        """跳转到指定槽位的图片（缩略图窗口点击）"""
+        N = min(self.ring.slot_num, self.pipeline.received_count)
+        target_delta = -((self.read_index - slot_index) % self.ring.slot_num)
+        if N == 0 or self.read_index < 0 or target_delta < (1 - N):
+            self.update_final_result("跳转目标超出范围")
+            return
+        self.delta = target_delta
+        self.locked_delta = target_delta
+        self.update_image_display()
+        self.update_current_image_info()
+    
+    def find_code_hits(self, query):
+        """按内容查找仍在缓冲区中的图片：先按完整内容/商品信息精确查找，找不到再按子串匹配；最新的在前"""
+        index = self.pipeline.code_index
+        hits = index.lookup(query)
+        if not hits:
+            seen = set()
+            for key in index.search(query):
+                for hit in index.lookup(key):
+                    if hit.recv_seq not in seen:
+                        seen.add(hit.recv_seq)
+                        hits.append(hit)
+        # 索引与槽位覆盖同步淘汰，这里再校验一次（查找和跳转之间槽位可能刚被覆盖）
+        hits = [hit for hit in hits if self.ring.lookup(hit.slot_index, hit.recv_seq) is not None]
+        hits.sort(key=lambda hit: hit.recv_seq, reverse=True)
+        return hits
+    
+    def jump_to_code(self, query):
+        """跳到包含 query 的图片；与上一次查找内容相同时跳到下一处"""
+        hits = self.find_code_hits(query)
+        if not hits:
+            self._search_query = None
+            self.search_info.config(text="不在缓冲区中")
+            self.update_final_result(f"未找到: {query}（不在缓冲区中）")
+            return
+        if query == self._search_query:
+            self._search_pos = (self._search_pos + 1) % len(hits)
+        else:
+            self._search_query = query
+            self._search_pos = 0
+        hit = hits[self._search_pos]
+        self.jump_to_slot(hit.slot_index)
+        self.search_info.config(text=f"第 {self._search_pos + 1}/{len(hits)} 处  帧 {hit.frame_sequence}  {hit.position}")
+    
+    def search_code(self, event=None):
+        """查找框回车/按钮"""
+        query = self.search_entry.get().strip()
+        if query:
+            self.jump_to_code(query)
+    
+    def on_summary_double_click(self, event):
+        """双击汇总行：跳到该商品所在的图片"""
+        key = self._summary_row_keys.get(self.summary_tree.identify_row(event.y))
+        if key is not None:
+            self.jump_to_code(key)
+    
+    def open_filmstrip(self):
+        """打开缩略图浏览窗口（已打开时提到前面）；缩略图线程池在第一次打开时创建"""
+        if self.filmstrip is not None and not self.filmstrip.closed:
+            self.filmstrip.window.lift()
+            return
+        if self.thumbnails is None:
+            self.thumbnails = ThumbnailCache(self.jpeg, self.ring, on_ready=self._on_thumbnail_ready,
+                                             workers=self.config.get('ThumbnailWorkers', 2))
+        ring = self.ring  # 槽位数可能被热加载调整，每次现取
+        self.filmstrip = FilmstripWindow(
+            self.root, self.ring, self.thumbnails,
+            page_source=lambda: (min(ring.slot_num, self.pipeline.received_count) if self.read_index >= 0 else 0,
+                                 self.read_index % ring.slot_num),
+            on_select=self.jump_to_slot,
+            current_slot=lambda: (self.read_index + self.locked_delta) % ring.slot_num)
+    
+    def _on_thumbnail_ready(self, slot_index, recv_seq):
+        """缩略图生成完成（在缩略图线程中回调）：合并重绘缩略图窗口"""
+        filmstrip = self.filmstrip
+        if filmstrip is not None and not filmstrip.closed:
+            filmstrip.schedule_render()
+    
     def update_current_image_info(self):
         """更新当前图片信息显示"""
         try:
-            N = min(self.slot_num, self.received_count)
+            N = min(self.ring.slot_num, self.pipeline.received_count)
             if N > 0:
                 current_page = N + self.delta
                 self.current_image_info.config(text=f"当前: {current_page}/{N}")
@@ -718,14 +820,14 @@ class QRViewerGUI:
         elif key == "space":
             self.manual_dbr_trigger()
         elif key == "Left":
-            N = min(self.slot_num, self.received_count)
+            N = min(self.ring.slot_num, self.pipeline.received_count)
             if self.delta > (1 - N):
                 self.delta -= 1
-                self.update_image_display()
+                self.ring.wake()  # 由显示线程按新的偏移刷新
         elif key == "Right":
             if self.delta < 0:
                 self.delta += 1
-                self.update_image_display()
+                self.ring.wake()  # 由显示线程按新的偏移刷新
     
     def create_log_result_panel(self, parent):
         """创建区域4：每次识别结果面板（DBR Log格式）"""
@@ -834,6 +936,9 @@ class QRViewerGUI:
         table_frame.grid_rowconfigure(0, weight=1)
         table_frame.grid_columnconfigure(0, weight=1)
         
+        # 双击汇总行跳到该商品所在的图片（重复双击依次跳到下一处）
+        self.summary_tree.bind('<Double-1>', self.on_summary_double_click)
+        
         # 初始数据
         self.update_summary_table()
     
@@ -907,62 +1012,41 @@ class QRViewerGUI:
             self.update_final_result(f"加载日志文件失败: {e}")
     
     def parse_and_add_result(self, line):
-        """解析并添加识别结果（稳健解析，避免 position 与 text 中的逗号干扰）"""
-        try:
-            # 先从右侧切出 text，再切出 format，剩余为前5列（其中 position 可能含逗号）
-            rest1, text = line.rsplit(',', 1)
-            rest2, fmt = rest1.rsplit(',', 1)
-            # 拆分前四个逗号（得到前5列，其中第5列为完整 position）
-            head = rest2.split(',', 4)
-            if len(head) == 5:
-                global_seq, recv_seq, worker_id, slot_status, position = [h.strip() for h in head]
-                fmt_norm = str(fmt).strip()
-                result = {
-                    'global_seq': global_seq,
-                    'recv_seq': recv_seq,
-                    'worker_id': worker_id,
-                    'slot_status': slot_status,
-                    'position': position,
-                    'format': fmt_norm,
-                    'text': text.strip()
-                }
-                self.recognition_results.append(result)
-                self.add_result_to_log_tree(result)
+        """解析并添加识别结果（稳健解析，避免 position 与 text 中的逗号干扰，见 result_export.parse_log_line）"""
+        result = parse_log_line(line)
+        if result is None:
+            print(f"解析结果行失败, 行: {line}")
+            return
+        self.recognition_results.append(result)
+        self.add_result_to_log_tree(result)
 
-                # 统计（正规化 format 后归类）
-                self.stats['total_recognitions'] += 1
-                format_upper = fmt_norm.upper().replace('-', '_').replace(' ', '')
-                if 'QR' in format_upper or 'QRCODE' in format_upper or 'QR_CODE' in format_upper:
-                    self.stats['qr_code_count'] += 1
-                else:
-                    self.stats['barcode_count'] += 1
+        # 统计（正规化 format 后归类）
+        self.stats['total_recognitions'] += 1
+        format_upper = result['format'].upper().replace('-', '_').replace(' ', '')
+        if 'QR' in format_upper or 'QRCODE' in format_upper or 'QR_CODE' in format_upper:
+            self.stats['qr_code_count'] += 1
+        else:
+            self.stats['barcode_count'] += 1
 
-                # 更新汇总数据
-                self.update_summary_data(result)
-        except Exception as e:
-            print(f"解析结果行失败: {e}, 行: {line}")
+        # 更新汇总数据
+        self.update_summary_data(result)
     
     def update_summary_data(self, result):
         """更新汇总数据（解析商品信息等）"""
-        text = result.get('text', '')
-        # 简化处理：使用text的前50个字符作为商品信息key
+        # 简化处理：URL 取最后一段，其它取前50个字符作为商品信息key（与识别结果索引共用 code_index.product_key）
         # 实际应用中需要根据具体的text格式来解析商品信息
-        if text.startswith('HTTPS://') or text.startswith('HTTP://'):
-            # 如果是URL，提取关键部分
-            product_key = text.split('/')[-1][:50] if '/' in text else text[:50]
-        else:
-            product_key = text[:50]
+        key = product_key(result.get('text', ''))
         
-        if product_key not in self.summary_data:
-            self.summary_data[product_key] = {
-                '商品信息': product_key if len(product_key) < 50 else product_key[:47] + '...',
+        if key not in self.summary_data:
+            self.summary_data[key] = {
+                '商品信息': key if len(key) < 50 else key[:47] + '...',
                 '识数量': 0,
                 '库存数量': '未找到库存信息',
                 '批次': '',
                 '货架': ''
             }
         
-        self.summary_data[product_key]['识数量'] += 1
+        self.summary_data[key]['识数量'] += 1
     
     def add_result_to_log_tree(self, result):
         """添加结果到日志表格"""
@@ -991,6 +1075,7 @@ class QRViewerGUI:
         # 清空现有数据
         for item in self.summary_tree.get_children():
             self.summary_tree.delete(item)
+        self._summary_row_keys.clear()
         
         # 添加汇总数据
         for idx, (key, data) in enumerate(sorted(self.summary_data.items()), 1):
@@ -1002,7 +1087,7 @@ class QRViewerGUI:
                 data['批次'],
                 data['货架']
             ]
-            self.summary_tree.insert('', tk.END, values=values)
+            self._summary_row_keys[self.summary_tree.insert('', tk.END, values=values)] = key
     
     def update_final_result(self, message):
         """更新最终识别结果显示（现在通过表格显示，这里保留用于日志）"""
@@ -1019,6 +1104,7 @@ class QRViewerGUI:
         # 转换为PIL图像
         if isinstance(image, np.ndarray):
             if len(image.shape) == 3 and image.shape[2] == 3:
+                import cv2
                 image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
             else:
                 image_rgb = image
@@ -1087,72 +1173,119 @@ class QRViewerGUI:
                 self.root.after(0, self.update_image_display)
             # 如果没有图片，保持当前状态（可能是黑色背景），不强制清空
     
-    def export_to_csv(self):
-        """导出CSV文件"""
-        if not self.summary_data:
-            self.update_final_result("没有数据可导出")
+    def export_results(self):
+        """导出（后台线程流式写入，CSV/XLSX 按扩展名）：汇总表、识别记录，或附加位置坐标/帧号的识别记录"""
+        if self.transfer_job is not None and self.transfer_job.running():
+            self.update_final_result("已有导出/导入任务在运行")
             return
+        content = self.export_content_var.get()
+        if content == self.EXPORT_CONTENTS[0]:
+            if not self.summary_data:
+                self.update_final_result("没有数据可导出")
+                return
+            # 主线程只做一次浅拷贝快照，格式化和写文件都在后台线程
+            snapshot = [dict(data) for _, data in sorted(self.summary_data.items())]
+            rows = (([idx, data['商品信息'], data['识数量'], data['库存数量'], data['批次'], data['货架']], None)
+                    for idx, data in enumerate(snapshot, 1))
+            columns = self.summary_columns
+        else:
+            log_path = self.log_file_path
+            if not log_path or not os.path.exists(log_path):
+                self.update_final_result("没有识别记录可导出（未加载结果日志）")
+                return
+            join = self._frame_join(log_path) if content == self.EXPORT_CONTENTS[2] else None
+            rows = iter_log_rows(log_path, join)
+            columns = JOINED_COLUMNS if join else RAW_COLUMNS
         
         filename = filedialog.asksaveasfilename(
-            title="导出CSV文件",
+            title="导出文件",
             defaultextension=".csv",
-            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+            filetypes=[("CSV files", "*.csv"), ("Excel files", "*.xlsx"), ("All files", "*.*")]
         )
-        
         if filename:
+            self._start_transfer(TransferJob(export_rows(rows, columns, filename), name="Export"), "导出", filename)
+    
+    def _frame_join(self, log_path):
+        """识别记录的帧号：按 (槽位, recv_seq) 查环形槽位，只有本次运行写的日志、且图片仍在缓冲区中时才有"""
+        if log_path != self.pipeline.dbr_log_file:
+            return lambda result: ['']
+        
+        def join(result):
             try:
-                with open(filename, 'w', newline='', encoding='utf-8-sig') as f:
-                    # 写入汇总数据
-                    writer = csv.DictWriter(f, fieldnames=self.summary_columns)
-                    writer.writeheader()
-                    for idx, (key, data) in enumerate(sorted(self.summary_data.items()), 1):
-                        writer.writerow({
-                            '序号': idx,
-                            '商品信息': data['商品信息'],
-                            '识数量': data['识数量'],
-                            '库存数量': data['库存数量'],
-                            '批次': data['批次'],
-                            '货架': data['货架']
-                        })
-                self.update_final_result(f"已导出到: {filename}")
-            except Exception as e:
-                self.update_final_result(f"导出失败: {e}")
+                slot = self.ring.lookup(int(result['slot_status']), int(result['recv_seq']))
+            except ValueError:
+                slot = None  # 槽位状态为 N/A
+            return [slot.get('frame_sequence', '') if slot is not None else '']
+        return join
     
     def import_from_csv(self):
-        """从CSV文件导入到最终识别结果区域"""
+        """从CSV文件导入到最终识别结果区域（后台逐块读取，每块在主线程合并）"""
+        if self.transfer_job is not None and self.transfer_job.running():
+            self.update_final_result("已有导出/导入任务在运行")
+            return
         filename = filedialog.askopenfilename(
             title="导入CSV文件",
             filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
         )
+        if not filename:
+            return
         
-        if filename:
-            try:
-                # 清空现有汇总数据
-                self.summary_data.clear()
-                
-                with open(filename, 'r', encoding='utf-8-sig') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        # 获取商品信息作为key
-                        product_info = row.get('商品信息', '')
-                        if product_info:
-                            # 如果序号存在，使用序号作为key的一部分
-                            seq = row.get('序号', '')
-                            key = f"{seq}_{product_info}" if seq else product_info
-                            
-                            self.summary_data[key] = {
-                                '商品信息': product_info,
-                                '识数量': int(row.get('识数量', 0)) if row.get('识数量', '').strip() else 0,
-                                '库存数量': row.get('库存数量', '未找到库存信息'),
-                                '批次': row.get('批次', ''),
-                                '货架': row.get('货架', '')
-                            }
-                
-                # 更新表格显示
+        # 清空现有汇总数据
+        self.summary_data.clear()
+        self.update_summary_table()
+        
+        def on_chunk(rows):
+            # 在后台线程解析，合并到 summary_data 交给主线程
+            entries = {}
+            for row in rows:
+                # 获取商品信息作为key
+                product_info = row.get('商品信息', '')
+                if product_info:
+                    # 如果序号存在，使用序号作为key的一部分
+                    seq = row.get('序号', '')
+                    key = f"{seq}_{product_info}" if seq else product_info
+                    entries[key] = {
+                        '商品信息': product_info,
+                        '识数量': int(row.get('识数量', 0)) if row.get('识数量', '').strip() else 0,
+                        '库存数量': row.get('库存数量', '未找到库存信息'),
+                        '批次': row.get('批次', ''),
+                        '货架': row.get('货架', '')
+                    }
+            self.root.after(0, self.summary_data.update, entries)
+        
+        self._start_transfer(TransferJob(import_csv_rows(filename, on_chunk), name="Import"), "导入", filename)
+    
+    def _start_transfer(self, job, action, filename):
+        """启动导出/导入任务：进度和完成回调切回主线程"""
+        job.on_progress = lambda rows, progress: self.root.after(0, self._show_transfer_progress, action, rows, progress)
+        job.on_done = lambda rows, error: self.root.after(0, self._finish_transfer, action, filename, rows, error)
+        self.transfer_job = job
+        self.transfer_var.set(f"{action}中...")
+        self.transfer_cancel_btn.config(state=tk.NORMAL)
+        job.start()
+    
+    def _show_transfer_progress(self, action, rows, progress):
+        percent = f" {progress * 100:.0f}%" if progress is not None else ""
+        self.transfer_var.set(f"{action}中{percent}（{rows} 行）")
+    
+    def _finish_transfer(self, action, filename, rows, error):
+        self.transfer_cancel_btn.config(state=tk.DISABLED)
+        if error is None:
+            self.transfer_var.set(f"{action}完成（{rows} 行）")
+            if action == "导入":
                 self.update_summary_table()
                 self.update_final_result(f"已从CSV导入 {len(self.summary_data)} 条记录")
-            except Exception as e:
-                self.update_final_result(f"导入失败: {e}")
+            else:
+                self.update_final_result(f"已导出到: {filename}")
+        else:
+            self.transfer_var.set(f"{action}已取消" if error == "已取消" else f"{action}失败")
+            if action == "导入":
+                self.update_summary_table()  # 显示已导入的部分
+            self.update_final_result(f"{action}已取消" if error == "已取消" else f"{action}失败: {error}")
+    
+    def cancel_transfer(self):
+        if self.transfer_job is not None:
+            self.transfer_job.cancel()
     
     def on_window_configure(self, event):
         """窗口大小变化时调整图片区域为正方形（延迟处理避免频繁调整）"""
@@ -1204,143 +1337,26 @@ class QRViewerGUI:
             # 忽略调整错误（可能是窗口还未完全初始化）
             pass
     
-    def _load_config(self, config_file):
-        """加载配置文件"""
-        try:
-            if os.path.exists(config_file):
-                with open(config_file, 'r') as f:
-                    config = json.load(f)
-                    print(f"✅ 已加载配置文件: {config_file}")
-                    return config
-            else:
-                print(f"⚠️ 配置文件不存在: {config_file}，使用默认配置")
-                return {}
-        except Exception as e:
-            print(f"❌ 加载配置文件失败: {e}，使用默认配置")
-            return {}
-    
-    def _init_nng_server(self):
-        """初始化NNG服务器（监听模式）"""
-        try:
-            self.nng_subscriber = pynng.Sub0()
-            self.nng_subscriber.recv_timeout = 3000
-            self.nng_subscriber.subscribe(b"")
-            if self.listen_host == '0.0.0.0':
-                listen_addr = f"tcp://*:{self.listen_port}"
-            else:
-                listen_addr = f"tcp://{self.listen_host}:{self.listen_port}"
-            self.nng_subscriber.listen(listen_addr)
-            print(f"✅ NNG服务器启动，监听: {self.listen_host}:{self.listen_port}")
-        except Exception as e:
-            print(f"❌ NNG服务器启动失败: {e}")
-            raise
-    
-    def _init_ack_sender(self):
-        """初始化ACK发送器"""
-        try:
-            self.ack_sender = pynng.Pub0()
-            ack_addr = f"tcp://{self.camera_node_ip}:{self.ack_port}"
-            self.ack_sender.dial(ack_addr, block=False)
-            print(f"✅ ACK发送器已连接: {ack_addr}")
-        except Exception as e:
-            print(f"⚠️ ACK发送器初始化失败: {e}")
-            self.ack_sender = None
-    
-    def _send_ack(self, frame_sequence, timestamp_ms):
-        """发送ACK消息"""
-        if self.ack_sender:
-            try:
-                ack_data = (
-                    frame_sequence.to_bytes(2, byteorder='big') +
-                    timestamp_ms.to_bytes(4, byteorder='big')
-                )
-                self.ack_sender.send(ack_data)
-            except Exception as e:
-                pass  # 静默处理ACK发送失败
-    
-    def _init_dbr(self):
-        """初始化多线程DBR识别"""
-        try:
-            err_code, err_str = LicenseManager.init_license("f0068dAAAAFWtn4QhSRS1Tvi5U5Q/kX6u5Sz/Onam1CRr122KlQMR8r7g6OjGgpS9wp90khfbsOmOmxWWwcrULU5/VCHDxlY=")
-            if err_code != EnumErrorCode.EC_OK and err_code != EnumErrorCode.EC_LICENSE_WARNING:
-                print(f"❌ DBR 许可证初始化失败: {err_code} - {err_str}")
-                self.dbr_enabled = False
-                return
-            
-            self.dbr_queue = queue.Queue(maxsize=200)
-            print(f"✅ 多线程DBR已启用：{self.dbr_thread_count}个线程，超时时间：{self.dbr_timeout}ms")
-            
-            # 准备日志文件
-            try:
-                log_dir = os.path.join(os.path.dirname(__file__), 'test_results')
-                os.makedirs(log_dir, exist_ok=True)
-                ts = datetime.now().strftime('%Y%m%d_%H%M%S')
-                self.dbr_log_file = os.path.join(log_dir, f'dbr_multithread_result_{ts}.log')
-                with open(self.dbr_log_file, 'a', encoding='utf-8') as f:
-                    f.write('# 全局序号, 接收序号, 工作线程ID, 槽位状态, 位置坐标, 格式, 文本内容\n')
-                print(f"📝 多线程DBR结果将写入: {self.dbr_log_file}")
-            except Exception as e:
-                print(f"⚠️ DBR日志初始化失败: {e}")
-                self.dbr_log_file = None
-        except Exception as e:
-            print(f"❌ DBR初始化异常: {e}")
-            self.dbr_enabled = False
-    
-    def _deserialize_crops(self, serialized_data):
-        """反序列化裁剪数据"""
-        crops = []
-        ptr = 0
-        
-        # 解析帧头
-        if len(serialized_data) >= 6:
-            frame_sequence = int.from_bytes(serialized_data[0:2], byteorder='big')
-            timestamp_ms = int.from_bytes(serialized_data[2:6], byteorder='big')
-            ptr = 6
-            self.current_frame_sequence = frame_sequence
-            if self.ack_sender:
-                self._send_ack(frame_sequence, timestamp_ms)
-        else:
-            ptr = 0
-        
-        while ptr < len(serialized_data):
-            # 读取元数据
-            metadata_length = int.from_bytes(serialized_data[ptr:ptr+4], byteorder='big')
-            ptr += 4
-            metadata_bytes = serialized_data[ptr:ptr+metadata_length]
-            ptr += metadata_length
-            metadata = json.loads(metadata_bytes.decode('utf-8'))
-            
-            # 读取图像数据
-            img_length = int.from_bytes(serialized_data[ptr:ptr+4], byteorder='big')
-            ptr += 4
-            img_data = serialized_data[ptr:ptr+img_length]
-            ptr += img_length
-            
-            crops.append({
-                'metadata': metadata,
-                'image_data': img_data
-            })
-        
-        return crops
-    
     def setup_mouse_callback(self):
         """设置鼠标回调函数"""
         def mouse_callback(event, x, y, flags, param):
+            import cv2
             if event == cv2.EVENT_LBUTTONDOWN:
                 self.handle_mouse_click(x, y)
         self.mouse_callback = mouse_callback
     
     def handle_mouse_click(self, x, y):
         """处理鼠标点击事件"""
-        if self.read_index != self.latest_index:
+        if self.read_index != self.ring.latest_index:
             return
         if self.left_arrow_rect and self.is_point_in_rect(x, y, self.left_arrow_rect):
-            N = min(1000, self.received_count)
+            N = min(1000, self.pipeline.received_count)
             if self.delta > (1 - N):
                 self.delta -= 1
         elif self.right_arrow_rect and self.is_point_in_rect(x, y, self.right_arrow_rect):
             if self.delta < 0:
                 self.delta += 1
+        self.ring.wake()
     
     def is_point_in_rect(self, x, y, rect):
         """检查点是否在矩形区域内"""
@@ -1349,190 +1365,128 @@ class QRViewerGUI:
         x1, y1, x2, y2 = rect
         return x1 <= x <= x2 and y1 <= y <= y2
     
-    def nng_receive_loop(self):
-        """NNG接收数据循环"""
-        while self.running:
-            try:
-                serialized_data = self.nng_subscriber.recv()
-                crops_data = self._deserialize_crops(serialized_data)
-                self._check_frame_loss()
-                
-                self.received_count += len(crops_data)
-                self.last_successful_receive = time.time()
-                self.stats['tcp_connected'] = True
-                self.root.after(0, lambda: self.update_status(True))
-                
-                for crop in crops_data:
-                    self.recv_seq_counter += 1
-                    recv_seq = self.recv_seq_counter
-                    slot = {
-                        'metadata': crop.get('metadata'),
-                        'image_data': crop.get('image_data'),
-                        'recv_seq': recv_seq,
-                        'slot_index': self.write_index,
-                        'frame_sequence': self.current_frame_sequence,
-                        'dbr_elapsed_ms': None,
-                        'dbr_items': None,
-                    }
-                    self.crops_buffer[self.write_index] = slot
-                    self.write_index = (self.write_index + 1) % self.slot_num
-                    
-                    if self.dbr_enabled and self.dbr_queue is not None:
-                        jpeg_bytes = slot.get('image_data')
-                        if isinstance(jpeg_bytes, (bytes, bytearray)):
-                            slot_index = (self.write_index - 1) % self.slot_num
-                            payload = (recv_seq, jpeg_bytes, slot_index)
-                            try:
-                                self.dbr_queue.put_nowait(payload)
-                            except queue.Full:
-                                self.dbr_dropped_frames += 1
-                                try:
-                                    _ = self.dbr_queue.get_nowait()
-                                    self.dbr_queue.put_nowait(payload)
-                                except:
-                                    pass
-                
-                self.latest_index = (self.write_index - 1) % self.slot_num
-                
-            except pynng.Timeout:
-                continue
-            except nng_exceptions.Closed:
-                print("🔒 NNG Socket已关闭")
-                break
-            except Exception as e:
-                print(f"❌ NNG接收异常: {e}")
-                time.sleep(0.1)
+    def _on_message(self, crop_count):
+        """每条消息写入槽位后由接收线程回调：更新连接状态（界面更新放到主线程）"""
+        self.stats['tcp_connected'] = True
+        self.root.after(0, lambda: self.update_status(True))
     
     def opencv_display_loop(self):
-        """GUI图片显示循环（集成到Tkinter Canvas）- 优化版本，快速跳转到最新图片，避免黑屏"""
-        last_display_time = 0
-        min_display_interval = 1.0 / 60.0  # 限制最多60fps显示更新
-        
-        def find_latest_valid_index(start_idx, max_search=50):
-            """从start_idx向前查找最新的有效（有数据）槽位"""
-            for i in range(max_search):
-                check_idx = (start_idx - i) % self.slot_num
-                if self.crops_buffer[check_idx] is not None:
-                    return check_idx
-            return None
-        
+        """GUI图片显示循环（集成到Tkinter Canvas）- 快速跳转到最新图片，避免黑屏
+        空闲时阻塞等待新数据（CropRing.wait_for_publish），刷新按 display_pacer 的节拍限速"""
+        pacer = self.display_pacer
+
+        def refresh():
+            # 睡到下一个节拍再刷新，节拍内的多次前进合并为一次刷新
+            pacer.wait()
+            self.root.after(0, self.update_image_display)
+            pacer.tick()
+
         while self.running:
             try:
+                seen = self.ring.publish_count  # 先取计数再取位置，两者之间的新数据不会漏掉
+                if self.ring_generation != self.ring.generation:
+                    # 槽位数被调整：旧的读取位置和翻页偏移已失效，回到最新
+                    self.ring_generation = self.ring.generation
+                    self.read_index = -1
+                    self.delta = self.locked_delta = 0
                 current_time = time.time()
+                latest_index = self.ring.latest_index
                 
-                if self.read_index != self.latest_index:
+                if self.read_index != latest_index:
                     # 有新照片到达 - 实现流畅的视频播放
                     self.delta = 0
                     self.locked_delta = 0
                     
                     # 计算积压的帧数
-                    backlog = (self.latest_index - self.read_index) % self.slot_num
+                    backlog = (latest_index - self.read_index) % self.ring.slot_num
                     if backlog == 0:
                         backlog = 1
                     
                     # 处理初始状态
                     if self.read_index == -1:
                         # 第一次收到数据，跳转到最新有效位置
-                        for offset in range(0, min(50, self.slot_num)):
-                            check_idx = (self.latest_index - offset) % self.slot_num
-                            if self.crops_buffer[check_idx] is not None:
-                                self.read_index = check_idx
-                                self.first_crop = True
-                                self.locked_latest_index = self.latest_index
-                                self.last_frame_display_time = current_time
-                                if current_time - last_display_time >= min_display_interval:
-                                    self.root.after(0, self.update_image_display)
-                                    last_display_time = current_time
-                                break
-                        else:
-                            time.sleep(0.001)
+                        check_idx = self.ring.find_valid(latest_index, 50)
+                        if check_idx is None:
+                            self.ring.wait_for_publish(seen, self.IDLE_WAIT)
                             continue
+                        self.read_index = check_idx
+                        self.first_crop = True
+                        self.locked_latest_index = latest_index
+                        self.last_frame_display_time = current_time
+                        refresh()
                     else:
                         # 已有数据，实现流畅播放策略
                         # 策略1：如果积压帧数较少（<=5帧），按顺序播放，保持流畅
                         # 策略2：如果积压帧数较多（>10帧），跳转到较新的位置（避免延迟过大）
                         # 策略3：如果积压帧数中等（5-10帧），按顺序播放但加快速度
                         
-                        should_advance = False
-                        
-                        if backlog <= 5:
-                            # 少量积压：按顺序播放，保持流畅
-                            time_since_last_frame = current_time - self.last_frame_display_time
-                            if time_since_last_frame >= self.frame_display_interval:
-                                should_advance = True
-                        elif backlog > 10:
+                        if backlog > 10:
                             # 大量积压：跳转到较新的位置（保留几帧缓冲）
                             jump_to_offset = backlog - 3  # 跳转到倒数第3帧的位置
-                            target_idx = (self.read_index + jump_to_offset) % self.slot_num
+                            target_idx = (self.read_index + jump_to_offset) % self.ring.slot_num
                             # 确保目标位置有数据
-                            for offset in range(0, min(10, self.slot_num)):
-                                check_idx = (target_idx - offset) % self.slot_num
-                                if self.crops_buffer[check_idx] is not None:
-                                    self.read_index = check_idx
-                                    self.last_frame_display_time = current_time
-                                    if current_time - last_display_time >= min_display_interval:
-                                        self.root.after(0, self.update_image_display)
-                                        last_display_time = current_time
-                                    break
+                            check_idx = self.ring.find_valid(target_idx, 10)
+                            if check_idx is not None:
+                                self.read_index = check_idx
+                                self.last_frame_display_time = current_time
+                                refresh()
                             continue
-                        else:
-                            # 中等积压：按顺序播放，但加快速度（每帧间隔减半）
-                            time_since_last_frame = current_time - self.last_frame_display_time
-                            if time_since_last_frame >= (self.frame_display_interval / 2):
-                                should_advance = True
                         
-                        if should_advance:
-                            # 按顺序前进到下一帧
-                            next_idx = (self.read_index + 1) % self.slot_num
-                            if self.crops_buffer[next_idx] is not None:
-                                self.read_index = next_idx
-                                self.last_frame_display_time = current_time
-                                if current_time - last_display_time >= min_display_interval:
-                                    self.root.after(0, self.update_image_display)
-                                    last_display_time = current_time
-                            else:
-                                # 下一帧为空，向前查找有效帧
-                                found = False
-                                for offset in range(1, min(20, self.slot_num)):
-                                    check_idx = (next_idx + offset) % self.slot_num
-                                    if self.crops_buffer[check_idx] is not None:
-                                        self.read_index = check_idx
-                                        self.last_frame_display_time = current_time
-                                        if current_time - last_display_time >= min_display_interval:
-                                            self.root.after(0, self.update_image_display)
-                                            last_display_time = current_time
-                                        found = True
-                                        break
-                                if not found:
-                                    time.sleep(0.001)
-                                    continue
-                        else:
-                            # 还没到显示时间，继续等待
-                            time.sleep(0.001)
+                        # 少量积压按目标帧率顺序播放，中等积压加快一倍
+                        frame_interval = self.frame_display_interval if backlog <= 5 else self.frame_display_interval / 2
+                        wait_time = frame_interval - (current_time - self.last_frame_display_time)
+                        if wait_time > 0:
+                            # 还没到显示时间：直接睡到该显示的时刻
+                            time.sleep(wait_time)
                             continue
+                        
+                        # 按顺序前进到下一帧
+                        next_idx = (self.read_index + 1) % self.ring.slot_num
+                        if self.ring.get(next_idx) is None:
+                            # 下一帧为空，向前查找有效帧
+                            next_idx = self.ring.find_valid(next_idx, 20, step=1, skip_start=True)
+                            if next_idx is None:
+                                self.ring.wait_for_publish(seen, self.IDLE_WAIT)
+                                continue
+                        self.read_index = next_idx
+                        self.last_frame_display_time = current_time
+                        refresh()
                 else:
                     # 没有新照片时，检查delta变化（手动翻页）
                     if self.delta != self.locked_delta:
                         self.locked_delta = self.delta
-                        if current_time - last_display_time >= min_display_interval:
-                            self.root.after(0, self.update_image_display)
-                            last_display_time = current_time
+                        refresh()
                     
-                    time.sleep(0.01)
-                    continue
+                    # 阻塞到新数据到达或翻页/退出时被 ring.wake() 唤醒
+                    self.ring.wait_for_publish(seen, self.IDLE_WAIT)
                     
             except Exception as e:
                 print(f"显示循环错误: {e}")
                 time.sleep(0.01)
     
+    def _on_config_change(self, config, changed):
+        """配置文件热加载（监视线程中回调）：界面自己的显示帧率"""
+        self.config = config
+        if 'DisplayMaxFps' in changed:
+            self.display_pacer.set_max_fps(config.get('DisplayMaxFps', 1.0 / self.display_pacer.interval))
+            print(f"🔧 显示帧率上限调整为 {1.0 / self.display_pacer.interval:.0f} fps")
+    
     def start_update_threads(self):
         """启动更新线程"""
         threading.Thread(target=self.opencv_display_loop, daemon=True).start()
-        threading.Thread(target=self.nng_receive_loop, daemon=True).start()
+        # 接收线程和识别（识别线程在后台初始化解码后端后启动，不阻塞界面）
+        self.pipeline.start()
+        self.pipeline.watch_config(on_change=self._on_config_change)  # 配置文件热加载
         threading.Thread(target=self.log_file_monitor_loop, daemon=True).start()
-        if self.dbr_enabled:
-            self._start_dbr_workers()
+        threading.Thread(target=self._prewarm_imports, daemon=True, name="Prewarm").start()
         self.root.after(100, self.ui_update_loop)
+        self.root.after(0, lambda: print(f"⏱️ 界面就绪，距启动 {(time.perf_counter() - STARTUP_T0) * 1000:.0f} ms"))
+    
+    def _prewarm_imports(self):
+        """界面出来之后在后台导入显示要用的较重模块，首帧显示时不再等待导入"""
+        t0 = time.perf_counter()
+        importlib.import_module('cv2')  # 只为触发导入（进入模块缓存），之后各处的 import cv2 直接命中
+        print(f"🔥 后台预热导入完成，耗时 {(time.perf_counter() - t0) * 1000:.0f} ms")
     
     def image_update_loop(self):
         """图像更新循环"""
@@ -1584,203 +1538,51 @@ class QRViewerGUI:
     def ui_update_loop(self):
         """UI更新循环"""
         if self.running:
+            # 每秒刷新一次图片显示耗时和识别队列统计
+            now = time.time()
+            pipeline = self.pipeline
+            if now - self._queue_stats_time >= 1.0:
+                self._update_display_time_stats(now - self._queue_stats_time)
+                self._queue_stats_time = now
+            if pipeline.dbr_queue is not None and self._queue_stats_time == now:
+                text = format_queue_stats(pipeline.dbr_queue.get_stats(reset_max=False)) or "空闲"
+                if pipeline.sampler is not None:
+                    text += "\n抽帧 " + format_sampler_stats(pipeline.sampler.get_stats())
+                if pipeline.autoscaler is not None:
+                    text += "\n线程池 " + format_autoscale_stats(pipeline.autoscaler.get_stats())
+                    for event in pipeline.autoscaler.pop_events():
+                        print(f"线程池伸缩: {format_scale_event(event)}")
+                if pipeline.tracker is not None:
+                    text += "\n跟踪 " + format_tracker_stats(pipeline.tracker.get_stats())
+                ring_stats = self.ring.get_stats()
+                if ring_stats['contended']:
+                    text += "\n槽位 " + format_ring_stats(ring_stats)
+                self.queue_var.set(text)
             self.root.after(100, self.ui_update_loop)
     
+    def _update_display_time_stats(self, period):
+        """显示上个统计周期的刷新帧率和Tk主线程每帧耗时（平均/最大），然后清零"""
+        stats = self.display_stats
+        frames = stats['frames']
+        if frames:
+            self.display_time_var.set(f"{frames / period:.1f} fps，主线程 {stats['total_ms'] / frames:.1f} ms/帧，"
+                                      f"最大 {stats['max_ms']:.1f} ms")
+        self.display_stats = {'frames': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+    
     def add_image_data(self, image, metadata=None):
         """从外部添加图像数据"""
         self.image_queue.put((image, metadata))
     
-    def _start_dbr_workers(self):
-        """启动多个DBR工作线程"""
-        print(f"🚀 启动 {self.dbr_thread_count} 个DBR工作线程...")
-        for i in range(self.dbr_thread_count):
-            thread = threading.Thread(
-                target=self.dbr_worker_loop,
-                args=(i,),
-                daemon=True,
-                name=f"DBR-Worker-{i}"
-            )
-            thread.start()
-            self.dbr_threads.append(thread)
-        print(f"✅ {self.dbr_thread_count} 个DBR工作线程已启动")
-    
-    def dbr_worker_loop(self, worker_id):
-        """多线程DBR识别工作线程"""
-        print(f"🔍 DBR工作线程{worker_id}已启动")
-        try:
-            cvr_instance = CaptureVisionRouter()
-            
-            # Obtain current runtime settings of `CCaptureVisionRouter` instance.
-            err_code, err_str, settings = cvr_instance.get_simplified_settings(EnumPresetTemplate.PT_READ_BARCODES.value)
-            
-            # Specify the barcode formats by enumeration values.
-            # Use "|" to enable multiple barcode formats at one time.
-            # 严格按照许可证要求，只启用：Code 39, Code 93, Code 128, Codabar, ITF, EAN-13, EAN-8, UPC-A, UPC-E, INDUSTRIAL 2 OF 5, QR码
-            settings.barcode_settings.barcode_format_ids = (
-                EnumBarcodeFormat.BF_QR_CODE.value |
-                EnumBarcodeFormat.BF_CODE_39.value |
-                EnumBarcodeFormat.BF_CODE_93.value |
-                EnumBarcodeFormat.BF_CODE_128.value |
-                EnumBarcodeFormat.BF_CODABAR.value |
-                EnumBarcodeFormat.BF_ITF.value |
-                EnumBarcodeFormat.BF_EAN_13.value |
-                EnumBarcodeFormat.BF_EAN_8.value |
-                EnumBarcodeFormat.BF_UPC_A.value |
-                EnumBarcodeFormat.BF_UPC_E.value |
-                EnumBarcodeFormat.BF_INDUSTRIAL_25.value
-            )
-            
-            # Update the settings.
-            err_code, err_str = cvr_instance.update_settings(EnumPresetTemplate.PT_READ_BARCODES.value, settings)
-            if err_code != EnumErrorCode.EC_OK:
-                print(f"⚠️ DBR工作线程{worker_id}配置失败: {err_code} - {err_str}")
-            else:
-                print(f"✅ DBR工作线程{worker_id}已配置授权格式")
-        except Exception as e:
-            print(f"❌ DBR工作线程初始化失败: {e}")
-            return
-        
-        while self.running and self.dbr_enabled and self.dbr_queue is not None:
-            try:
-                payload = self.dbr_queue.get(timeout=0.2)
-            except:
-                continue
-            
-            try:
-                recv_seq, jpeg_bytes, slot_index = payload
-                
-                t0 = time.time()
-                captured_result = cvr_instance.capture(jpeg_bytes, EnumPresetTemplate.PT_READ_BARCODES)
-                elapsed_ms = (time.time() - t0) * 1000.0
-                
-                if elapsed_ms > self.dbr_timeout:
-                    continue
-                
-                with self.dbr_stats_lock:
-                    self.dbr_total_time_ms += elapsed_ms
-                    self.dbr_total_attempts += 1
-                
-                if captured_result.get_error_code() != EnumErrorCode.EC_OK and \
-                   captured_result.get_error_code() != EnumErrorCode.EC_UNSUPPORTED_JSON_KEY_WARNING:
-                    continue
-                
-                barcode_result = captured_result.get_decoded_barcodes_result()
-                if barcode_result is None or barcode_result.get_items() == 0:
-                    continue
-                
-                items = barcode_result.get_items()
-                
-                with self.dbr_stats_lock:
-                    self.dbr_total_decoded += len(items)
-                
-                # 写入日志文件
-                if recv_seq is not None and self.dbr_log_file:
-                    try:
-                        result_items = []
-                        for it in items:
-                            try:
-                                result_items.append({
-                                    'fmt': it.get_format_string(),
-                                    'text': it.get_text(),
-                                    'confidence': getattr(it, 'get_confidence', lambda: None)()
-                                })
-                            except:
-                                result_items.append({'fmt': '<unk>', 'text': '<unk>', 'confidence': None})
-                        
-                        slot_status = "N/A"
-                        position_str = "NA"
-                        if slot_index is not None:
-                            try:
-                                slot = self.crops_buffer[slot_index]
-                                if slot and isinstance(slot, dict) and slot.get('recv_seq') == recv_seq:
-                                    slot_status = str(slot_index)
-                                    metadata = slot.get('metadata') or {}
-                                    pose_info = metadata.get('pose', {})
-                                    position_array = pose_info.get('position', [0.0, 0.0, 0.0])
-                                    if len(position_array) >= 3:
-                                        px = f"{position_array[0]:.2f}"
-                                        py = f"{position_array[1]:.2f}"
-                                        pz = f"{position_array[2]:.2f}"
-                                        position_str = f"({px},{py},{pz})"
-                            except:
-                                pass
-                        
-                        with self.dbr_stats_lock:
-                            with open(self.dbr_log_file, 'a', encoding='utf-8') as f:
-                                for it in result_items:
-                                    self.dbr_global_seq += 1
-                                    fmt = it.get('fmt', 'UNK')
-                                    txt = it.get('text', '')
-                                    f.write(f"{self.dbr_global_seq},{recv_seq},{worker_id},{slot_status},{position_str},{fmt},{txt}\n")
-                        
-                        # 更新GUI表格（通过日志文件监听）
-                        
-                    except Exception as e:
-                        print(f"⚠️ DBR日志写入失败: {e}")
-                
-                # 回写到槽位
-                if recv_seq is not None and slot_index is not None:
-                    try:
-                        slot = self.crops_buffer[slot_index]
-                        if slot and isinstance(slot, dict) and slot.get('recv_seq') == recv_seq:
-                            result_items = []
-                            for it in items:
-                                try:
-                                    result_items.append({
-                                        'fmt': it.get_format_string(),
-                                        'text': it.get_text(),
-                                        'confidence': getattr(it, 'get_confidence', lambda: None)()
-                                    })
-                                except:
-                                    result_items.append({'fmt': '<unk>', 'text': '<unk>', 'confidence': None})
-                            slot['dbr_elapsed_ms'] = float(f"{elapsed_ms:.1f}")
-                            slot['dbr_items'] = result_items
-                    except:
-                        pass
-            
-            except Exception as e:
-                print(f"❌ DBR识别异常: {e}")
-    
-    def _check_frame_loss(self):
-        """检测丢帧"""
-        if not hasattr(self, 'current_frame_sequence'):
-            return
-        
-        current_seq = self.current_frame_sequence
-        if not hasattr(self, 'last_frame_sequence'):
-            self.last_frame_sequence = current_seq
-            return
-        
-        if current_seq > self.last_frame_sequence:
-            lost_count = current_seq - self.last_frame_sequence - 1
-            if lost_count > 0:
-                print(f"⚠️ 检测到丢帧: 从 {self.last_frame_sequence} 到 {current_seq}, 丢帧数 {lost_count}")
-        elif current_seq < self.last_frame_sequence:
-            print(f"🔄 序号回退: 从 {self.last_frame_sequence} 到 {current_seq}")
-        
-        self.last_frame_sequence = current_seq
-    
     def manual_dbr_trigger(self):
         """手动触发DBR识别"""
-        if not self.dbr_enabled or self.dbr_queue is None:
+        if not self.pipeline.dbr_enabled or self.pipeline.dbr_queue is None:
             print("❌ 多线程DBR未启用")
             return
         
-        display_index = (self.read_index + self.locked_delta) % self.slot_num
-        current_crop = self.crops_buffer[display_index]
-        
-        if not current_crop or not isinstance(current_crop, dict):
-            return
-        
-        img_data = current_crop.get('image_data')
-        if not isinstance(img_data, (bytes, bytearray)):
-            return
-        
+        display_index = (self.read_index + self.locked_delta) % self.ring.slot_num
         try:
-            self.recv_seq_counter += 1
-            manual_recv_seq = self.recv_seq_counter
-            payload = (manual_recv_seq, img_data, display_index)
-            self.dbr_queue.put(payload)
+            # 手动任务优先处理、不会被丢弃，入队不阻塞界面线程
+            self.pipeline.submit_manual(display_index)
         except Exception as e:
             print(f"❌ 手动识别异常: {e}")
     
@@ -1791,15 +1593,14 @@ class QRViewerGUI:
         # 等待后台线程结束（给它们时间清理）
         time.sleep(0.2)
         
+        # 停止接收和识别线程，关闭NNG连接、共享内存和录制
+        self.pipeline.close()
+        if self.thumbnails is not None:
+            self.thumbnails.close()
+        self.cancel_transfer()  # 未完成的导出删除临时文件
+        
         # 清空图片缓冲区，释放内存
-        try:
-            if hasattr(self, 'crops_buffer'):
-                for i in range(len(self.crops_buffer)):
-                    self.crops_buffer[i] = None
-                self.crops_buffer = []
-                del self.crops_buffer
-        except:
-            pass
+        self.ring.clear()
         
         # 清理Canvas中的图片引用
         try:
@@ -1807,43 +1608,17 @@ class QRViewerGUI:
                 self.image_canvas.delete("all")
                 if hasattr(self.image_canvas, 'image'):
                     del self.image_canvas.image
+                self._canvas_scene = None
         except:
             pass
         
-        # 清理TurboJPEG实例
-        try:
-            if hasattr(self, 'jpeg'):
-                del self.jpeg
-        except:
-            pass
-        
-        # 关闭DBR相关资源
-        try:
-            if hasattr(self, 'dbr_log_file') and self.dbr_log_file:
-                # DBR日志文件在写入时已经关闭，这里只是清空引用
-                self.dbr_log_file = None
-        except:
-            pass
-        
-        # 关闭NNG连接
-        if self.nng_subscriber:
-            try:
-                self.nng_subscriber.close()
-            except:
-                pass
-        
-        if self.ack_sender:
+        # 关闭OpenCV窗口（cv2 按需导入，没导入过就没有窗口）
+        if 'cv2' in sys.modules:
             try:
-                self.ack_sender.close()
+                sys.modules['cv2'].destroyAllWindows()
             except:
                 pass
         
-        # 关闭OpenCV窗口
-        try:
-            cv2.destroyAllWindows()
-        except:
-            pass
-        
         # 最后销毁Tkinter窗口
         self.root.destroy()
 
@@ -1855,6 +1630,14 @@ def main():
     parser.add_argument('--host', help='监听IP地址 (优先级最高，覆盖配置文件)')
     parser.add_argument('--client', help='相机节点IP地址 (优先级最高，覆盖配置文件)')
     parser.add_argument('--dbr', action='store_true', help='启用内置DBR识别')
+    parser.add_argument('--decoder', choices=DECODER_BACKENDS, help='解码后端 (优先级最高，覆盖配置文件 DecoderBackend，默认 dbr)')
+    parser.add_argument('--decode-input', choices=DECODE_INPUTS, help='识别输入：jpeg 或 gray（灰度解码+ROI裁剪，覆盖配置文件 DecodeInput）')
+    parser.add_argument('--decode-scale', type=float, help='gray 输入的缩小比例 (覆盖配置文件 DecodeScale)')
+    parser.add_argument('--sampling', choices=SAMPLING_MODES, help='识别跟不上时的自适应抽帧：off、stride、sharpest (覆盖配置文件 DecodeSampling)')
+    parser.add_argument('--track', action='store_true', default=None, help='跨帧码跟踪：已识别的码在后续帧中跳过或只识别新区域 (覆盖配置文件 CodeTracking)')
+    parser.add_argument('--autoscale', action='store_true', default=None, help='识别线程池按队列深度/利用率/识别耗时自动伸缩 (覆盖配置文件 DecodeAutoscale)')
+    parser.add_argument('--transport', choices=['tcp', 'shm'], default='tcp', help='传输方式：tcp，或 shm（同机ipc + 共享内存）')
+    parser.add_argument('--record', nargs='?', const='recordings', help='录制收到的原始消息到目录（默认 recordings/）')
     
     args = parser.parse_args()
     
@@ -1864,7 +1647,10 @@ def main():
         args.dbr = True
     
     root = tk.Tk()
-    app = QRViewerGUI(root, listen_host=args.host, camera_ip=args.client, enable_dbr=args.dbr)
+    app = QRViewerGUI(root, listen_host=args.host, camera_ip=args.client, enable_dbr=args.dbr, transport=args.transport,
+                      record_dir=args.record, decoder_backend=args.decoder,
+                      decode_input=args.decode_input, decode_scale=args.decode_scale, sampling=args.sampling,
+                      tracking=args.track, autoscale=args.autoscale)
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
     
     if app.auto_find_latest_var.get():
@@ -0,0 +1,927 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+接收-识别核心流水线（simple_receiver.py 和 qr_gui_viewer.py 共用）
+    接收    NNG Sub0 监听，反序列化，共享内存引用取回JPEG，回ACK，丢帧检测，可选录制
+    环形槽位 CropRing：固定槽位数的单生产者循环缓冲（每槽 seqlock），显示/识别线程读取校验过的快照
+    识别    DecodeQueue + 多线程解码器（输入准备/抽帧/码跟踪/线程池自动伸缩），或分布式分发给工作节点
+    结果    结果日志文件（dbr_multithread_result_*.log）+ 回写槽位 + 倒排索引（code_index，按内容找帧）
+    热加载  watch_config() 监视配置文件，运行中调整识别线程数、队列上限、槽位数、超时（HOT_RELOAD_KEYS）
+
+前端（OpenCV窗口 / Tkinter界面）只负责显示、翻页和交互：
+    core = ReceiverCore(config, listen_port=5555, ack_port=5556, slot_num=200, enable_dbr=True)
+    core.start()
+    slot = core.ring.get(core.ring.latest_index)
+    core.submit_manual(slot_index)
+    core.watch_config(on_change=callback)   # 可选：配置文件热加载
+    core.close()
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import pynng
+import pynng.exceptions as nng_exceptions
+from turbojpeg import TurboJPEG
+
+from decode_queue import DecodeQueue
+from frame_sampler import create_sampler
+from worker_autoscaler import create_autoscaler
+from code_tracker import create_tracker, mask_known_regions
+from code_index import CodeIndex
+from config_watcher import ConfigWatcher
+from decoders import DecoderBackend, create_backend, create_preparer
+from dbr_worker_node import DBRTaskDispatcher, DEFAULT_TASK_ADDR, DEFAULT_RESULT_ADDR
+from shm_transport import ShmCropResolver, ipc_address
+from stream_recorder import StreamRecorder, new_record_dir
+
+# 配置文件位于上一级目录的 config 下（类似ROS launch文件）
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   'config', 'camera_config.json')
+LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_results')
+LOG_HEADER = '# 全局序号, 接收序号, 工作线程ID, 槽位状态, 位置坐标, 格式, 文本内容\n'
+DEFAULT_QUEUE_SIZE = 200  # 本地识别队列的实时任务上限（DecodeQueueSize）
+DEFAULT_MAX_INFLIGHT = 200  # 分布式识别的在途任务上限（DispatchMaxInflight）
+
+# 运行中可修改的配置键（其余键如端口、地址、解码后端需要重启生效）；配置文件中删除某个键时保持当前值
+HOT_RELOAD_KEYS = ('MaxParallelTasks', 'Timeout', 'DecodeQueueSize', 'DispatchMaxInflight', 'SlotNum',
+                   'AutoscaleMinWorkers', 'AutoscaleMaxWorkers', 'AutoscaleWarm', 'AutoscaleInterval')
+
+
+def load_config(config_file=DEFAULT_CONFIG_PATH):
+    """加载配置文件，不存在或出错时返回空配置"""
+    try:
+        if os.path.exists(config_file):
+            with open(config_file, 'r') as f:
+                config = json.load(f)
+                print(f"✅ 已加载配置文件: {config_file}")
+                return config
+        else:
+            print(f"⚠️ 配置文件不存在: {config_file}，使用默认配置")
+            return {}
+    except Exception as e:
+        print(f"❌ 加载配置文件失败: {e}，使用默认配置")
+        return {}
+
+
+def parse_message(serialized_data):
+    """反序列化一条消息 -> (帧序号, 发送时间戳ms, [{'metadata', 'image_data'}])
+    帧头6字节：2字节序列号 + 4字节时间戳；之后重复 [4字节元数据长度 + JSON元数据 + 4字节图像长度 + JPEG]
+    不足6字节的消息没有帧头，帧序号和时间戳返回 None"""
+    crops = []
+    frame_sequence = timestamp_ms = None
+    ptr = 0
+    if len(serialized_data) >= 6:
+        frame_sequence = int.from_bytes(serialized_data[0:2], byteorder='big')
+        timestamp_ms = int.from_bytes(serialized_data[2:6], byteorder='big')
+        ptr = 6
+
+    while ptr < len(serialized_data):
+        metadata_length = int.from_bytes(serialized_data[ptr:ptr+4], byteorder='big')
+        ptr += 4
+        metadata_bytes = serialized_data[ptr:ptr+metadata_length]
+        ptr += metadata_length
+        metadata = json.loads(metadata_bytes.decode('utf-8'))
+
+        img_length = int.from_bytes(serialized_data[ptr:ptr+4], byteorder='big')
+        ptr += 4
+        img_data = serialized_data[ptr:ptr+img_length]
+        ptr += img_length
+
+        crops.append({
+            'metadata': metadata,
+            'image_data': img_data
+        })
+
+    return frame_sequence, timestamp_ms, crops
+
+
+def format_position(metadata):
+    """元数据中的位置 -> "(x,y,z)"（保留两位小数），没有位置返回 "NA" """
+    pose_info = (metadata or {}).get('pose', {})
+    position_array = pose_info.get('position', [0.0, 0.0, 0.0])
+    if len(position_array) >= 3:
+        return f"({position_array[0]:.2f},{position_array[1]:.2f},{position_array[2]:.2f})"
+    return "NA"
+
+
+def crop_metadata(slot):
+    """槽位元数据（带ROI时才返回，否则返回None）"""
+    metadata = slot.get('metadata')
+    if isinstance(metadata, dict) and isinstance(metadata.get('roi'), dict):
+        return metadata
+    return None
+
+
+class CropRing:
+    """固定槽位数的单生产者/多消费者环形缓冲：接收线程写入，显示线程/识别线程按索引读取
+
+    每个槽位带一个序号（seqlock）：写入前加 1 变为奇数，写完再加 1 变回偶数。
+    生产者只做两次整数赋值和一次引用替换，从不等待读者（无锁、wait-free）；
+    读者在读槽位前后各取一次序号，两次相同且为偶数才算有效快照，否则重试，
+    重试 READ_RETRIES 次仍失败（一直在被覆盖）返回 None，由调用方按空槽处理。
+    读者拿到的是槽位的浅拷贝，之后槽位再被覆盖也不影响正在显示/识别的数据。
+
+    识别结果不回写到槽位 dict（否则识别线程和接收线程会同时写同一个槽位），
+    而是按 (recv_seq, 耗时, 结果) 整体存入 results[slot]，读快照时 recv_seq 对得上才合并进来。
+    快照字段：metadata、image_data、recv_seq、slot_index、frame_sequence、dbr_elapsed_ms、dbr_items
+
+    publish() 还会通过条件变量通知等待新数据的显示线程（wait_for_publish），显示线程不必轮询。
+
+    槽位数可在运行中调整（resize，配置热加载）：槽位、序号、结果三个数组连同槽位数打包为 layout 整体替换，
+    读者每次只取一次 layout 引用，不会把新旧数组混在一起；resize 后槽位号重新编排，generation 加 1。"""
+
+    READ_RETRIES = 8
+
+    def __init__(self, slot_num):
+        self.slot_num = slot_num
+        # (槽位数, 槽位, 每个槽位的 seqlock 序号（奇数表示正在写入）, 识别结果 (recv_seq, dbr_elapsed_ms, dbr_items))
+        self.layout = (slot_num, [None] * slot_num, [0] * slot_num, [None] * slot_num)
+        self.generation = 0  # resize() 次数：槽位号在 resize 前后不通用
+        self.write_index = 0  # 下一个写入位置（只有生产者读写）
+        self.latest_index = -1  # 最新写入的位置（-1 表示还没有数据），整条消息写完后才更新
+        self.publish_count = 0  # publish() 次数，等待者据此判断是否有新数据（避免槽位回绕后索引相同）
+        self.publish_cond = threading.Condition()
+        self.woken = False  # wake() 设置：翻页/退出等非数据事件也要唤醒显示线程
+
+        # 读者竞争统计：读到正在写入/读期间被覆盖的次数（近似计数，不加锁）
+        self.read_count = 0
+        self.contended_reads = 0
+        self.read_retries = 0
+        self.failed_reads = 0
+
+    def put(self, metadata, image_data, recv_seq, frame_sequence):
+        """写入一个裁剪，返回槽位索引（此时还不对显示可见，见 publish()）；只能由接收线程调用"""
+        slot_num, slots, seqs, _ = self.layout
+        slot_index = self.write_index
+        seqs[slot_index] += 1  # 奇数：写入中
+        slots[slot_index] = {
+            'metadata': metadata,
+            'image_data': image_data,
+            'recv_seq': recv_seq,
+            'slot_index': slot_index,  # 记录实际的槽位索引
+            'frame_sequence': frame_sequence,
+        }
+        seqs[slot_index] += 1  # 偶数：写入完成
+        self.write_index = (slot_index + 1) % slot_num
+        return slot_index
+
+    def resize(self, slot_num):
+        """调整槽位数，按时间顺序保留最新的数据（新槽位号从 0 起），返回保留的条数；只能由接收线程调用。
+        正在进行的读取拿的是旧 layout，读到的仍是一致的旧快照"""
+        old_num, slots, _, results = self.layout
+        order = [(self.write_index + i) % old_num for i in range(old_num)]  # 最旧 -> 最新
+        kept = [i for i in order if slots[i] is not None][-slot_num:]
+        new_slots, new_results = [None] * slot_num, [None] * slot_num
+        for new_index, old_index in enumerate(kept):
+            new_slots[new_index] = dict(slots[old_index], slot_index=new_index)
+            new_results[new_index] = results[old_index]
+        self.layout = (slot_num, new_slots, [0] * slot_num, new_results)
+        self.slot_num = slot_num
+        self.write_index = len(kept) % slot_num
+        self.generation += 1
+        with self.publish_cond:
+            self.latest_index = len(kept) - 1
+            self.publish_count += 1
+            self.publish_cond.notify_all()
+        return len(kept)
+
+    def publish(self):
+        """一条消息的裁剪全部写入后，一次性通知显示线程"""
+        with self.publish_cond:
+            self.latest_index = (self.write_index - 1) % self.slot_num
+            self.publish_count += 1
+            self.publish_cond.notify_all()
+
+    def wait_for_publish(self, seen_count, timeout=None):
+        """阻塞到 publish_count 超过 seen_count、被 wake() 唤醒或超时，返回当前 publish_count"""
+        with self.publish_cond:
+            if self.publish_count == seen_count and not self.woken:
+                self.publish_cond.wait(timeout)
+            self.woken = False
+            return self.publish_count
+
+    def wake(self):
+        """唤醒等待中的显示线程（手动翻页、退出）"""
+        with self.publish_cond:
+            self.woken = True
+            self.publish_cond.notify_all()
+
+    def get(self, index):
+        """读取槽位的有效快照（浅拷贝，已合并识别结果）；空槽或反复被覆盖时返回 None"""
+        slot_num, slots, seqs, results = self.layout
+        index %= slot_num
+        self.read_count += 1
+        contended = False
+        for attempt in range(self.READ_RETRIES):
+            if attempt:
+                self.read_retries += 1
+            seq = seqs[index]
+            if seq & 1:
+                contended = True
+                continue
+            slot = slots[index]
+            result = results[index]
+            if seqs[index] != seq:
+                contended = True
+                continue
+            if contended:
+                self.contended_reads += 1
+            if slot is None:
+                return None
+            snapshot = dict(slot)
+            if result is not None and result[0] == slot['recv_seq']:
+                snapshot['dbr_elapsed_ms'], snapshot['dbr_items'] = result[1], result[2]
+            else:
+                snapshot['dbr_elapsed_ms'], snapshot['dbr_items'] = None, None
+            return snapshot
+        self.contended_reads += 1
+        self.failed_reads += 1
+        return None
+
+    def lookup(self, slot_index, recv_seq):
+        """取回仍属于 recv_seq 的槽位快照；槽位已被新数据覆盖时返回 None"""
+        if slot_index is None:
+            return None
+        slot = self.get(slot_index)
+        if slot is not None and slot.get('recv_seq') == recv_seq:
+            return slot
+        return None
+
+    def store_result(self, slot_index, recv_seq, elapsed_ms, items):
+        """识别线程回写结果；槽位之后被覆盖时 recv_seq 对不上，读快照时自然忽略"""
+        slot_num, _, _, results = self.layout
+        results[slot_index % slot_num] = (recv_seq, elapsed_ms, items)
+
+    def find_valid(self, start_index, max_search, step=-1, skip_start=False):
+        """从 start_index 起按 step 方向查找第一个有数据的槽位，找不到返回 None"""
+        slot_num, slots, _, _ = self.layout
+        for offset in range(1 if skip_start else 0, min(max_search, slot_num)):
+            check_index = (start_index + step * offset) % slot_num
+            if slots[check_index] is not None:
+                return check_index
+        return None
+
+    def get_stats(self):
+        return {
+            'reads': self.read_count,
+            'contended': self.contended_reads,
+            'retries': self.read_retries,
+            'failed': self.failed_reads,
+        }
+
+    def clear(self):
+        slot_num, slots, seqs, results = self.layout
+        for i in range(slot_num):
+            seqs[i] += 1
+            slots[i] = None
+            results[i] = None
+            seqs[i] += 1
+
+
+def format_ring_stats(stats):
+    """格式化环形槽位读竞争统计，用于周期性打印"""
+    return (f"读取 {stats['reads']}，竞争 {stats['contended']}，重试 {stats['retries']}，"
+            f"放弃 {stats['failed']}")
+
+
+class ReceiverCore:
+    """接收 → 环形槽位 → 识别 → 结果；两个前端共用，前端只负责显示与交互"""
+
+    def __init__(self, config=None, listen_host='0.0.0.0', listen_port=5555, camera_ip='192.168.0.176',
+                 ack_port=5556, slot_num=200, transport='tcp', record_dir=None, enable_dbr=False,
+                 dbr_dispatch=False, dbr_task_addr=None, dbr_result_addr=None, decoder_backend=None,
+                 decode_input=None, decode_scale=None, sampling=None, tracking=None, autoscale=None,
+                 log_dir=LOG_DIR, quiet=False, on_message=None):
+        self.config = config if config is not None else {}
+        self.listen_host = listen_host
+        self.listen_port = listen_port
+        self.camera_node_ip = camera_ip
+        self.ack_port = ack_port
+        self.quiet = quiet  # 不逐条打印接收/识别日志
+        self.on_message = on_message  # 每条消息写入槽位后回调 on_message(裁剪数)，在接收线程中执行
+        self.running = False
+        self.closed = False
+
+        self.ring = CropRing(slot_num)
+        self.code_index = CodeIndex()  # 识别内容 -> 槽位/帧，随槽位覆盖同步淘汰
+
+        # 传输方式：tcp（默认）或 shm（额外监听ipc控制通道，JPEG经共享内存传递）
+        self.transport = transport
+        self.shm_resolver = ShmCropResolver()
+
+        # 原始消息录制（可选，用于 send_file.py --replay 回放）
+        self.recorder = None
+        if record_dir:
+            self.recorder = StreamRecorder(new_record_dir(record_dir))
+            if transport == 'shm':
+                print("⚠️ 共享内存传输的消息只含JPEG引用，录制内容无法独立回放")
+
+        # 接收统计
+        self.received_count = 0  # 接收裁剪区域数
+        self.received_messages = 0  # 接收消息数（每条消息含若干裁剪区域）
+        self.total_bytes = 0
+        self.start_time = time.time()
+        self.last_successful_receive = 0  # 0 表示还没有成功接收过数据
+        self.frame_intervals = []  # 最近1000个消息间隔
+        self.last_frame_time = None
+        self.current_frame_sequence = 0
+        self.last_frame_sequence = 0
+        self.lost_frames_count = 0
+        self.recv_seq_counter = 0  # 接收序号（单调递增，手动识别也占用序号）
+
+        # 初始化TurboJPEG（自动探测 + Windows回退路径）
+        try:
+            self.jpeg = TurboJPEG()
+        except Exception as e:
+            if os.name != 'nt':
+                print(f"❌ TurboJPEG初始化失败: {e}")
+                raise
+            self.jpeg = TurboJPEG(r"C:\libjpeg-turbo64\bin\libturbojpeg.dll")
+
+        # 识别
+        self.dbr_enabled = bool(enable_dbr)
+        self.dbr_thread_count = self.config.get('MaxParallelTasks', 8)
+        self.dbr_timeout = self.config.get('Timeout', 10000)
+        self.dbr_queue = None
+        self.dbr_threads = {}  # 工作线程ID -> 线程（线程数可在运行中调整）
+        self.dbr_pool_lock = threading.Lock()
+        self.log_dir = log_dir  # 结果日志目录（None 不写结果日志）；界面版从默认目录自动加载最新日志
+        self.dbr_log_file = None
+        self.dbr_global_seq = 0  # 结果日志全局序号，从1开始递增
+        self.dbr_dropped_frames = 0  # 识别队列/在途任务丢弃数
+        self.dbr_total_decoded = 0
+        self.dbr_total_time_ms = 0.0  # 累计识别时间（毫秒）
+        self.dbr_prep_time_ms = 0.0  # 其中输入准备（灰度解码+ROI裁剪）时间
+        self.dbr_total_attempts = 0  # 识别次数（含未识别出结果的）
+        self.dbr_stats_lock = threading.Lock()
+        # 解码后端：参数（后端名或 DecoderBackend 实例）> 配置文件 DecoderBackend > 默认 dbr
+        if isinstance(decoder_backend, DecoderBackend):
+            self.decoder_backend = decoder_backend
+        else:
+            self.decoder_backend = create_backend(decoder_backend, self.config)
+        # 识别输入准备 / 背压抽帧 / 跨帧码跟踪：参数 > 配置文件 > 默认关闭
+        self.input_preparer = create_preparer(self.jpeg, decode_input, decode_scale, self.config)
+        self.sampler = create_sampler(self.jpeg, sampling, self.config, workers=self.dbr_thread_count)
+        self.tracker = create_tracker(tracking, self.config)
+        self.autoscale = autoscale  # 线程池自动伸缩：参数 > 配置文件 DecodeAutoscale > 默认关闭（_init_dbr 中创建）
+        self.autoscaler = None
+
+        # 分布式识别（任务通过Push0分发到独立工作节点，结果经Pull0回收）
+        self.dbr_dispatch = bool(dbr_dispatch)
+        self.dbr_dispatcher = None
+        self.dbr_task_addr = dbr_task_addr or self.config.get('DBRTaskAddress', DEFAULT_TASK_ADDR)
+        self.dbr_result_addr = dbr_result_addr or self.config.get('DBRResultAddress', DEFAULT_RESULT_ADDR)
+
+        # 配置文件热加载（watch_config() 启用）；槽位数调整由接收线程执行，这里只登记
+        self.config_watcher = None
+        self.on_config = None
+        self.pending_slot_num = None
+
+        self.subscriber = None
+        self.ack_sender = None
+        self.receive_thread = None
+        self._init_subscriber()
+        self._init_ack_sender()
+        if self.dbr_enabled:
+            if self.dbr_dispatch:
+                self._init_dbr_dispatcher()
+            else:
+                self._init_dbr()
+
+    # ---------- 初始化 ----------
+
+    def _init_subscriber(self):
+        """启动NNG服务器（监听模式）"""
+        try:
+            self.subscriber = pynng.Sub0()
+            self.subscriber.recv_timeout = 3000
+            self.subscriber.subscribe(b"")
+            # Windows兼容的地址格式
+            if self.listen_host == '0.0.0.0':
+                listen_addr = f"tcp://*:{self.listen_port}"
+            else:
+                listen_addr = f"tcp://{self.listen_host}:{self.listen_port}"
+            self.subscriber.listen(listen_addr)
+            print(f"✅ 服务器启动，监听: {self.listen_host}:{self.listen_port}")
+            if self.transport == 'shm':
+                # 同机相机节点走ipc，TCP监听保留给远程相机
+                self.subscriber.listen(ipc_address(self.listen_port))
+                print(f"✅ 同机共享内存传输已启用，监听: {ipc_address(self.listen_port)}")
+        except Exception as e:
+            print(f"❌ 服务器启动失败: {e}")
+            raise
+
+    def _init_ack_sender(self):
+        """初始化ACK发送器（发往相机节点的ACK端口，用于延迟监控）"""
+        try:
+            self.ack_sender = pynng.Pub0()
+            ack_addr = f"tcp://{self.camera_node_ip}:{self.ack_port}"
+            self.ack_sender.dial(ack_addr, block=False)
+            print(f"✅ ACK发送器已连接: {ack_addr}")
+        except Exception as e:
+            print(f"⚠️ ACK发送器初始化失败: {e}")
+            self.ack_sender = None
+
+    def _init_dbr_log(self):
+        """准备结果日志文件"""
+        if self.log_dir is None:
+            return
+        try:
+            os.makedirs(self.log_dir, exist_ok=True)
+            ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+            self.dbr_log_file = os.path.join(self.log_dir, f'dbr_multithread_result_{ts}.log')
+            with open(self.dbr_log_file, 'a', encoding='utf-8') as f:
+                f.write(LOG_HEADER)
+            print(f"📝 多线程DBR结果将写入: {self.dbr_log_file}")
+        except Exception as e:
+            print(f"⚠️ DBR日志初始化失败: {e}")
+            self.dbr_log_file = None
+
+    def _init_dbr(self):
+        """初始化多线程识别；解码后端的初始化（DBR SDK导入+许可证）较慢，在 start() 的后台线程中进行"""
+        try:
+            # 手动识别优先且不丢弃，实时帧最新优先、满了丢最旧
+            self.dbr_queue = DecodeQueue(maxsize=self.config.get('DecodeQueueSize', DEFAULT_QUEUE_SIZE))
+            self.autoscaler = create_autoscaler(self.autoscale, self.config, self.dbr_queue,
+                                                lambda: self.dbr_thread_count, self.resize_workers)
+            if self.autoscaler is not None:
+                self.dbr_thread_count = self.autoscaler.clamp(self.dbr_thread_count)
+            input_desc = self.input_preparer.describe() if self.input_preparer else "JPEG 字节"
+            print(f"✅ 多线程DBR 已启用：{self.dbr_thread_count}个线程，解码后端：{self.decoder_backend.describe()}，"
+                  f"超时时间：{self.dbr_timeout}ms，识别输入：{input_desc}")
+            if self.autoscaler is not None:
+                print(f"📈 线程池自动伸缩已启用：{self.autoscaler.min_workers}-{self.autoscaler.max_workers} 个线程，"
+                      f"预热 {self.autoscaler.warm} 个")
+            self._init_dbr_log()
+        except Exception as e:
+            print(f"❌ DBR 初始化异常: {e}")
+            self.dbr_enabled = False
+
+    def _init_dbr_dispatcher(self):
+        """初始化分布式DBR分发器（许可证由各工作节点自行初始化）"""
+        try:
+            self.dbr_dispatcher = DBRTaskDispatcher(
+                self.dbr_task_addr,
+                self.dbr_result_addr,
+                on_result=self._on_dispatch_result,
+                max_inflight=self.config.get('DispatchMaxInflight', DEFAULT_MAX_INFLIGHT),
+                retry_timeout=max(self.dbr_timeout / 1000.0, 1.0)
+            )
+            print(f"✅ 分布式DBR 已启用：请在工作节点运行 dbr_worker_node.py --tasks {self.dbr_task_addr} --results {self.dbr_result_addr}")
+            self._init_dbr_log()
+        except Exception as e:
+            print(f"❌ 分布式DBR 初始化异常: {e}")
+            self.dbr_enabled = False
+
+    # ---------- 启停 ----------
+
+    def start(self):
+        """启动接收线程和识别（本地识别线程在后台初始化解码后端后启动）"""
+        self.running = True
+        self.receive_thread = threading.Thread(target=self.receive_loop, daemon=True, name="Receiver")
+        self.receive_thread.start()
+        if self.dbr_enabled and self.dbr_queue is not None and len(self.dbr_threads) == 0:
+            threading.Thread(target=self._dbr_startup, daemon=True, name="DBR-Init").start()
+        elif self.dbr_enabled and self.dbr_dispatcher is not None:
+            self.dbr_dispatcher.start()
+
+    def _dbr_startup(self):
+        """后台初始化解码后端，完成后启动识别线程；初始化期间到达的裁剪先在识别队列中排队"""
+        t0 = time.perf_counter()
+        try:
+            # 进程级初始化（DBR后端在此导入SDK并初始化许可证）
+            self.decoder_backend.init()
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            self.dbr_enabled = False
+            return
+        except Exception as e:
+            print(f"❌ DBR 初始化异常: {e}")
+            self.dbr_enabled = False
+            return
+        print(f"✅ 解码后端初始化完成，耗时 {(time.perf_counter() - t0) * 1000:.0f} ms")
+        if not self.running:
+            return
+        print(f"🚀 启动 {self.dbr_thread_count} 个DBR工作线程...")
+        if self.sampler is not None:
+            self.sampler.workers = self.dbr_thread_count  # 线程数可能在创建后被修改
+            print(f"🎯 自适应抽帧已启用：{self.sampler.describe()}")
+        with self.dbr_pool_lock:
+            for i in range(self.dbr_thread_count):
+                self._start_worker(i)
+        print(f"✅ {self.dbr_thread_count} 个DBR工作线程已启动")
+        if self.autoscaler is not None:
+            self.autoscaler.start()
+
+    def _start_worker(self, worker_id):
+        """启动一个识别线程（调用方持有 dbr_pool_lock）"""
+        thread = threading.Thread(target=self.dbr_worker_loop, args=(worker_id,), daemon=True,
+                                  name=f"DBR-Worker-{worker_id}")
+        self.dbr_threads[worker_id] = thread
+        thread.start()
+
+    def resize_workers(self, count):
+        """调整本地识别线程数：增加时立即启动新线程，减少时编号超出的线程处理完手头的任务后退出"""
+        count = max(1, int(count))
+        with self.dbr_pool_lock:
+            self.dbr_thread_count = count
+            if self.sampler is not None:
+                self.sampler.workers = count
+            if not self.dbr_threads:
+                return  # 识别线程还没启动（后端初始化中），启动时按新数量创建
+            for i in range(count):
+                thread = self.dbr_threads.get(i)
+                if thread is None or not thread.is_alive():
+                    self._start_worker(i)
+
+    def _retire_worker(self, worker_id):
+        """线程数减少后，编号超出的线程从线程池中移除自己并退出（与 resize_workers 互斥，避免刚退出又不补）"""
+        with self.dbr_pool_lock:
+            if worker_id < self.dbr_thread_count:
+                return False
+            self.dbr_threads.pop(worker_id, None)
+            return True
+
+    def close(self):
+        """停止所有线程并释放网络/共享内存/录制资源（可重复调用）"""
+        if self.closed:
+            return
+        self.closed = True
+        self.running = False
+        self.ring.wake()  # 让阻塞在 wait_for_publish 上的显示线程及时退出
+        if self.config_watcher is not None:
+            self.config_watcher.close()
+        if self.autoscaler is not None:
+            self.autoscaler.close()
+
+        if self.dbr_threads:
+            print("等待DBR线程结束...")
+            with self.dbr_pool_lock:
+                threads = list(self.dbr_threads.values())
+            for thread in threads:
+                if thread.is_alive():
+                    thread.join(timeout=2.0)  # 最多等待2秒
+            self.dbr_threads.clear()
+        if self.dbr_dispatcher is not None:
+            self.dbr_dispatcher.close()
+
+        for sock in (self.subscriber, self.ack_sender):
+            if sock is not None:
+                try:
+                    sock.close()
+                except Exception:
+                    pass
+        self.shm_resolver.close()
+        if self.recorder is not None:
+            self.recorder.close()
+
+    # ---------- 接收 ----------
+
+    def is_connected(self, window=30.0):
+        """最近 window 秒内收到过数据即认为相机节点在线"""
+        return self.last_successful_receive > 0 and (time.time() - self.last_successful_receive) < window
+
+    def _send_ack(self, frame_sequence, timestamp_ms):
+        """ACK消息：2字节序列号 + 4字节发送时间戳（用于延迟计算）"""
+        if self.ack_sender:
+            try:
+                ack_data = (
+                    frame_sequence.to_bytes(2, byteorder='big') +
+                    timestamp_ms.to_bytes(4, byteorder='big')
+                )
+                self.ack_sender.send(ack_data)
+            except Exception as e:
+                if not self.quiet:
+                    print(f"❌ 发送ACK失败: {e}")
+
+    def _check_frame_loss(self):
+        """按帧序号检测丢帧"""
+        current_seq = self.current_frame_sequence
+
+        # 第一次接收，初始化
+        if self.last_frame_sequence == 0:
+            self.last_frame_sequence = current_seq
+            return
+
+        if current_seq > self.last_frame_sequence:
+            lost_count = current_seq - self.last_frame_sequence - 1
+            if lost_count > 0:
+                self.lost_frames_count += lost_count
+                print(f"⚠️ 检测到丢帧: 从 {self.last_frame_sequence} 到 {current_seq}, 丢帧数 {lost_count}")
+        elif current_seq < self.last_frame_sequence:
+            # 序号回退，可能是重连或重启
+            print(f"🔄 序号回退: 从 {self.last_frame_sequence} 到 {current_seq}")
+
+        self.last_frame_sequence = current_seq
+
+    def receive_loop(self):
+        """接收数据循环"""
+        while self.running:
+            if self.pending_slot_num is not None:
+                self._apply_ring_resize()
+            try:
+                serialized_data = self.subscriber.recv()
+                self.handle_message(serialized_data)
+            except pynng.Timeout:
+                continue
+            except nng_exceptions.Closed:
+                print("🔒 Socket 已关闭，接收线程退出")
+                break
+            except Exception as e:
+                print(f"❌ 接收线程异常: {e}")
+                break
+
+    def handle_message(self, serialized_data):
+        """处理一条消息：回ACK、写入槽位、送识别"""
+        now = time.time()
+        if self.recorder is not None:
+            self.recorder.record(serialized_data, now)
+        self.total_bytes += len(serialized_data)
+
+        frame_sequence, timestamp_ms, crops_data = parse_message(serialized_data)
+        if frame_sequence is not None:
+            self.current_frame_sequence = frame_sequence
+            self._send_ack(frame_sequence, timestamp_ms)
+        # 共享内存传输的裁剪区域：按引用取回JPEG
+        crops_data = self.shm_resolver.resolve(crops_data)
+        self._check_frame_loss()
+
+        self.received_count += len(crops_data)
+        self.received_messages += 1
+        self.last_successful_receive = now
+        if self.last_frame_time is not None:
+            self.frame_intervals.append(now - self.last_frame_time)
+            # 只保留最近1000个间隔，避免内存过多占用
+            if len(self.frame_intervals) > 1000:
+                self.frame_intervals.pop(0)
+        self.last_frame_time = now
+
+        if crops_data:
+            for crop in crops_data:
+                self.recv_seq_counter += 1
+                recv_seq = self.recv_seq_counter
+                slot_index = self.ring.put(crop.get('metadata'), crop.get('image_data'), recv_seq,
+                                           self.current_frame_sequence)
+                self.code_index.evict_slot(slot_index)
+                if self.dbr_enabled:
+                    self._submit_live(recv_seq, slot_index)
+            self.ring.publish()
+
+        if self.on_message is not None:
+            self.on_message(len(crops_data))
+
+    def _submit_live(self, recv_seq, slot_index):
+        """把刚写入的槽位送去识别（分布式分发，或本地识别队列）"""
+        slot = self.ring.get(slot_index)
+        jpeg_bytes = slot.get('image_data')
+
+        # 分布式模式：直接分发给工作节点
+        if self.dbr_dispatcher is not None:
+            if isinstance(jpeg_bytes, (bytes, bytearray)):
+                if self.dbr_dispatcher.submit(recv_seq, jpeg_bytes, slot_index):
+                    self.dbr_dropped_frames += 1
+                    if not self.quiet:
+                        print(f"⚠️ 分布式DBR在途任务已满，丢弃最旧任务，recv_seq={recv_seq}，累计丢弃:{self.dbr_dropped_frames}")
+            return
+        if self.dbr_queue is None:
+            return
+
+        # 携带 recv_seq、slot_index 便于回写，元数据供输入准备裁剪和跟踪
+        metadata = crop_metadata(slot)
+        if self.tracker is not None and metadata is not None:
+            # 已知码的预测位置覆盖了整个裁剪则跳过识别；部分覆盖时只识别新区域
+            action, boxes = self.tracker.plan(metadata)
+            if action == 'skip':
+                return
+            if action == 'restrict':
+                metadata = dict(metadata, track_mask=boxes)
+        if not isinstance(jpeg_bytes, (bytes, bytearray)):
+            return
+        payload = (recv_seq, jpeg_bytes, slot_index, metadata)
+        # 启用抽帧时由控制器决定送哪些裁剪去识别，其余直接跳过
+        payloads = [payload] if self.sampler is None else self.sampler.offer(payload, self.dbr_queue.qsize())
+        for payload in payloads:
+            # 队列满时丢弃最旧的实时任务以避免堆积
+            evicted = self.dbr_queue.put_live(payload)
+            if evicted is not None:
+                self.dbr_dropped_frames += 1
+                if not self.quiet:
+                    print(f"⚠️ DBR队列已满({self.dbr_queue.maxsize})，丢弃最旧数据 recv_seq={evicted[0]}，累计丢弃:{self.dbr_dropped_frames}")
+
+    def _flush_sampler(self):
+        """识别队列已空：把抽帧窗口中暂存的裁剪送去识别（相机暂停或扫描结束时最后几帧不滞留）"""
+        if self.sampler is None:
+            return
+        for payload in self.sampler.flush(self.dbr_queue.qsize()):
+            self.dbr_queue.put_live(payload)
+
+    def submit_manual(self, slot_index):
+        """手动识别指定槽位：优先处理、不会被丢弃、入队不阻塞。返回分配的 recv_seq，无法识别时返回 None"""
+        if not self.dbr_enabled or (self.dbr_queue is None and self.dbr_dispatcher is None):
+            return None
+        slot = self.ring.get(slot_index)
+        if not slot or not isinstance(slot, dict):
+            return None
+        img_data = slot.get('image_data')
+        if not isinstance(img_data, (bytes, bytearray)):
+            return None
+        # 手动识别占用一个新的 recv_seq（结果按此回写）
+        self.recv_seq_counter += 1
+        manual_recv_seq = self.recv_seq_counter
+        slot_index = slot_index % self.ring.slot_num
+        if self.dbr_dispatcher is not None:
+            self.dbr_dispatcher.submit(manual_recv_seq, img_data, slot_index, manual=True)
+        else:
+            self.dbr_queue.put_manual((manual_recv_seq, img_data, slot_index, crop_metadata(slot)))
+        return manual_recv_seq
+
+    # ---------- 识别 ----------
+
+    def dbr_worker_loop(self, worker_id):
+        """多线程识别工作线程：每个线程独立的解码器实例"""
+        print(f"🔍 DBR工作线程{worker_id}已启动")
+        try:
+            if self.autoscaler is not None:
+                decoder = self.autoscaler.acquire_decoder(self.decoder_backend.create)  # 优先取预热的实例
+            else:
+                decoder = self.decoder_backend.create()
+        except Exception as e:
+            print(f"❌ DBR工作线程初始化失败: {e}")
+            return
+
+        while self.running and self.dbr_enabled and self.dbr_queue is not None:
+            if worker_id >= self.dbr_thread_count and self._retire_worker(worker_id):
+                if self.autoscaler is not None:
+                    self.autoscaler.release_decoder(decoder)
+                if not self.quiet:
+                    print(f"🔍 DBR工作线程{worker_id}已退出（线程数调整为 {self.dbr_thread_count}）")
+                return
+            try:
+                payload = self.dbr_queue.get(timeout=0.2)
+            except Exception:
+                self._flush_sampler()
+                continue
+
+            try:
+                # 统一使用 (recv_seq, jpeg_bytes, slot_index, metadata)
+                recv_seq, jpeg_bytes, slot_index, metadata = payload
+                roi = (metadata or {}).get('roi')
+
+                t0 = time.time()
+                prep_ms = 0.0
+                if self.input_preparer is not None:
+                    # 一次灰度解码（可缩小）+ ROI裁剪，解码器直接处理原始灰度缓冲区
+                    gray, origin, scale = self.input_preparer.prepare(jpeg_bytes, roi)
+                    if metadata and metadata.get('track_mask'):
+                        mask_known_regions(gray, metadata['track_mask'], origin, scale)
+                    prep_ms = (time.time() - t0) * 1000.0
+                    result_items = decoder.decode_image(gray)
+                else:
+                    # JPEG本身就是该ROI的裁剪
+                    origin, scale = ((roi.get('x', 0), roi.get('y', 0)) if roi else (0, 0)), 1.0
+                    result_items = decoder.decode(jpeg_bytes)
+                elapsed_ms = (time.time() - t0) * 1000.0
+                if self.autoscaler is not None:
+                    self.autoscaler.record_decode(elapsed_ms)
+
+                if elapsed_ms > self.dbr_timeout:
+                    if not self.quiet:
+                        print(f"⚠️ DBR识别超时: {elapsed_ms:.1f}ms > {self.dbr_timeout}ms")
+                    continue
+
+                with self.dbr_stats_lock:
+                    self.dbr_total_time_ms += elapsed_ms
+                    self.dbr_prep_time_ms += prep_ms
+                    self.dbr_total_attempts += 1
+                if self.sampler is not None:
+                    self.sampler.record_decode(elapsed_ms)
+                if self.tracker is not None and result_items:
+                    self.tracker.update(metadata, result_items, origin, scale)
+
+                if not result_items:
+                    # 静默未识别以减少噪音
+                    continue
+
+                self._store_result(recv_seq, slot_index, worker_id, elapsed_ms, result_items)
+
+            except Exception as e:
+                print(f"❌ DBR识别异常: {e}")
+
+    def _on_dispatch_result(self, recv_seq, slot_index, worker_id, elapsed_ms, result_items):
+        """分布式DBR结果回调（在分发器结果线程中执行）"""
+        with self.dbr_stats_lock:
+            self.dbr_total_time_ms += elapsed_ms
+            self.dbr_total_attempts += 1
+        if not result_items:
+            return
+        self._store_result(recv_seq, slot_index, worker_id, elapsed_ms, result_items)
+
+    def _store_result(self, recv_seq, slot_index, worker_id, elapsed_ms, result_items):
+        """记录识别结果：更新计数、写日志文件、回写到环形槽位"""
+        with self.dbr_stats_lock:
+            self.dbr_total_decoded += len(result_items)
+
+        if not self.quiet:
+            for it in result_items:
+                print(f"✅ DBR {elapsed_ms:.1f} ms | {it.get('fmt')} | {it.get('text')}")
+
+        # 槽位已被覆盖时日志中记 N/A（结果照样记录，不依赖slot）
+        slot = self.ring.lookup(slot_index, recv_seq) if recv_seq is not None else None
+
+        if recv_seq is not None and self.dbr_log_file:
+            try:
+                slot_status = str(slot_index) if slot is not None else "N/A"
+                position_str = format_position(slot.get('metadata')) if slot is not None else "NA"
+                # 线程安全地写入日志文件
+                with self.dbr_stats_lock:
+                    with open(self.dbr_log_file, 'a', encoding='utf-8') as f:
+                        for it in result_items:
+                            self.dbr_global_seq += 1
+                            fmt = it.get('fmt', 'UNK')
+                            txt = it.get('text', '')
+                            f.write(f"{self.dbr_global_seq},{recv_seq},{worker_id},{slot_status},{position_str},{fmt},{txt}\n")
+
+                if not self.quiet:
+                    print(f"✅ 存储: 全局序列号={self.dbr_global_seq}, recv_seq={recv_seq}, 识别到{len(result_items)}个结果")
+            except Exception as e:
+                print(f"⚠️ DBR日志写入失败: {e}")
+
+        # 回写到环形槽位（用于显示）
+        if slot is not None:
+            self.ring.store_result(slot_index, recv_seq, float(f"{elapsed_ms:.1f}"), result_items)
+            position_str = format_position(slot.get('metadata'))
+            for it in result_items:
+                self.code_index.add(it.get('text', ''), it.get('fmt'), recv_seq, slot['slot_index'],
+                                    slot.get('frame_sequence'), position_str)
+
+    # ---------- 配置热加载 ----------
+
+    def watch_config(self, path=DEFAULT_CONFIG_PATH, on_change=None):
+        """监视配置文件（配置 ConfigHotReload 为 false 时不启用）；变化后先由 apply_config 调整流水线，
+        再回调 on_change(新配置, 变化的键)（前端调整显示帧率、统计间隔等），都在监视线程中执行"""
+        if not self.config.get('ConfigHotReload', True) or self.config_watcher is not None:
+            return
+        self.on_config = on_change
+        self.config_watcher = ConfigWatcher(path, self.config, self._on_config_file_change).start()
+
+    def _on_config_file_change(self, config, changed):
+        self.apply_config(config, changed)
+        if self.on_config is not None:
+            self.on_config(config, changed)
+
+    def apply_config(self, config, changed):
+        """应用运行中可修改的配置；其余变化的键提示需要重启"""
+        self.config = config
+        if self.autoscaler is not None and any(key.startswith('Autoscale') for key in changed):
+            self.autoscaler.configure(config)
+            print(f"🔧 线程池自动伸缩范围调整为 {self.autoscaler.min_workers}-{self.autoscaler.max_workers}，"
+                  f"预热 {self.autoscaler.warm} 个")
+        if 'MaxParallelTasks' in changed and self.dbr_queue is not None:
+            count = config.get('MaxParallelTasks', self.dbr_thread_count)
+            # 自动伸缩时作为当前线程数（限制在上下限之间），之后由控制器继续调整
+            self.resize_workers(self.autoscaler.clamp(count) if self.autoscaler is not None else count)
+            print(f"🔧 DBR工作线程数调整为 {self.dbr_thread_count}")
+        if 'Timeout' in changed:
+            self.dbr_timeout = config.get('Timeout', self.dbr_timeout)
+            if self.dbr_dispatcher is not None:
+                self.dbr_dispatcher.retry_timeout = max(self.dbr_timeout / 1000.0, 1.0)
+            print(f"🔧 识别超时调整为 {self.dbr_timeout} ms")
+        if 'DecodeQueueSize' in changed and self.dbr_queue is not None:
+            dropped = self.dbr_queue.resize(config.get('DecodeQueueSize', self.dbr_queue.maxsize))
+            self.dbr_dropped_frames += dropped
+            print(f"🔧 识别队列上限调整为 {self.dbr_queue.maxsize}" + (f"，丢弃 {dropped} 个排队任务" if dropped else ""))
+        if 'DispatchMaxInflight' in changed and self.dbr_dispatcher is not None:
+            self.dbr_dispatcher.max_inflight = max(1, int(config.get('DispatchMaxInflight', self.dbr_dispatcher.max_inflight)))
+            print(f"🔧 分布式在途任务上限调整为 {self.dbr_dispatcher.max_inflight}")
+        if 'SlotNum' in changed and 'SlotNum' in config:
+            self.pending_slot_num = max(1, int(config['SlotNum']))  # 由接收线程在两条消息之间执行
+        restart = [key for key in changed if key not in HOT_RELOAD_KEYS]
+        if restart:
+            print(f"⚠️ 以下配置需要重启后生效（或由前端处理）: {', '.join(restart)}")
+
+    def _apply_ring_resize(self):
+        """调整环形槽位数（接收线程中执行，与写入互斥）；槽位号重新编排后按新位置重建倒排索引。
+        调整前已送去识别的任务，结果回写时槽位对不上，只写日志不回写"""
+        slot_num, self.pending_slot_num = self.pending_slot_num, None
+        if slot_num == self.ring.slot_num:
+            return
+        kept = self.ring.resize(slot_num)
+        self.code_index.clear()
+        for slot_index in range(kept):
+            slot = self.ring.get(slot_index)
+            if slot is None or not slot.get('dbr_items'):
+                continue
+            position_str = format_position(slot.get('metadata'))
+            for it in slot['dbr_items']:
+                self.code_index.add(it.get('text', ''), it.get('fmt'), slot['recv_seq'], slot_index,
+                                    slot.get('frame_sequence'), position_str)
+        print(f"🔧 环形槽位数调整为 {slot_num}（保留最近 {kept} 个裁剪）")
+
+    def avg_decode_ms(self):
+        """平均单次识别耗时（毫秒）"""
+        return self.dbr_total_time_ms / self.dbr_total_attempts if self.dbr_total_attempts > 0 else 0.0
+
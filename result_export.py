@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+识别结果的流式导出/导入（qr_gui_viewer.py 的"导出"/"导入"按钮使用）
+原来导出/导入都在 Tk 主线程里一次性完成，文件大时界面卡住、整个文件读进内存；现在：
+    后台任务  TransferJob 在单独线程中运行，按块（CHUNK_ROWS 行）读写，每块回调一次进度，可随时取消
+    流式写入  CSV 直接逐块写；XLSX 用 zipfile 流式写工作表 XML（不依赖 openpyxl），
+              超过单表行数上限自动续写下一张工作表
+    临时文件  先写 <文件名>.part，完成后再改名，取消或失败不会留下半个文件
+导出内容：汇总表、原始识别记录（结果日志逐行读取），以及附加位置坐标/帧号的识别记录。
+
+    job = TransferJob(export_rows(rows, columns, path), on_progress=..., on_done=...)
+    job.start()      # on_progress(已处理行数, 进度 0..1 或 None)、on_done(行数, 错误) 在后台线程中调用
+    job.cancel()
+"""
+
+import csv
+import os
+import re
+import threading
+import zipfile
+from xml.sax.saxutils import escape
+
+CHUNK_ROWS = 5000  # 每块行数：每块写一次文件、回调一次进度
+XLSX_MAX_ROWS = 1048576  # Excel 单张工作表行数上限（含表头）
+
+RAW_COLUMNS = ['global_seq', 'recv_seq', 'worker_id', 'slot_status', 'position', 'format', 'text']
+JOINED_COLUMNS = RAW_COLUMNS + ['pos_x', 'pos_y', 'pos_z', 'frame_sequence']
+
+
+class TransferCancelled(Exception):
+    pass
+
+
+def parse_log_line(line):
+    """结果日志的一行 -> 识别结果 dict（注释、空行或格式不对返回 None）
+    先从右侧切出 text，再切出 format，剩余为前5列（其中 position 含逗号）"""
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+    try:
+        rest1, text = line.rsplit(',', 1)
+        rest2, fmt = rest1.rsplit(',', 1)
+    except ValueError:
+        return None
+    head = rest2.split(',', 4)
+    if len(head) != 5:
+        return None
+    global_seq, recv_seq, worker_id, slot_status, position = [h.strip() for h in head]
+    return {
+        'global_seq': global_seq,
+        'recv_seq': recv_seq,
+        'worker_id': worker_id,
+        'slot_status': slot_status,
+        'position': position,
+        'format': fmt.strip(),
+        'text': text.strip(),
+    }
+
+
+def split_position(position):
+    """"(x,y,z)" -> [x, y, z] 字符串；NA 或格式不对返回三个空串"""
+    parts = position.strip('()').split(',')
+    return parts if len(parts) == 3 and position.startswith('(') else ['', '', '']
+
+
+# ---------- 写入 ----------
+
+class CsvSink:
+    def __init__(self, path, columns):
+        self.file = open(path, 'w', newline='', encoding='utf-8-sig')  # 带 BOM，Excel 直接打开不乱码
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+_XML_ILLEGAL = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')  # XML 1.0 不允许的控制字符（条码内容里偶尔会有）
+
+
+def _xlsx_cell(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    text = _XML_ILLEGAL.sub('', escape(str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+class XlsxSink:
+    """最小的流式 XLSX 写入：单元格用内联字符串（不需要 sharedStrings），工作表逐行写入压缩包"""
+
+    SHEET_HEAD = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                  '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+    SHEET_TAIL = '</sheetData></worksheet>'
+
+    def __init__(self, path, columns):
+        self.zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED)
+        self.header = ''.join(_xlsx_cell(c) for c in columns)
+        self.sheets = 0
+        self.sheet = None
+        self.sheet_rows = 0
+        self._open_sheet()
+
+    def _open_sheet(self):
+        self.sheets += 1
+        self.sheet = self.zip.open(f'xl/worksheets/sheet{self.sheets}.xml', 'w', force_zip64=True)
+        self.sheet.write(self.SHEET_HEAD.encode('utf-8'))
+        self.sheet_rows = 0
+        self._write_row(self.header)
+
+    def _close_sheet(self):
+        self.sheet.write(self.SHEET_TAIL.encode('utf-8'))
+        self.sheet.close()
+
+    def _write_row(self, cells):
+        self.sheet_rows += 1
+        self.sheet.write(f'<row r="{self.sheet_rows}">{cells}</row>'.encode('utf-8'))
+
+    def write_rows(self, rows):
+        for row in rows:
+            if self.sheet_rows >= XLSX_MAX_ROWS:
+                self._close_sheet()
+                self._open_sheet()
+            self._write_row(''.join(_xlsx_cell(v) for v in row))
+
+    def close(self):
+        self._close_sheet()
+        sheets = range(1, self.sheets + 1)
+        main = 'http://schemas.openxmlformats.org'
+        self.zip.writestr('[Content_Types].xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<Types xmlns="{main}/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            + ''.join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+                      'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                      for i in sheets)
+            + '</Types>'))
+        self.zip.writestr('_rels/.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<Relationships xmlns="{main}/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{main}/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>'))
+        self.zip.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<workbook xmlns="{main}/spreadsheetml/2006/main" '
+            f'xmlns:r="{main}/officeDocument/2006/relationships"><sheets>'
+            + ''.join(f'<sheet name="Sheet{i}" sheetId="{i}" r:id="rId{i}"/>' for i in sheets)
+            + '</sheets></workbook>'))
+        self.zip.writestr('xl/_rels/workbook.xml.rels', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<Relationships xmlns="{main}/package/2006/relationships">'
+            + ''.join(f'<Relationship Id="rId{i}" Type="{main}/officeDocument/2006/relationships/worksheet" '
+                      f'Target="worksheets/sheet{i}.xml"/>' for i in sheets)
+            + '</Relationships>'))
+        self.zip.close()
+
+
+def sink_class(path):
+    """按扩展名选择 CSV / XLSX 写入"""
+    return XlsxSink if path.lower().endswith('.xlsx') else CsvSink
+
+
+# ---------- 任务 ----------
+
+def iter_log_rows(log_path, join=None):
+    """逐行读取结果日志，生成 (行, 进度)；join(result) 返回附加列（如帧号），按字节位置估算进度"""
+    total = os.path.getsize(log_path) or 1
+    done = 0
+    with open(log_path, 'rb') as f:
+        for raw in f:
+            done += len(raw)
+            result = parse_log_line(raw.decode('utf-8', errors='replace'))
+            if result is None:
+                continue
+            row = [result[c] for c in RAW_COLUMNS]
+            if join is not None:
+                row += split_position(result['position']) + list(join(result))
+            yield row, min(1.0, done / total)
+
+
+def export_rows(rows, columns, path):
+    """导出任务：rows 为 (行, 进度) 的可迭代对象（进度可为 None），写到 path（.csv/.xlsx）"""
+    def run(job):
+        part = path + '.part'
+        sink = sink_class(path)(part, columns)
+        count = 0
+        try:
+            chunk = []
+            for row, progress in rows:
+                chunk.append(row)
+                if len(chunk) >= CHUNK_ROWS:
+                    job.check()
+                    sink.write_rows(chunk)
+                    count += len(chunk)
+                    chunk = []
+                    job.report(count, progress)
+            sink.write_rows(chunk)
+            count += len(chunk)
+        except BaseException:
+            sink.close()
+            os.remove(part)
+            raise
+        sink.close()
+        os.replace(part, path)
+        job.report(count, 1.0)
+        return count
+    return run
+
+
+def import_csv_rows(path, on_chunk):
+    """导入任务：逐块读取 CSV（dict 行），每块交给 on_chunk(行列表)（在后台线程中调用）"""
+    def run(job):
+        total = os.path.getsize(path) or 1
+        count = 0
+        with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            chunk = []
+            for row in reader:
+                chunk.append(row)
+                if len(chunk) >= CHUNK_ROWS:
+                    job.check()
+                    on_chunk(chunk)
+                    count += len(chunk)
+                    chunk = []
+                    # 文本模式下不能 tell()，用底层缓冲文件的位置估算
+                    job.report(count, min(1.0, f.buffer.tell() / total))
+            if chunk:
+                on_chunk(chunk)
+                count += len(chunk)
+        job.report(count, 1.0)
+        return count
+    return run
+
+
+class TransferJob:
+    """后台运行一个导出/导入任务；回调都在后台线程中执行，界面需要自己切回主线程"""
+
+    def __init__(self, task, on_progress=None, on_done=None, name="Transfer"):
+        self.task = task
+        self.on_progress = on_progress  # on_progress(行数, 进度 0..1 或 None)
+        self.on_done = on_done  # on_done(行数, 错误信息或 None)；取消时错误信息为 "已取消"
+        self.cancelled = False
+        self.rows = 0
+        self.thread = threading.Thread(target=self._run, daemon=True, name=name)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        self.cancelled = True
+
+    def running(self):
+        return self.thread.is_alive()
+
+    def check(self):
+        if self.cancelled:
+            raise TransferCancelled()
+
+    def report(self, rows, progress):
+        self.rows = rows
+        if self.on_progress is not None:
+            self.on_progress(rows, progress)
+
+    def _run(self):
+        error = None
+        try:
+            self.rows = self.task(self)
+        except TransferCancelled:
+            error = "已取消"
+        except Exception as e:
+            error = str(e)
+        if self.on_done is not None:
+            self.on_done(self.rows, error)
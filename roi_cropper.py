@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发送端ROI裁剪
+把一帧切成多个裁剪区域（固定网格分块，或用OpenCV检测候选码区域），
+每个区域单独编码为JPEG，配合 send_file.py 把多个裁剪打包进一条消息。
+
+    tile      按 列x行 网格分块，相邻块带重叠，避免码被切断
+    qr        cv2.QRCodeDetector.detectMulti 定位二维码，外扩边距后裁剪
+    gradient  梯度+形态学找高对比度条纹区域（一维码/二维码都适用，比 qr 快，召回高精度低）
+"""
+
+import json
+import threading
+import cv2
+import numpy as np
+
+from file_feed import thread_jpeg
+
+_detector_local = threading.local()
+
+
+def parse_grid(text):
+    """解析 '3x2' 形式的网格（列x行）"""
+    cols, rows = text.lower().split('x')
+    return max(1, int(cols)), max(1, int(rows))
+
+
+def make_roi(x, y, w, h, label, confidence=1.0):
+    return {'x': int(x), 'y': int(y), 'width': int(w), 'height': int(h),
+            'label': label, 'confidence': round(float(confidence), 3)}
+
+
+def tile_rois(width, height, grid, overlap=0.1):
+    """网格分块，返回ROI列表（块之间按 overlap 比例重叠）"""
+    cols, rows = grid
+    tile_w = width / cols
+    tile_h = height / rows
+    pad_x = int(tile_w * overlap / 2)
+    pad_y = int(tile_h * overlap / 2)
+    rois = []
+    for r in range(rows):
+        for c in range(cols):
+            x0 = max(0, int(c * tile_w) - pad_x)
+            y0 = max(0, int(r * tile_h) - pad_y)
+            x1 = min(width, int((c + 1) * tile_w) + pad_x)
+            y1 = min(height, int((r + 1) * tile_h) + pad_y)
+            rois.append(make_roi(x0, y0, x1 - x0, y1 - y0, 'tile'))
+    return rois
+
+
+def _expand_box(x, y, w, h, pad, width, height):
+    """按比例外扩并裁到图像范围内"""
+    dx = int(w * pad)
+    dy = int(h * pad)
+    x0 = max(0, x - dx)
+    y0 = max(0, y - dy)
+    x1 = min(width, x + w + dx)
+    y1 = min(height, y + h + dy)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def detect_qr_rois(image, pad=0.25, max_regions=16):
+    """用 QRCodeDetector 定位二维码（每个线程独立的检测器实例）"""
+    detector = getattr(_detector_local, 'qr', None)
+    if detector is None:
+        detector = cv2.QRCodeDetector()
+        _detector_local.qr = detector
+    height, width = image.shape[:2]
+    ok, points = detector.detectMulti(image)
+    if not ok or points is None:
+        return []
+    rois = []
+    for quad in points[:max_regions]:
+        x, y, w, h = cv2.boundingRect(quad.astype(np.float32))
+        rois.append(make_roi(*_expand_box(x, y, w, h, pad, width, height), 'qr'))
+    return rois
+
+
+def detect_gradient_rois(image, pad=0.15, max_regions=16, min_area_ratio=0.002):
+    """梯度+形态学候选区域：码区域水平/垂直梯度都很强且成片"""
+    height, width = image.shape[:2]
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    # 降采样到长边约640处理，结果再映射回原图
+    scale = min(1.0, 640.0 / max(width, height))
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+
+    grad_x = cv2.Sobel(small, cv2.CV_16S, 1, 0, ksize=3)
+    grad_y = cv2.Sobel(small, cv2.CV_16S, 0, 1, ksize=3)
+    gradient = cv2.add(cv2.convertScaleAbs(grad_x), cv2.convertScaleAbs(grad_y))
+    gradient = cv2.blur(gradient, (7, 7))
+    _, mask = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 15))
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    mask = cv2.erode(mask, None, iterations=2)
+    mask = cv2.dilate(mask, None, iterations=2)
+
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    min_area = min_area_ratio * small.shape[0] * small.shape[1]
+    candidates = []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area < min_area:
+            continue
+        x, y, w, h = cv2.boundingRect(contour)
+        # 轮廓填充率作为置信度
+        candidates.append((area / float(w * h), x, y, w, h))
+    candidates.sort(reverse=True)
+
+    rois = []
+    for fill, x, y, w, h in candidates[:max_regions]:
+        x, y, w, h = (int(v / scale) for v in (x, y, w, h))
+        rois.append(make_roi(*_expand_box(x, y, w, h, pad, width, height), 'candidate', fill))
+    return rois
+
+
+class FrameCropper:
+    """一帧 -> 多个 (jpeg_bytes, roi)，在编码线程池中调用"""
+
+    def __init__(self, mode='tile', grid=(2, 2), overlap=0.1, max_regions=16, quality=85):
+        if mode not in ('tile', 'qr', 'gradient'):
+            raise ValueError(f"未知的裁剪方式: {mode}")
+        self.mode = mode
+        self.grid = grid
+        self.overlap = overlap
+        self.max_regions = max_regions
+        self.quality = quality
+
+    def rois(self, image):
+        height, width = image.shape[:2]
+        if self.mode == 'tile':
+            return tile_rois(width, height, self.grid, self.overlap)
+        if self.mode == 'qr':
+            return detect_qr_rois(image, max_regions=self.max_regions)
+        return detect_gradient_rois(image, max_regions=self.max_regions)
+
+    def crop(self, image):
+        """裁剪并编码，返回 [(jpeg_bytes, roi)]；检测模式下没有候选区域时返回空列表"""
+        encoder = thread_jpeg()
+        crops = []
+        for roi in self.rois(image):
+            x, y, w, h = roi['x'], roi['y'], roi['width'], roi['height']
+            if w <= 0 or h <= 0:
+                continue
+            region = np.ascontiguousarray(image[y:y + h, x:x + w])
+            crops.append((encoder.encode(region, quality=self.quality), roi))
+        return crops
+
+    def crop_path(self, path):
+        image = cv2.imread(path)
+        if image is None:
+            raise ValueError(f"无法读取图片: {path}")
+        return self.crop(image)
+
+    def describe(self):
+        if self.mode == 'tile':
+            return f"网格分块 {self.grid[0]}x{self.grid[1]}（重叠 {self.overlap:.0%}）"
+        return f"{'二维码检测' if self.mode == 'qr' else '梯度候选区域'}（最多 {self.max_regions} 个）"
+
+
+def pack_crops(crops, camera_id=0, position=(0, 0, 0), yaw_deg=0.0, extra_meta=None):
+    """把多个 (jpeg_bytes, roi) 打包成帧头之后的 元数据+JPEG 序列（deserialize_crops 格式）
+    extra_meta 可为每个裁剪附加的元数据列表（与 crops 等长）"""
+    parts = []
+    for i, (jpeg_bytes, roi) in enumerate(crops):
+        meta = {
+            'roi': roi,
+            'camera': {'id': camera_id},
+            'pose': {'position': list(position)},
+            'yaw_deg': yaw_deg,
+        }
+        if extra_meta is not None and extra_meta[i]:
+            meta.update(extra_meta[i])
+        meta_bytes = json.dumps(meta).encode('utf-8')
+        parts.append(len(meta_bytes).to_bytes(4, 'big'))
+        parts.append(meta_bytes)
+        parts.append(len(jpeg_bytes).to_bytes(4, 'big'))
+        parts.append(jpeg_bytes)
+    return b''.join(parts)
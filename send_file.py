@@ -3,124 +3,392 @@
 """使用本地图片/视频文件发送数据到接收器"""
 import cv2
 import pynng
-import json
 import time
 import sys
 import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from turbojpeg import TurboJPEG
+from file_feed import expand_inputs, is_video, image_tasks, video_tasks
+from shm_transport import ShmRingWriter, ipc_address, DEFAULT_SHM_NAME, DEFAULT_SHM_SIZE
+from stream_recorder import StreamReader
+from load_generator import LoadGenerator, AckMonitor, RampController, parse_size
+from pacing import Pacer, sleep_until, format_pacing_stats
+from roi_cropper import FrameCropper, make_roi, pack_crops, parse_grid
+
+
+def get_arg(name, default, cast=str):
+    """读取 --name value 形式的命令行参数"""
+    if name in sys.argv:
+        idx = sys.argv.index(name)
+        if idx + 1 < len(sys.argv):
+            return cast(sys.argv[idx + 1])
+    return default
+
 
 if len(sys.argv) < 2:
-    print("用法: python3 send_file.py <图片或视频文件路径> [--fps 10] [--host 192.168.0.104]")
+    print("用法: python3 send_file.py <图片或视频文件路径> [--fps 10] [--host 192.168.0.104] [--port 6666] [--transport tcp|shm]")
+    print("      python3 send_file.py <目录|'*.jpg'|多个文件...> [--workers 4] [--pipeline-depth 32] [--once] [--reencode]")
+    print("      多裁剪打包: [--crop tile|qr|gradient] [--grid 2x2] [--overlap 0.1] [--max-regions 16] [--batch 1]")
+    print("      (--fps 0 表示不限速；--batch N 把连续N帧的裁剪打包成一条消息)")
+    print("      速率控制参数: [--pattern constant|poisson|burst] [--burst-size 10] [--late-policy catchup|skip]")
+    print("      视频流水线参数: [--encoders 2] [--pipeline-depth 8]")
+    print("      python3 send_file.py <录制目录> --replay [--speed 1.0] [--loop] [--restamp]   (--speed 0 表示全速)")
+    print("      python3 send_file.py --loadgen [--cameras 2] [--crops 4] [--crop-size 320x320] [--quality 80]")
+    print("                           [--trajectory line|circle] [--ramp --ramp-step 5 --ramp-interval 10 --ramp-max 500]")
     sys.exit(1)
 
-file_path = sys.argv[1]
-if not os.path.exists(file_path):
-    print(f"❌ 文件不存在: {file_path}")
-    sys.exit(1)
+loadgen = '--loadgen' in sys.argv
+replay = '--replay' in sys.argv
+
+# 位置参数：第一个 -- 选项之前的所有参数（目录、通配符、一个或多个文件）
+input_args = []
+for arg in sys.argv[1:]:
+    if arg.startswith('--'):
+        break
+    input_args.append(arg)
+file_path = input_args[0] if input_args else ""
+input_files = []
+if replay:
+    if not os.path.isdir(file_path):
+        print(f"❌ 录制目录不存在: {file_path}")
+        sys.exit(1)
+elif not loadgen:
+    input_files = expand_inputs(input_args)
+    if not input_files:
+        print(f"❌ 没有可发送的图片或视频: {' '.join(input_args)}")
+        sys.exit(1)
+    if len(input_files) == 1:
+        print(f"发送文件: {input_files[0]}")
+    else:
+        print(f"发送文件: {len(input_files)} 个")
+
+# 解析FPS参数（允许小数，如 --fps 0.5）
+fps = get_arg('--fps', 10.0, float)
 
-# 解析FPS参数
-fps = 10
-if '--fps' in sys.argv:
-    idx = sys.argv.index('--fps')
-    if idx + 1 < len(sys.argv):
-        fps = int(sys.argv[idx + 1])
+# 速率控制：到达模式与落后策略
+pattern = get_arg('--pattern', "constant")
+burst_size = get_arg('--burst-size', 10, int)
+late_policy = get_arg('--late-policy', "catchup")
 
 # 解析HOST参数
-host = "localhost"
-if '--host' in sys.argv:
-    idx = sys.argv.index('--host')
-    if idx + 1 < len(sys.argv):
-        host = sys.argv[idx + 1]
+host = get_arg('--host', "localhost")
 
 # 解析PORT参数
-port = 6666  # 默认端口
-if '--port' in sys.argv:
-    idx = sys.argv.index('--port')
-    if idx + 1 < len(sys.argv):
-        port = int(sys.argv[idx + 1])
+port = get_arg('--port', 6666, int)  # 默认端口
+
+# 解析传输方式：tcp（默认）或 shm（同机：ipc控制通道 + 共享内存JPEG）
+transport = get_arg('--transport', "tcp")
+
+shm_name = get_arg('--shm-name', DEFAULT_SHM_NAME)
+
+shm_size = get_arg('--shm-size', DEFAULT_SHM_SIZE // (1024 * 1024), int) * 1024 * 1024  # 单位MB
 
 jpeg = TurboJPEG()
 pub = pynng.Pub0()
-pub.dial(f"tcp://{host}:{port}", block=True)
-print(f"✅ 已连接到接收器 {host}:{port}，发送文件: {file_path}")
+shm_writer = None
+if transport == "shm":
+    shm_writer = ShmRingWriter(shm_name, shm_size)
+    pub.dial(ipc_address(port), block=True)
+    print(f"✅ 已连接到接收器 {ipc_address(port)}（共享内存 {shm_name}）")
+else:
+    pub.dial(f"tcp://{host}:{port}", block=True)
+    print(f"✅ 已连接到接收器 {host}:{port}")
 
 frame_seq = 0
 
-# 判断是视频还是图片
-is_video = file_path.lower().endswith(('.mp4', '.avi', '.mov', '.mkv', '.flv'))
 
-if is_video:
-    cap = cv2.VideoCapture(file_path)
-    if not cap.isOpened():
-        print(f"❌ 无法打开视频文件")
-        sys.exit(1)
-    print(f"📹 视频模式，播放帧率: {fps} fps")
-    interval = 1.0 / fps
-    last_time = time.time()
+def full_frame_crop(jpeg_bytes, w, h):
+    """整帧作为一个裁剪区域"""
+    return jpeg_bytes, make_roi(0, 0, w, h, 'frame')
+
+
+def build_body(crops):
+    """打包帧头之后的 元数据+JPEG 部分，crops 为 [(jpeg_bytes, roi)]，静态图片可缓存复用"""
+    extra_meta = None
+    if shm_writer is not None:
+        # JPEG写入共享内存，消息中只带引用
+        extra_meta = [{'shm': shm_writer.write(jpeg_bytes)} for jpeg_bytes, _ in crops]
+        crops = [(b'', roi) for _, roi in crops]
+    return pack_crops(crops, extra_meta=extra_meta)
+
+
+def frame_header():
+    """6字节帧头：2字节序列号 + 4字节发送时间戳，每次发送时生成"""
+    global frame_seq
+    frame_seq += 1
+    timestamp_ms = int(time.time() * 1000) & 0xFFFFFFFF  # 确保4字节范围
+    return (frame_seq & 0xFFFF).to_bytes(2,'big') + timestamp_ms.to_bytes(4,'big')
+
+
+def build_message(crops):
+    """按接收器 deserialize_crops 的格式打包一条消息（任意个裁剪区域）"""
+    return frame_header() + build_body(crops)
+
+
+def make_pacer(rate):
+    """按命令行参数创建速率控制器"""
+    pacer = Pacer(rate, pattern=pattern, policy=late_policy, burst_size=burst_size)
+    print(f"⏱️ 速率控制: {pacer.describe()}")
+    return pacer
+
+
+class SendRateReporter:
+    """周期性打印实际发送速率：消息/s 与 裁剪/s（带 pacer 时附加速率精度和抖动统计）"""
+
+    def __init__(self, interval=5.0, pacer=None):
+        self.interval = interval
+        self.pacer = pacer
+        self.count = 0
+        self.crops = 0
+        self.bytes = 0
+        self.window_start = time.perf_counter()
+
+    def add(self, nbytes, extra="", crops=1):
+        self.count += 1
+        self.crops += crops
+        self.bytes += nbytes
+        now = time.perf_counter()
+        elapsed = now - self.window_start
+        if elapsed >= self.interval:
+            print(f"📤 发送 {self.count / elapsed:.1f} 条/s，{self.crops / elapsed:.1f} 裁剪/s，"
+                  f"{self.bytes / 1024 / 1024 / elapsed:.1f} MB/s{extra}")
+            if self.pacer is not None:
+                print(f"⏱️ {format_pacing_stats(self.pacer.window_stats())}")
+            self.count = 0
+            self.crops = 0
+            self.bytes = 0
+            self.window_start = now
+
+
+def run_send_pipeline(tasks, workers=2, depth=8, batch=1):
+    """发送流水线：读取/编码（线程池）-> 发送，各阶段之间用有界队列背压
+    tasks 产出 (函数, 参数...)，任务按顺序提交，发送阶段按顺序取结果，帧序不会乱；
+    任务结果为 (jpeg_bytes, w, h) 或裁剪列表 [(jpeg_bytes, roi)]，每 batch 帧的裁剪打包成一条消息；
+    tasks 结束（--once）后发送完剩余帧即返回"""
+    pending = queue.Queue(maxsize=depth)  # 元素为编码 Future，保持顺序；None 表示输入结束
+    stop = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="JPEG-Encode")
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pending.put(item, timeout=0.2)
+                return
+            except queue.Full:
+                continue
+
+    def capture_stage():
+        try:
+            for fn, *args in tasks:
+                if stop.is_set():
+                    return
+                put(pool.submit(fn, *args))
+        except Exception as e:
+            print(f"❌ 读取输入失败: {e}")
+        put(None)
+
+    threading.Thread(target=capture_stage, daemon=True, name="Input-Capture").start()
+
+    pacer = make_pacer(fps)
+    reporter = SendRateReporter(pacer=pacer)
+    sent = 0
+    sent_crops = 0
+    failed = 0
+    empty = 0  # 检测模式下没有候选区域的帧
+    batch_crops = []
+    batch_frames = 0
+    start = time.perf_counter()
+
+    def send_batch():
+        nonlocal sent, sent_crops, batch_crops, batch_frames
+        # 绝对时间轴调度，读取/编码耗时不会拉低实际发送速率
+        scheduled = pacer.wait()
+        data = build_message(batch_crops)
+        pub.send(data)
+        pacer.mark_sent(scheduled)
+        sent += 1
+        sent_crops += len(batch_crops)
+        reporter.add(len(data), f"，流水线积压 {pending.qsize()}/{depth}", crops=len(batch_crops))
+        batch_crops = []
+        batch_frames = 0
+
+    try:
+        while True:
+            future = pending.get()
+            if future is None:
+                break
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"⚠️ 跳过: {e}")
+                continue
+            crops = result if isinstance(result, list) else [full_frame_crop(*result)]
+            if not crops:
+                empty += 1
+                continue
+            batch_crops.extend(crops)
+            batch_frames += 1
+            if batch_frames >= batch:
+                send_batch()
+        if batch_crops:
+            send_batch()
+    finally:
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+    elapsed = time.perf_counter() - start
+    rate = sent / elapsed if elapsed > 0 else 0
+    crop_rate = sent_crops / elapsed if elapsed > 0 else 0
+    print(f"✅ 发送完成: {sent} 条消息 / {sent_crops} 个裁剪，失败 {failed}，无候选区域 {empty}，"
+          f"用时 {elapsed:.2f} s，{rate:.1f} 条/s，{crop_rate:.1f} 裁剪/s")
+
+
+workers = get_arg('--workers', get_arg('--encoders', 2, int), int)
+loop_inputs = '--once' not in sys.argv
+passthrough = '--reencode' not in sys.argv  # JPEG文件默认透传，不重新编码
+
+# 多裁剪打包：--crop 指定分块/检测方式，--batch 指定每条消息打包的帧数
+cropper = None
+crop_mode = get_arg('--crop', None)
+if crop_mode:
+    cropper = FrameCropper(
+        crop_mode,
+        grid=get_arg('--grid', (2, 2), parse_grid),
+        overlap=get_arg('--overlap', 0.1, float),
+        max_regions=get_arg('--max-regions', 16, int),
+        quality=get_arg('--quality', 85, int)
+    )
+    print(f"✂️ 裁剪方式: {cropper.describe()}")
+batch = max(1, get_arg('--batch', 1, int))
+
+if loadgen:
+    # 合成负载模式：N相机 × M裁剪/帧，可逐级提速寻找接收器饱和点
+    generator = LoadGenerator(
+        jpeg,
+        cameras=get_arg('--cameras', 2, int),
+        crops=get_arg('--crops', 4, int),
+        crop_size=get_arg('--crop-size', (320, 320), parse_size),
+        quality=get_arg('--quality', 80, int),
+        trajectory=get_arg('--trajectory', 'line'),
+        seed=get_arg('--seed', 0, int)
+    )
+    if shm_writer is not None:
+        print("⚠️ 负载生成模式不使用共享内存，JPEG随消息发送")
+    
+    # ACK端口约定为数据端口+1（5555/5556，6666/6667）
+    ack_monitor = AckMonitor(get_arg('--ack-port', port + 1, int))
+    ramp = None
+    if '--ramp' in sys.argv:
+        ramp = RampController(
+            start_fps=fps,
+            step_fps=get_arg('--ramp-step', 5.0, float),
+            step_seconds=get_arg('--ramp-interval', 10.0, float),
+            max_fps=get_arg('--ramp-max', 500.0, float),
+            drop_threshold=get_arg('--ramp-drop', 0.02, float)
+        )
+        print(f"📈 爬坡模式: 从 {fps:g} fps 起，每 {ramp.step_seconds:g} s 提高 {ramp.step_fps:g} fps")
+    
+    pacer = make_pacer(fps)
+    reporter = SendRateReporter(pacer=pacer)
+    time.sleep(0.5)  # 等待连接建立
+    ack_monitor.snapshot_and_reset()
+    try:
+        while True:
+            scheduled = pacer.wait()
+            data = frame_header() + generator.build_body()
+            pub.send(data)
+            pacer.mark_sent(scheduled)
+            reporter.add(len(data), crops=generator.crops_per_message)
+            
+            if ramp is not None:
+                ramp.on_sent()
+                if ramp.step_due():
+                    time.sleep(0.5)  # 等待在途ACK
+                    new_fps = ramp.finish_step(*ack_monitor.snapshot_and_reset())
+                    if new_fps is None:
+                        break
+                    pacer.set_rate(new_fps)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if ramp is not None:
+            ramp.report(generator.crops_per_message)
+        ack_monitor.close()
+elif replay:
+    # 回放模式：按录制时的接收时间间隔原样发送消息字节
+    speed = get_arg('--speed', 1.0, float)
+    loop = '--loop' in sys.argv
+    restamp = '--restamp' in sys.argv  # 用当前时间改写帧头时间戳（ACK延迟统计需要）
+    
+    reader = StreamReader(file_path)
+    speed_text = "全速" if speed <= 0 else f"{speed:g}x"
+    print(f"⏯️ 回放模式: {reader.message_count()} 条消息，速度 {speed_text}{'，循环' if loop else ''}")
     
     while True:
-        ret, frame = cap.read()
-        if not ret:
-            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-            continue
-        
-        # 控制帧率
-        now = time.time()
-        if now - last_time < interval:
-            time.sleep(interval - (now - last_time))
-        last_time = time.time()
-        
-        # 序列化
-        jpeg_bytes = jpeg.encode(frame)
-        h, w = frame.shape[:2]
-        meta = {
-            'roi': {'x':0, 'y':0, 'width':w, 'height':h, 'label':'frame', 'confidence':1.0},
-            'camera': {'id':0},
-            'pose': {'position':[0,0,0]},
-            'yaw_deg':0.0
-        }
-        meta_bytes = json.dumps(meta).encode('utf-8')
-        
-        frame_seq += 1
-        timestamp_ms = int(time.time() * 1000) & 0xFFFFFFFF  # 确保4字节范围
-        data = (frame_seq.to_bytes(2,'big') + 
-                timestamp_ms.to_bytes(4,'big') +
-                len(meta_bytes).to_bytes(4,'big') + meta_bytes +
-                len(jpeg_bytes).to_bytes(4,'big') + jpeg_bytes)
-        pub.send(data)
+        sent = 0
+        start = time.perf_counter()
+        first_recv_time = None
+        for recv_time, data in reader:
+            if first_recv_time is None:
+                first_recv_time = recv_time
+            if speed > 0:
+                # 绝对时间轴调度，发送耗时不会累积成漂移
+                sleep_until(start + (recv_time - first_recv_time) / speed)
+            if restamp and len(data) >= 6:
+                timestamp_ms = int(time.time() * 1000) & 0xFFFFFFFF
+                data = data[:2] + timestamp_ms.to_bytes(4, 'big') + data[6:]
+            pub.send(data)
+            sent += 1
+        elapsed = time.perf_counter() - start
+        print(f"⏯️ 回放完成: {sent} 条消息，用时 {elapsed:.2f} s，{sent / elapsed if elapsed > 0 else 0:.1f} 条/s")
+        if not loop:
+            break
+elif all(is_video(p) for p in input_files):
+    depth = get_arg('--pipeline-depth', 8, int)
+    print(f"📹 视频模式（{len(input_files)} 个视频首尾相接），播放帧率: {fps:g} fps，"
+          f"编码线程: {workers}，流水线深度: {depth}")
+    run_send_pipeline(video_tasks(input_files, loop=loop_inputs, cropper=cropper), workers, depth, batch)
+elif any(is_video(p) for p in input_files):
+    print(f"❌ 不支持图片和视频混合输入")
+    sys.exit(1)
+elif len(input_files) > 1:
+    # 图片集模式：线程池预读/编码，JPEG文件透传
+    workers = get_arg('--workers', 4, int)
+    depth = get_arg('--pipeline-depth', 32, int)
+    print(f"🗂️ 图片集模式: {len(input_files)} 张，帧率: {fps:g} fps，读取线程: {workers}，"
+          f"预取深度: {depth}，JPEG{'透传' if passthrough and cropper is None else '重新编码'}{'' if loop_inputs else '，单遍'}")
+    run_send_pipeline(image_tasks(input_files, passthrough, loop=loop_inputs, cropper=cropper),
+                      workers, depth, batch)
 else:
+    file_path = input_files[0]
     # 图片模式
     image = cv2.imread(file_path)
     if image is None:
         print(f"❌ 无法读取图片")
         sys.exit(1)
-    print(f"📷 图片模式，持续发送，帧率: {fps} fps，按Ctrl+C退出")
-    interval = 1.0 / fps
-    last_time = time.time()
+    print(f"📷 图片模式，持续发送，帧率: {fps:g} fps，按Ctrl+C退出")
     
-    while True:
-        # 控制帧率
-        now = time.time()
-        if now - last_time < interval:
-            time.sleep(interval - (now - last_time))
-        last_time = time.time()
-        
-        # 序列化
-        jpeg_bytes = jpeg.encode(image)
+    # 图片不变：裁剪、JPEG编码和元数据只做一次，每次只生成6字节帧头
+    if cropper is not None:
+        crops = cropper.crop(image)
+        if not crops:
+            print(f"❌ 未检测到候选区域")
+            sys.exit(1)
+    else:
         h, w = image.shape[:2]
-        meta = {
-            'roi': {'x':0, 'y':0, 'width':w, 'height':h, 'label':'frame', 'confidence':1.0},
-            'camera': {'id':0},
-            'pose': {'position':[0,0,0]},
-            'yaw_deg':0.0
-        }
-        meta_bytes = json.dumps(meta).encode('utf-8')
-        
-        frame_seq += 1
-        timestamp_ms = int(time.time() * 1000) & 0xFFFFFFFF  # 确保4字节范围
-        data = (frame_seq.to_bytes(2,'big') + 
-                timestamp_ms.to_bytes(4,'big') +
-                len(meta_bytes).to_bytes(4,'big') + meta_bytes +
-                len(jpeg_bytes).to_bytes(4,'big') + jpeg_bytes)
-        pub.send(data)
+        crops = [full_frame_crop(jpeg.encode(image), w, h)]
+    crops = crops * batch
+    cached_body = build_body(crops)
+    print(f"📦 已缓存编码结果: {len(crops)} 个裁剪/条，{len(cached_body) / 1024:.1f} KB")
+    
+    pacer = make_pacer(fps)
+    reporter = SendRateReporter(pacer=pacer)
+    
+    while True:
+        scheduled = pacer.wait()
+        pub.send(frame_header() + cached_body)
+        pacer.mark_sent(scheduled)
+        reporter.add(len(cached_body) + 6, crops=len(crops))
 
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+同机共享内存传输
+相机节点和接收器在同一台主机时，控制消息走 ipc://，JPEG 数据写入共享内存环形缓冲区，
+消息中只携带偏移量，避免整帧数据经过内核TCP栈拷贝。
+
+消息格式保持不变（6字节帧头 + 若干 元数据+JPEG 对），共享内存中的裁剪区域
+JPEG长度字段为0，元数据中带 'shm': {'name', 'offset', 'pos', 'length', 'nonce'}。
+发送端重启会以同一名称重建共享内存：头部和每个引用都带写端随机生成的 nonce，
+接收器发现引用的 nonce 与已附加的不同就重新附加，不会从残留的旧映射里读出旧图像。
+
+基准测试（对比TCP回环）：
+    python3 shm_transport.py --bench --size 1048576 --count 2000
+自检（发送端重启后同名重建）：
+    python3 shm_transport.py --selftest
+"""
+
+import json
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+
+# 环形缓冲区头部：魔数(4) + 版本(4) + 容量(8) + 已预留的逻辑写入位置(8) + 写端 nonce(8)
+HEADER_FORMAT = '<4sIQQQ'
+HEADER_SIZE = 64
+MAGIC = b'QRSR'
+VERSION = 2
+RESERVED_OFFSET = 16  # 逻辑写入位置在头部中的偏移
+ALIGN = 64
+
+DEFAULT_SHM_NAME = 'qr_frames'
+DEFAULT_SHM_SIZE = 64 * 1024 * 1024  # 64MB，约可容纳几百张1080p JPEG
+
+_owned = set()  # 本进程创建的共享内存名称（读写端在同一进程时，读端不能取消写端的 tracker 登记）
+
+
+def ipc_address(port):
+    """同机控制通道地址（按端口区分不同接收器）"""
+    return f"ipc:///tmp/qr_receiver_{port}.ipc"
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+class ShmRingWriter:
+    """共享内存环形缓冲区写端（相机/发送端），单写者"""
+
+    def __init__(self, name=DEFAULT_SHM_NAME, size=DEFAULT_SHM_SIZE):
+        self.name = name
+        try:
+            # 上次异常退出残留的同名共享内存，先清理再重建
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=HEADER_SIZE + size)
+        _owned.add(name)
+        self.capacity = size
+        self.reserved = 0  # 逻辑写入位置（单调递增，不回绕）
+        self.nonce = int.from_bytes(os.urandom(8), 'little')  # 区分同名重建的不同写端
+        struct.pack_into(HEADER_FORMAT, self.shm.buf, 0, MAGIC, VERSION, self.capacity, 0, self.nonce)
+
+    def write(self, payload):
+        """写入一段数据，返回消息中携带的引用 dict"""
+        length = len(payload)
+        if length > self.capacity:
+            raise ValueError(f"数据过大: {length} > 共享内存容量 {self.capacity}")
+
+        pos = self.reserved
+        offset = pos % self.capacity
+        if offset + length > self.capacity:
+            # 尾部放不下，跳到下一圈开头
+            pos += self.capacity - offset
+            offset = 0
+
+        # 先预留（读端据此判断数据是否已被覆盖），再写数据
+        self.reserved = pos + _align(length)
+        struct.pack_into('<Q', self.shm.buf, RESERVED_OFFSET, self.reserved)
+        self.shm.buf[HEADER_SIZE + offset:HEADER_SIZE + offset + length] = payload
+        return {'name': self.name, 'offset': offset, 'pos': pos, 'length': length, 'nonce': self.nonce}
+
+    def close(self):
+        _owned.discard(self.name)
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except Exception:
+            pass
+
+
+class ShmRingReader:
+    """共享内存环形缓冲区读端（接收器），按消息中的引用取出数据"""
+
+    def __init__(self, name):
+        self.shm = shared_memory.SharedMemory(name=name)
+        try:
+            # 读端只是附加，不能让 resource_tracker 在退出时删除写端的共享内存
+            # （spawn 出的子进程与父进程共用同一个 tracker，此时不需要处理）
+            import multiprocessing
+            from multiprocessing import resource_tracker
+            if multiprocessing.parent_process() is None and name not in _owned:
+                resource_tracker.unregister(self.shm._name, 'shared_memory')
+        except Exception:
+            pass
+        magic, version, capacity, _, nonce = struct.unpack_from(HEADER_FORMAT, self.shm.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.shm.close()
+            raise ValueError(f"共享内存 {name} 格式不匹配")
+        self.capacity = capacity
+        self.nonce = nonce
+
+    def read(self, ref):
+        """拷贝出引用的数据；不属于本写端、尚未写入或读取期间已被覆盖则返回 None"""
+        if ref.get('nonce') != self.nonce:
+            return None
+        offset = ref['offset']
+        length = ref['length']
+        data = bytes(self.shm.buf[HEADER_SIZE + offset:HEADER_SIZE + offset + length])
+        reserved = struct.unpack_from('<Q', self.shm.buf, RESERVED_OFFSET)[0]
+        # 引用超出写端已预留的位置（不是这块内存写出的），或预留位置已超过一圈（可能已被覆盖）
+        if ref['pos'] + ref['length'] > reserved or reserved - ref['pos'] > self.capacity:
+            return None
+        return data
+
+    def close(self):
+        try:
+            self.shm.close()
+        except Exception:
+            pass
+
+
+class ShmCropResolver:
+    """接收器侧：把元数据中带 'shm' 引用的裁剪区域还原为 JPEG 字节"""
+
+    def __init__(self):
+        self.readers = {}
+        self.retired = set()  # 已被同名重建取代的写端 nonce：其引用直接丢弃，不再重新附加
+        self.stale_count = 0  # 读取前已被覆盖而丢弃的裁剪数
+
+    def resolve(self, crops):
+        """原地替换 image_data，丢弃已失效的裁剪，返回有效的裁剪列表"""
+        resolved = []
+        for crop in crops:
+            metadata = crop.get('metadata') or {}
+            ref = metadata.get('shm') if isinstance(metadata, dict) else None
+            if not ref:
+                resolved.append(crop)
+                continue
+            if ref.get('nonce') in self.retired:
+                self.stale_count += 1
+                continue
+            reader = self.readers.get(ref['name'])
+            if reader is not None and reader.nonce != ref.get('nonce'):
+                # 发送端重启后同名重建：旧映射已是孤儿，重新附加
+                self.retired.add(reader.nonce)
+                reader.close()
+                del self.readers[ref['name']]
+                reader = None
+            if reader is None:
+                try:
+                    reader = ShmRingReader(ref['name'])
+                    self.readers[ref['name']] = reader
+                    print(f"✅ 已附加共享内存: {ref['name']}（{reader.capacity / 1024 / 1024:.0f} MB）")
+                except Exception as e:
+                    print(f"❌ 附加共享内存失败: {e}")
+                    self.stale_count += 1
+                    continue
+            data = reader.read(ref)
+            if data is None:
+                self.stale_count += 1
+                continue
+            crop['image_data'] = data
+            resolved.append(crop)
+        return resolved
+
+    def close(self):
+        for reader in self.readers.values():
+            reader.close()
+        self.readers.clear()
+
+
+def _bench_receiver(addr, count, result_queue):
+    """基准测试接收进程：收满 count 条消息后回报耗时"""
+    import pynng
+    resolver = ShmCropResolver()
+    sub = pynng.Sub0()
+    sub.subscribe(b"")
+    sub.recv_timeout = 5000
+    sub.listen(addr)
+    result_queue.put('ready')
+    received = 0
+    total_bytes = 0
+    t0 = None
+    t_last = None
+    try:
+        while received < count:
+            data = sub.recv()
+            t_last = time.perf_counter()
+            if t0 is None:
+                t0 = t_last
+            meta_len = int.from_bytes(data[6:10], 'big')
+            metadata = json.loads(data[10:10 + meta_len])
+            ptr = 10 + meta_len
+            img_len = int.from_bytes(data[ptr:ptr + 4], 'big')
+            crops = resolver.resolve([{'metadata': metadata, 'image_data': data[ptr + 4:ptr + 4 + img_len]}])
+            for crop in crops:
+                total_bytes += len(crop['image_data'])
+            received += 1
+    except pynng.Timeout:
+        pass
+    # Pub/Sub 在接收端跟不上时会丢消息，只按实际收到的时间段计算
+    elapsed = t_last - t0 if t0 else 0.0
+    result_queue.put((received, total_bytes, elapsed, resolver.stale_count))
+    sub.close()
+    resolver.close()
+
+
+def run_benchmark(size, count):
+    """对比 TCP 回环整帧传输 与 ipc+共享内存 的吞吐"""
+    import multiprocessing
+    import pynng
+
+    ctx = multiprocessing.get_context('spawn')
+    payload = os.urandom(size)
+    results = {}
+    for mode, addr in (('tcp', 'tcp://127.0.0.1:56660'), ('shm', ipc_address(56660))):
+        result_queue = ctx.Queue()
+        proc = ctx.Process(target=_bench_receiver, args=(addr, count, result_queue))
+        proc.start()
+        result_queue.get()
+
+        writer = ShmRingWriter(f"{DEFAULT_SHM_NAME}_bench", max(DEFAULT_SHM_SIZE, size * 64)) if mode == 'shm' else None
+        pub = pynng.Pub0()
+        pub.dial(addr, block=True)
+        time.sleep(0.5)  # 等待订阅建立
+
+        for seq in range(1, count + 1):
+            meta = {'roi': {'x': 0, 'y': 0, 'width': 0, 'height': 0, 'label': 'bench', 'confidence': 1.0}}
+            if writer:
+                meta['shm'] = writer.write(payload)
+                body = b''
+            else:
+                body = payload
+            meta_bytes = json.dumps(meta).encode('utf-8')
+            timestamp_ms = int(time.time() * 1000) & 0xFFFFFFFF
+            pub.send((seq & 0xFFFF).to_bytes(2, 'big') + timestamp_ms.to_bytes(4, 'big') +
+                     len(meta_bytes).to_bytes(4, 'big') + meta_bytes +
+                     len(body).to_bytes(4, 'big') + body)
+
+        received, total_bytes, recv_elapsed, stale = result_queue.get()
+        proc.join()
+        pub.close()
+        if writer:
+            writer.close()
+        results[mode] = (received, total_bytes, recv_elapsed, stale)
+
+    print(f"📊 传输基准: 负载 {size / 1024:.0f} KB × {count} 条")
+    for mode, (received, total_bytes, elapsed, stale) in results.items():
+        rate = received / elapsed if elapsed > 0 else 0
+        mbps = total_bytes / 1024 / 1024 / elapsed if elapsed > 0 else 0
+        print(f"  {mode:>3}: 收到 {received}/{count}，{rate:.0f} 条/s，{mbps:.0f} MB/s，覆盖丢弃 {stale}")
+    return results
+
+
+def run_selftest():
+    """自检：发送端重启（同名重建共享内存）后，接收器必须读到新数据而不是旧映射中的残留"""
+    name = f"{DEFAULT_SHM_NAME}_selftest_{os.getpid()}"
+    resolver = ShmCropResolver()
+    writer = ShmRingWriter(name, 4096)
+    refs = [writer.write(b'OLD%d' % i * 64) for i in range(3)]
+    crops = resolver.resolve([{'metadata': {'shm': ref}, 'image_data': b''} for ref in refs])
+    assert [c['image_data'] for c in crops] == [b'OLD%d' % i * 64 for i in range(3)], "首个写端数据不一致"
+
+    writer.close()
+    writer = ShmRingWriter(name, 4096)
+    new_ref = writer.write(b'NEW-FRAME' * 8)
+    crops = resolver.resolve([{'metadata': {'shm': new_ref}, 'image_data': b''}])
+    assert [c['image_data'] for c in crops] == [b'NEW-FRAME' * 8], "重启后读到了旧共享内存中的数据"
+
+    # 重启前发出、重启后才到达的旧引用：丢弃
+    stale = resolver.stale_count
+    assert resolver.resolve([{'metadata': {'shm': refs[2]}, 'image_data': b''}]) == [], "旧写端的引用未被丢弃"
+    assert resolver.stale_count == stale + 1
+
+    # 超出写端已预留位置的引用：丢弃
+    reader = resolver.readers[name]
+    assert reader.read(dict(new_ref, pos=new_ref['pos'] + 4096)) is None, "超出预留位置的引用未被丢弃"
+    resolver.close()
+    writer.close()
+    print("✅ 共享内存自检通过")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='共享内存传输工具')
+    parser.add_argument('--bench', action='store_true', help='运行 TCP 回环 vs ipc+共享内存 基准测试')
+    parser.add_argument('--size', type=int, default=512 * 1024, help='单条负载大小（字节）')
+    parser.add_argument('--count', type=int, default=2000, help='发送条数')
+    parser.add_argument('--selftest', action='store_true', help='自检：发送端重启后同名重建共享内存')
+    args = parser.parse_args()
+
+    if args.selftest:
+        run_selftest()
+    elif args.bench:
+        run_benchmark(args.size, args.count)
+    else:
+        parser.print_help()
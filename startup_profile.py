@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动耗时分析
+对入口模块分别运行 python -X importtime，统计总导入耗时和最慢的模块，
+并多次测量"启动解释器 + 导入入口模块"的墙钟时间（取中位数），用于检查懒加载是否生效。
+
+    python3 startup_profile.py                       # 默认分析 simple_receiver 和 qr_gui_viewer
+    python3 startup_profile.py simple_receiver --top 20 --runs 5
+    python3 startup_profile.py --json startup.json   # 结果写入JSON，便于前后对比
+
+注意：只统计导入阶段；DBR SDK、OpenCV 显示模块已改为按需/后台加载，
+运行时的"接收器已启动""首帧"耗时由两个入口程序自己打印。
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+DEFAULT_MODULES = ('simple_receiver', 'qr_gui_viewer')
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_importtime(stderr):
+    """解析 -X importtime 输出 -> [(模块, 自身微秒, 累计微秒)]"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0])
+            cumulative_us = int(parts[1])
+        except ValueError:
+            continue  # 表头
+        rows.append((parts[2].strip(), self_us, cumulative_us))
+    return rows
+
+
+def profile_module(module, runs=3, top=15):
+    """分析一个入口模块的导入耗时"""
+    code = f"import {module}"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=SCRIPT_DIR,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"❌ 导入 {module} 失败:\n{result.stderr.strip().splitlines()[-1] if result.stderr else ''}")
+        return None
+    rows = parse_importtime(result.stderr)
+    total_us = next((cum for name, _, cum in rows if name == module), 0)
+
+    wall = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=SCRIPT_DIR, capture_output=True)
+        wall.append((time.perf_counter() - t0) * 1000.0)
+
+    # 只看顶层包（累计耗时），子模块已包含在内
+    top_level = {}
+    for name, _, cum in rows:
+        root = name.split('.')[0]
+        if root == module:
+            continue
+        top_level[root] = max(top_level.get(root, 0), cum)
+    slowest = sorted(top_level.items(), key=lambda kv: kv[1], reverse=True)[:top]
+
+    return {
+        'module': module,
+        'import_ms': round(total_us / 1000.0, 1),
+        'wall_ms_median': round(statistics.median(wall), 1),
+        'modules_loaded': len(rows),
+        'heavy_loaded': sorted(name for name in ('cv2', 'dynamsoft_barcode_reader_bundle', 'PIL', 'numpy', 'tkinter')
+                               if any(r[0] == name for r in rows)),
+        'slowest': [{'module': name, 'ms': round(us / 1000.0, 1)} for name, us in slowest],
+    }
+
+
+def print_report(report):
+    print(f"\n📦 {report['module']}: 导入 {report['import_ms']:.1f} ms，"
+          f"启动+导入（墙钟中位数）{report['wall_ms_median']:.1f} ms，共 {report['modules_loaded']} 个模块")
+    print(f"   已加载的重模块: {', '.join(report['heavy_loaded']) or '无'}")
+    for entry in report['slowest']:
+        print(f"   {entry['ms']:8.1f} ms  {entry['module']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='入口模块启动耗时分析（-X importtime）')
+    parser.add_argument('modules', nargs='*', default=list(DEFAULT_MODULES), help='要分析的模块')
+    parser.add_argument('--runs', type=int, default=3, help='墙钟测量次数（取中位数）')
+    parser.add_argument('--top', type=int, default=15, help='列出最慢的顶层包数量')
+    parser.add_argument('--json', help='结果写入JSON文件')
+    args = parser.parse_args()
+
+    reports = []
+    for module in args.modules:
+        report = profile_module(module, runs=args.runs, top=args.top)
+        if report is not None:
+            print_report(report)
+            reports.append(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'reports': reports}, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 结果已写入: {args.json}")
+    return 0 if reports else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+接收流录制与回放
+接收器可选地把收到的原始 pynng 消息（逐字节）连同接收时间戳录制到磁盘，
+send_file.py --replay 按原始时间间隔（或N倍速/全速）回放，用于复现现场流量和基准测试。
+
+录制目录结构：
+    manifest.json             录制信息（段列表、消息数、起止时间）
+    segment_00000.qrrec       数据段：连续的 [8字节接收时间(double) + 4字节长度 + 消息字节]
+    segment_00000.idx         索引：每条消息一项 [8字节接收时间(double) + 8字节段内偏移 + 4字节长度]
+
+查看录制信息：
+    python3 stream_recorder.py <录制目录>
+"""
+
+import json
+import os
+import queue
+import struct
+import threading
+from datetime import datetime
+
+RECORD_HEADER = struct.Struct('<dI')   # 接收时间, 消息长度
+INDEX_ENTRY = struct.Struct('<dQI')    # 接收时间, 段内偏移, 消息长度
+
+DEFAULT_SEGMENT_BYTES = 256 * 1024 * 1024  # 单个数据段最大256MB
+DEFAULT_WRITE_BUFFER = 4 * 1024 * 1024     # 顺序写缓冲4MB
+
+
+def new_record_dir(base_dir):
+    """按时间戳生成录制目录"""
+    return os.path.join(base_dir, f"record_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+
+
+class StreamRecorder:
+    """录制器：接收线程只负责入队，后台线程做缓冲顺序写，磁盘抖动不会阻塞接收"""
+
+    def __init__(self, out_dir, segment_bytes=DEFAULT_SEGMENT_BYTES, buffer_size=DEFAULT_WRITE_BUFFER,
+                 queue_size=2000):
+        self.out_dir = out_dir
+        self.segment_bytes = segment_bytes
+        self.buffer_size = buffer_size
+        os.makedirs(out_dir, exist_ok=True)
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.segments = []  # [{'file', 'index', 'messages', 'bytes'}]
+        self.data_file = None
+        self.index_file = None
+        self.segment_offset = 0
+
+        # 统计
+        self.recorded_messages = 0
+        self.recorded_bytes = 0
+        self.dropped_messages = 0  # 写入跟不上时丢弃的消息数
+        self.first_time = None
+        self.last_time = None
+
+        self.running = True
+        self.writer_thread = threading.Thread(target=self._writer_loop, daemon=True, name="Stream-Recorder")
+        self.writer_thread.start()
+        print(f"📼 流录制已启用: {out_dir}")
+
+    def record(self, data, recv_time):
+        """记录一条原始消息（接收线程调用，不阻塞）"""
+        try:
+            self.queue.put_nowait((recv_time, bytes(data)))
+        except queue.Full:
+            self.dropped_messages += 1
+
+    def _open_segment(self):
+        seg_no = len(self.segments)
+        data_name = f"segment_{seg_no:05d}.qrrec"
+        index_name = f"segment_{seg_no:05d}.idx"
+        self.data_file = open(os.path.join(self.out_dir, data_name), 'wb', buffering=self.buffer_size)
+        self.index_file = open(os.path.join(self.out_dir, index_name), 'wb', buffering=64 * 1024)
+        self.segment_offset = 0
+        self.segments.append({'file': data_name, 'index': index_name, 'messages': 0, 'bytes': 0})
+
+    def _close_segment(self):
+        for f in (self.data_file, self.index_file):
+            if f:
+                f.close()
+        self.data_file = None
+        self.index_file = None
+
+    def _write(self, recv_time, data):
+        record_size = RECORD_HEADER.size + len(data)
+        if self.data_file is None or (self.segment_offset > 0 and
+                                      self.segment_offset + record_size > self.segment_bytes):
+            self._close_segment()
+            self._open_segment()
+            self._write_manifest()
+
+        self.data_file.write(RECORD_HEADER.pack(recv_time, len(data)))
+        self.data_file.write(data)
+        self.index_file.write(INDEX_ENTRY.pack(recv_time, self.segment_offset, len(data)))
+        self.segment_offset += record_size
+
+        segment = self.segments[-1]
+        segment['messages'] += 1
+        segment['bytes'] += len(data)
+        self.recorded_messages += 1
+        self.recorded_bytes += len(data)
+        if self.first_time is None:
+            self.first_time = recv_time
+        self.last_time = recv_time
+
+    def _writer_loop(self):
+        while self.running or not self.queue.empty():
+            try:
+                recv_time, data = self.queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            try:
+                self._write(recv_time, data)
+            except Exception as e:
+                print(f"❌ 流录制写入失败: {e}")
+                self.dropped_messages += 1
+
+    def _write_manifest(self):
+        manifest = {
+            'version': 1,
+            'segments': self.segments,
+            'messages': self.recorded_messages,
+            'bytes': self.recorded_bytes,
+            'first_time': self.first_time,
+            'last_time': self.last_time,
+            'dropped': self.dropped_messages,
+        }
+        tmp_path = os.path.join(self.out_dir, 'manifest.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, os.path.join(self.out_dir, 'manifest.json'))
+
+    def close(self):
+        """停止录制，刷盘并写入最终 manifest"""
+        if not self.running:
+            return
+        self.running = False
+        self.writer_thread.join(timeout=5.0)
+        self._close_segment()
+        self._write_manifest()
+        print(f"📼 流录制已保存: {self.recorded_messages} 条消息，{self.recorded_bytes / 1024 / 1024:.1f} MB，"
+              f"丢弃 {self.dropped_messages} 条 -> {self.out_dir}")
+
+
+class StreamReader:
+    """读取录制目录，按录制顺序产出 (接收时间, 原始消息字节)"""
+
+    def __init__(self, in_dir):
+        self.in_dir = in_dir
+        manifest_path = os.path.join(in_dir, 'manifest.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                self.manifest = json.load(f)
+            self.segments = [seg['file'] for seg in self.manifest.get('segments', [])]
+        else:
+            # 录制进程异常退出时没有最终 manifest，按文件名扫描数据段
+            self.manifest = {}
+            self.segments = sorted(f for f in os.listdir(in_dir) if f.endswith('.qrrec'))
+        if not self.segments:
+            raise ValueError(f"录制目录中没有数据段: {in_dir}")
+
+    def message_count(self):
+        """按索引文件统计消息数（不读取数据段）"""
+        total = 0
+        for seg in self.segments:
+            index_path = os.path.join(self.in_dir, seg.replace('.qrrec', '.idx'))
+            if os.path.exists(index_path):
+                total += os.path.getsize(index_path) // INDEX_ENTRY.size
+        return total
+
+    def __iter__(self):
+        for seg in self.segments:
+            with open(os.path.join(self.in_dir, seg), 'rb', buffering=DEFAULT_WRITE_BUFFER) as f:
+                while True:
+                    header = f.read(RECORD_HEADER.size)
+                    if len(header) < RECORD_HEADER.size:
+                        break  # 段结束（或最后一条未写完）
+                    recv_time, length = RECORD_HEADER.unpack(header)
+                    data = f.read(length)
+                    if len(data) < length:
+                        break
+                    yield recv_time, data
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) < 2:
+        print("用法: python3 stream_recorder.py <录制目录>")
+        sys.exit(1)
+
+    reader = StreamReader(sys.argv[1])
+    count = 0
+    total_bytes = 0
+    first = last = None
+    for recv_time, data in reader:
+        count += 1
+        total_bytes += len(data)
+        first = recv_time if first is None else first
+        last = recv_time
+    duration = (last - first) if count > 1 else 0.0
+    print(f"📼 {sys.argv[1]}: {len(reader.segments)} 个数据段，{count} 条消息，{total_bytes / 1024 / 1024:.1f} MB，"
+          f"时长 {duration:.1f} s，平均 {count / duration if duration > 0 else 0:.1f} 条/s")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+环形槽位缩略图：后台线程池生成，按 recv_seq 缓存（qr_gui_viewer.py 的缩略图浏览窗口使用）
+    生成  TurboJPEG DCT 域缩小解码（默认 1/8，小裁剪自动换成 1/4、1/2，保证缩略图接近目标尺寸），
+          再用 PIL 缩到目标尺寸；比完整解码 + 缩放便宜一个数量级
+    缓存  按 recv_seq（而不是槽位号）缓存，槽位被新数据覆盖后旧缩略图自然失效；LRU 限制条数
+    调度  请求按后进先出处理：界面滚动时最新可见的格子先生成，滚过去的请求过期后直接丢弃
+
+    cache = ThumbnailCache(jpeg, ring, on_ready=callback)
+    image = cache.request(slot_index)   # 命中返回 PIL.Image，否则排队生成并返回 None，生成后回调 on_ready(slot_index, recv_seq)
+"""
+
+import threading
+from collections import OrderedDict, deque
+
+THUMB_SIZE = 80  # 缩略图最长边（像素）
+DEFAULT_WORKERS = 2
+DEFAULT_CAPACITY = 3000  # 缓存条数（80px RGB 约 19 KB/张）
+MAX_PENDING = 256  # 排队上限，超出时丢弃最旧的请求（通常已滚出可见范围）
+
+
+def thumbnail_scaling(jpeg, width, height, size=THUMB_SIZE):
+    """选 DCT 域缩放比例：从 1/8 开始，取缩小后最长边仍有 size 的 3/4 以上的最小比例（都不满足时用原尺寸）；
+    略小于 size 的缩略图直接显示，不为几个像素去做更大的解码"""
+    longest = max(width, height)
+    for factor in ((1, 8), (1, 4), (1, 2)):
+        if factor in jpeg.scaling_factors and longest * factor[0] // factor[1] >= size * 3 // 4:
+            return factor
+    return None
+
+
+def make_thumbnail(jpeg, jpeg_bytes, size=THUMB_SIZE):
+    """JPEG 字节 -> 最长边不超过 size 的 RGB PIL.Image"""
+    from PIL import Image
+    from turbojpeg import TJPF_RGB
+    width, height, _, _ = jpeg.decode_header(jpeg_bytes)
+    rgb = jpeg.decode(jpeg_bytes, pixel_format=TJPF_RGB,
+                      scaling_factor=thumbnail_scaling(jpeg, width, height, size))
+    image = Image.fromarray(rgb)
+    image.thumbnail((size, size))
+    return image
+
+
+class ThumbnailCache:
+    """后台线程池生成缩略图，按 recv_seq 缓存；request() 可在界面线程调用，不阻塞"""
+
+    def __init__(self, jpeg, ring, on_ready=None, workers=DEFAULT_WORKERS, capacity=DEFAULT_CAPACITY,
+                 size=THUMB_SIZE):
+        self.jpeg = jpeg
+        self.ring = ring
+        self.on_ready = on_ready  # on_ready(slot_index, recv_seq)，在生成线程中调用
+        self.size = size
+        self.capacity = max(1, int(capacity))
+
+        self.cache = OrderedDict()  # recv_seq -> PIL.Image
+        self.pending = deque()  # (slot_index, recv_seq)，右端为最新请求
+        self.queued = set()  # 已排队的 recv_seq，避免重复生成
+        self.cond = threading.Condition()
+        self.running = True
+
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.stale = 0  # 生成前槽位已被覆盖（或没有可解码的图像）
+        self.dropped = 0
+
+        self.threads = [threading.Thread(target=self._worker_loop, daemon=True, name=f"Thumb-{i}")
+                        for i in range(max(1, int(workers)))]
+        for thread in self.threads:
+            thread.start()
+
+    def request(self, slot_index):
+        """取槽位当前内容的缩略图：命中返回 PIL.Image；未命中排队生成并返回 None；空槽返回 None"""
+        slot = self.ring.get(slot_index)
+        if slot is None:
+            return None
+        recv_seq = slot['recv_seq']
+        with self.cond:
+            image = self.cache.get(recv_seq)
+            if image is not None:
+                self.cache.move_to_end(recv_seq)
+                self.hits += 1
+                return image
+            self.misses += 1
+            if recv_seq not in self.queued:
+                self.queued.add(recv_seq)
+                self.pending.append((slot_index % self.ring.slot_num, recv_seq))
+                if len(self.pending) > MAX_PENDING:
+                    _, old_seq = self.pending.popleft()
+                    self.queued.discard(old_seq)
+                    self.dropped += 1
+                self.cond.notify()
+        return None
+
+    def cancel_pending(self):
+        """丢弃所有未开始的请求（例如界面跳到了别处）"""
+        with self.cond:
+            self.dropped += len(self.pending)
+            self.pending.clear()
+            self.queued.clear()
+
+    def _worker_loop(self):
+        while True:
+            with self.cond:
+                while self.running and not self.pending:
+                    self.cond.wait()
+                if not self.running:
+                    return
+                slot_index, recv_seq = self.pending.pop()  # 后进先出：最新可见的格子优先
+            try:
+                slot = self.ring.lookup(slot_index, recv_seq)
+                image = None
+                if slot is not None and isinstance(slot.get('image_data'), (bytes, bytearray)):
+                    image = make_thumbnail(self.jpeg, slot['image_data'], self.size)
+            except Exception as e:
+                print(f"⚠️ 缩略图生成失败: {e}")
+                image = None
+            with self.cond:
+                self.queued.discard(recv_seq)
+                if image is None:
+                    self.stale += 1
+                    continue
+                self.cache[recv_seq] = image
+                self.cache.move_to_end(recv_seq)
+                while len(self.cache) > self.capacity:
+                    self.cache.popitem(last=False)
+                self.generated += 1
+            if self.on_ready is not None:
+                self.on_ready(slot_index, recv_seq)
+
+    def get_stats(self):
+        with self.cond:
+            return {
+                'cached': len(self.cache),
+                'pending': len(self.pending),
+                'hits': self.hits,
+                'misses': self.misses,
+                'generated': self.generated,
+                'stale': self.stale,
+                'dropped': self.dropped,
+            }
+
+    def close(self):
+        with self.cond:
+            self.running = False
+            self.pending.clear()
+            self.queued.clear()
+            self.cond.notify_all()
+        for thread in self.threads:
+            thread.join(timeout=1.0)
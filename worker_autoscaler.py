@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地识别线程池的自动伸缩（替代固定的 MaxParallelTasks 个线程）
+安静时空闲线程的解码器实例（DBR 每个线程一个 CaptureVisionRouter）白占内存，突发时线程不够、识别队列溢出。
+控制器每 interval 秒评估一次：
+    需要线程数  ceil((到达速率 + 队列深度 / interval) × 平均识别耗时 / 目标利用率)
+                即按当前到达速率保持目标利用率，并在一个评估周期内消化积压
+    扩容        需要数 > 当前数：立即扩到需要数（不超过上限）
+    缩容        需要数 < 当前数且利用率低于 SCALE_DOWN_UTIL，持续 cooldown 秒后每次减 1（不低于下限）
+    CPU 饱和    扩容后平均识别耗时升到近期最低耗时的 LATENCY_LIMIT 倍以上，说明线程多于 CPU 能力，暂停扩容
+退出线程的解码器实例放回预热池（最多 warm 个），下次扩容直接取用，不用重新创建（DBR 创建实例较慢）。
+
+配置文件：DecodeAutoscale（默认关闭）、AutoscaleMinWorkers（默认1）、AutoscaleMaxWorkers（默认CPU核数）、
+AutoscaleWarm（默认2）、AutoscaleInterval（默认2秒）；初始线程数为 MaxParallelTasks（限制在上下限之间）。
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+
+TARGET_UTIL = 0.75  # 扩容目标：线程忙碌时间占比
+SCALE_DOWN_UTIL = 0.5  # 利用率低于此值才考虑缩容
+COOLDOWN = 10.0  # 缩容前需要持续空闲的秒数
+LATENCY_LIMIT = 2.0  # 识别耗时相对近期最低值的倍数上限，超过视为 CPU 饱和
+
+
+class WorkerAutoscaler:
+    """识别线程调用 record_decode()，后台线程定期 evaluate() 并通过 set_workers(n) 调整线程数"""
+
+    def __init__(self, queue, get_workers, set_workers, min_workers=1, max_workers=None, warm=2, interval=2.0):
+        self.queue = queue  # DecodeQueue：队列深度和入队计数
+        self.get_workers = get_workers
+        self.set_workers = set_workers
+        self.interval = interval
+        self.configure_bounds(min_workers, max_workers, warm)
+
+        self.lock = threading.Lock()
+        self.busy_ms = 0.0  # 累计识别耗时（所有线程）
+        self.decodes = 0
+        self.warm_pool = []  # 预热的解码器实例
+
+        # 上一次评估时的累计值
+        self.last_time = time.time()
+        self.last_busy_ms = 0.0
+        self.last_decodes = 0
+        self.last_arrivals = self._arrivals()
+
+        # 评估结果
+        self.utilization = 0.0
+        self.latency_ms = None  # 最近一个周期的平均识别耗时
+        self.base_latency_ms = None  # 近期最低识别耗时（缓慢回升，适应图像内容变化）
+        self.arrival_rate = 0.0
+        self.needed = self.get_workers()
+        self.saturated = False
+        self.low_since = None  # 开始满足缩容条件的时间
+
+        # 统计
+        self.scale_ups = 0
+        self.scale_downs = 0
+        self.events = deque(maxlen=100)  # (时间, 原线程数, 新线程数, 原因)
+        self.events_seen = 0  # pop_events() 已取走的事件总数
+        self.events_total = 0
+
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def configure_bounds(self, min_workers, max_workers, warm):
+        self.min_workers = max(1, int(min_workers))
+        self.max_workers = max(self.min_workers, int(max_workers or os.cpu_count() or 8))
+        self.warm = max(0, int(warm))
+
+    def configure(self, config):
+        """配置热加载：更新上下限和预热数，当前线程数超出范围时立即调整"""
+        self.configure_bounds(config.get('AutoscaleMinWorkers', self.min_workers),
+                              config.get('AutoscaleMaxWorkers', self.max_workers),
+                              config.get('AutoscaleWarm', self.warm))
+        self.interval = float(config.get('AutoscaleInterval', self.interval))
+        workers = self.get_workers()
+        bounded = self.clamp(workers)
+        if bounded != workers:
+            self._scale(workers, bounded, "上下限调整")
+        with self.lock:
+            del self.warm_pool[self.warm:]
+
+    def clamp(self, workers):
+        return min(self.max_workers, max(self.min_workers, int(workers)))
+
+    def _arrivals(self):
+        stats = self.queue.get_stats(reset_max=False)  # 不清零最大等待（由统计输出负责）
+        return sum(s['queued'] for s in stats.values())
+
+    # ---------- 识别线程 ----------
+
+    def record_decode(self, elapsed_ms):
+        """识别线程报告一次识别耗时（含超时的识别，都算忙碌时间）"""
+        with self.lock:
+            self.busy_ms += elapsed_ms
+            self.decodes += 1
+
+    def acquire_decoder(self, create):
+        """新线程取解码器：优先用预热池中的实例，没有再 create()"""
+        with self.lock:
+            if self.warm_pool:
+                return self.warm_pool.pop()
+        return create()
+
+    def release_decoder(self, decoder):
+        """退出线程归还解码器：预热池未满时保留，否则丢弃（释放内存）"""
+        with self.lock:
+            if len(self.warm_pool) < self.warm:
+                self.warm_pool.append(decoder)
+
+    # ---------- 控制器 ----------
+
+    def start(self):
+        self.thread = threading.Thread(target=self._loop, daemon=True, name="DBR-Autoscaler")
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.stop_event.set()
+
+    def _loop(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.evaluate()
+            except Exception as e:
+                print(f"⚠️ 线程池伸缩评估失败: {e}")
+
+    def evaluate(self, now=None):
+        """评估一次，必要时调整线程数；返回调整后的线程数"""
+        now = time.time() if now is None else now
+        with self.lock:
+            busy_ms, decodes = self.busy_ms, self.decodes
+        arrivals = self._arrivals()
+        elapsed = max(now - self.last_time, 1e-3)
+        d_busy, d_decodes = busy_ms - self.last_busy_ms, decodes - self.last_decodes
+        d_arrivals = arrivals - self.last_arrivals
+        self.last_time, self.last_busy_ms, self.last_decodes, self.last_arrivals = now, busy_ms, decodes, arrivals
+
+        workers = self.get_workers()
+        depth = self.queue.qsize()
+        self.utilization = min(1.0, d_busy / (elapsed * 1000.0 * workers))
+        self.arrival_rate = d_arrivals / elapsed
+        if d_decodes:
+            self.latency_ms = d_busy / d_decodes
+            if self.base_latency_ms is None or self.latency_ms < self.base_latency_ms:
+                self.base_latency_ms = self.latency_ms
+            else:
+                self.base_latency_ms *= 1.02  # 缓慢回升，图像内容变难时不至于一直判为饱和
+            self.saturated = self.latency_ms > self.base_latency_ms * LATENCY_LIMIT
+
+        if self.latency_ms is None:
+            # 还没有识别耗时数据：只要有积压就先加一个线程
+            self.needed = workers + 1 if depth > 0 else workers
+        else:
+            demand = (self.arrival_rate + depth / self.interval) * self.latency_ms / 1000.0
+            self.needed = math.ceil(demand / TARGET_UTIL)
+        needed = self.clamp(self.needed)
+
+        if needed > workers:
+            self.low_since = None
+            if self.saturated:
+                return workers  # CPU 已满：加线程只会让每次识别更慢
+            return self._scale(workers, needed, f"队列 {depth}，到达 {self.arrival_rate:.1f}/s，利用率 {self.utilization:.0%}")
+        if needed < workers and self.utilization < SCALE_DOWN_UTIL and depth == 0:
+            if self.low_since is None:
+                self.low_since = now
+            elif now - self.low_since >= COOLDOWN:
+                self.low_since = now  # 每个冷却期最多减 1 个
+                return self._scale(workers, workers - 1, f"利用率 {self.utilization:.0%}")
+            return workers
+        self.low_since = None
+        return workers
+
+    def _scale(self, old, new, reason):
+        self.set_workers(new)
+        if new > old:
+            self.scale_ups += 1
+        else:
+            self.scale_downs += 1
+        self.events.append((time.time(), old, new, reason))
+        self.events_total += 1
+        return new
+
+    def pop_events(self):
+        """取走上次调用之后的伸缩事件（统计输出用）"""
+        count = min(self.events_total - self.events_seen, len(self.events))
+        self.events_seen = self.events_total
+        return list(self.events)[len(self.events) - count:]
+
+    def get_stats(self):
+        with self.lock:
+            warm = len(self.warm_pool)
+        return {
+            'workers': self.get_workers(),
+            'min': self.min_workers,
+            'max': self.max_workers,
+            'needed': self.needed,
+            'utilization': self.utilization,
+            'latency_ms': self.latency_ms or 0.0,
+            'arrival_rate': self.arrival_rate,
+            'warm': warm,
+            'saturated': self.saturated,
+            'scale_ups': self.scale_ups,
+            'scale_downs': self.scale_downs,
+        }
+
+
+def format_autoscale_stats(stats):
+    """格式化线程池伸缩统计，用于周期性打印"""
+    return (f"线程 {stats['workers']}（{stats['min']}-{stats['max']}，需要 {stats['needed']}），"
+            f"利用率 {stats['utilization']:.0%}，到达 {stats['arrival_rate']:.1f}/s，识别 {stats['latency_ms']:.1f} ms，"
+            f"预热 {stats['warm']}，扩容 {stats['scale_ups']} 次，缩容 {stats['scale_downs']} 次"
+            + ("，CPU饱和" if stats['saturated'] else ""))
+
+
+def format_scale_event(event):
+    at, old, new, reason = event
+    return f"{time.strftime('%H:%M:%S', time.localtime(at))} {'扩容' if new > old else '缩容'} {old} -> {new}（{reason}）"
+
+
+def create_autoscaler(enabled, config, queue, get_workers, set_workers):
+    """按 参数 > 配置文件 "DecodeAutoscale" > 默认关闭 创建线程池伸缩控制器；关闭时返回 None"""
+    config = config or {}
+    enabled = enabled if enabled is not None else config.get('DecodeAutoscale', False)
+    if not enabled:
+        return None
+    return WorkerAutoscaler(queue, get_workers, set_workers,
+                            min_workers=config.get('AutoscaleMinWorkers', 1),
+                            max_workers=config.get('AutoscaleMaxWorkers'),
+                            warm=config.get('AutoscaleWarm', 2),
+                            interval=float(config.get('AutoscaleInterval', 2.0)))